@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'drf_spectacular',
@@ -47,7 +48,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
+    'api.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +62,14 @@ MIDDLEWARE = [
 
 ]
 
+# Share of requests that get Server-Timing headers and performance budget checks (0..1)
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', '1.0'))
+
+# Directory for per-process metric files, shared by the workers of one host (exited
+# workers are recognised by pid); set it when running several workers
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+
 ROOT_URLCONF = 'Metsenat.urls'
 AUTH_USER_MODEL = 'api.User'
 
@@ -95,6 +107,88 @@ DATABASES = {
 
 DATABASES['default'] = dj_database_url.config()
 
+# Read replicas (comma separated database URLs) serve the list, filter and
+# total-payment endpoints; see api/routers.py. A client that wrote reads from
+# the primary for REPLICA_STICKY_SECONDS afterwards. Replicas failing the health
+# check (run every REPLICA_HEALTH_CHECK_INTERVAL seconds on a background thread), or
+# lagging more than REPLICA_MAX_LAG_SECONDS, are skipped until they recover.
+DATABASE_REPLICAS = []
+for index, url in enumerate(url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    if DATABASES[alias]['ENGINE'] == 'django.db.backends.postgresql':
+        # An unreachable replica fails fast instead of after the OS connect timeout.
+        DATABASES[alias].setdefault('OPTIONS', {})['connect_timeout'] = int(os.getenv('REPLICA_CONNECT_TIMEOUT', '2'))
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', '10'))
+# Responses built from replica reads are cached at most this long, as a lagging
+# replica may still return rows older than the latest invalidation.
+REPLICA_CACHE_TIMEOUT = int(os.getenv('REPLICA_CACHE_TIMEOUT', '5'))
+
+# PostgreSQL connections come from a per-process pool (psycopg 3 + psycopg-pool) of
+# DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections per database; a request waits up to
+# DB_POOL_TIMEOUT seconds for one, and each is health checked before it is handed out.
+# The pool serves the WSGI and the ASGI path alike. With DB_POOL=0, DB_CONN_MAX_AGE
+# keeps connections open between requests instead (WSGI only; use 0 under ASGI).
+DB_POOL = os.getenv('DB_POOL', '1').lower() in ('1', 'true', 'yes')
+for database in DATABASES.values():
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    # Django's backend plus connection checkout metrics.
+    database['ENGINE'] = 'api.backends.postgresql'
+    database['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL:
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '0'))
+
+# Read endpoints cache their responses here; use a shared backend (file, redis,
+# memcached) when running several workers. RESPONSE_CACHE_TIMEOUT=0 disables it.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'metsenat'),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# List pages and streams are built from .values_list() rows by a compiled row
+# encoder instead of model instances and serializers; 0 turns it off.
+FAST_LIST_SERIALIZATION = os.getenv('FAST_LIST_SERIALIZATION', '1').lower() in ('1', 'true', 'yes')
+
+# Authenticated requests look their user up in a per-process cache of
+# JWT_USER_CACHE_SIZE users kept for JWT_USER_CACHE_TTL seconds (0 disables it).
+# JWT_STATELESS_AUTH=1 skips the database and builds the user from the token
+# claims; changes to a user then only show up in tokens issued afterwards.
+JWT_USER_CACHE_TTL = float(os.getenv('JWT_USER_CACHE_TTL', '30'))
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', '1024'))
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', '0').lower() in ('1', 'true', 'yes')
+
+# Login and registration hash passwords on a pool of PASSWORD_HASHING_WORKERS
+# threads (CPU count by default) and answer 503 once PASSWORD_HASHING_QUEUE
+# more are waiting. PASSWORD_HASH_ITERATIONS sets the PBKDF2 cost of new hashes.
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', '0')) or None
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', '64'))
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '870000'))
+PASSWORD_HASHERS = [
+    'api.hashing.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -118,7 +212,7 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',),
+        'api.authentication.CachedJWTAuthentication',),
 
     'DATETIME_INPUT_FORMATS': ['%d-%m-%Y %H:%M:%S', '%d-%m-%Y %-H:%M:%S'],
     'DATE_INPUT_FORMATS': ['%d-%m-%Y %H:%M:%S', '%d-%m-%Y %-H:%M:%S'],
@@ -156,6 +250,11 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+# A running export job records a heartbeat every few thousand rows. One without a
+# heartbeat for this many seconds has lost its worker (killed, out of memory) and is
+# handed to the next one, up to EXPORT_JOB_MAX_ATTEMPTS attempts before it fails.
+EXPORT_JOB_TIMEOUT = int(os.getenv('EXPORT_JOB_TIMEOUT', '300'))
+EXPORT_JOB_MAX_ATTEMPTS = int(os.getenv('EXPORT_JOB_MAX_ATTEMPTS', '3'))
 STATIC_ROOT = os.path.join(BASE_DIR / 'static')
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
@@ -265,7 +364,7 @@ SIMPLE_JWT = {
 
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
-    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_USER_CLASS": "api.authentication.RoleTokenUser",
 
     "JTI_CLAIM": "jti",
 
@@ -4,11 +4,14 @@ from django.conf.urls.static import static
 from django.views.i18n import set_language
 from .settings import STATIC_URL, STATIC_ROOT, MEDIA_URL, MEDIA_ROOT
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from api.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('i18n', set_language, name="set_language")
+    path('api/async/', include('api.async_urls')),
+    path('i18n', set_language, name="set_language"),
+    path('metrics', metrics_view, name='metrics')
 ]
 urlpatterns += static(STATIC_URL, document_root=STATIC_ROOT) + static(MEDIA_URL, document_root=MEDIA_ROOT)
 urlpatterns += [
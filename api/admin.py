@@ -1,5 +1,16 @@
-from django.contrib import admin
+from functools import reduce
+from operator import and_, or_
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.db.models import F, Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
+from django.utils.text import smart_split, unescape_string_literal
 from .models import (
     User,
     Student,
@@ -7,6 +18,110 @@ from .models import (
     StudentSponsor,
     University
 )
+from .importers import ImportFormatError, SponsorImporter, StudentImporter, read_rows
+from .pagination import EstimatedCountPaginator
+from .search import ILike
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX file with a header row")
+
+
+class ImportAdminMixin:
+    """
+    Adds an "Import" button to the change list that bulk loads a CSV/XLSX file
+    through ``importer_class``.
+    """
+    importer_class = None
+    import_form_class = ImportForm
+    change_list_template = 'admin/api/change_list_import.html'
+    max_error_messages = 20
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def get_importer(self, form):
+        return self.importer_class()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = self.import_form_class(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                created, errors = self.get_importer(form).run(read_rows(upload, upload.name))
+            except ImportFormatError as error:
+                form.add_error('file', str(error))
+            else:
+                self.message_user(request, f"{created} rows imported, {len(errors)} rejected.", messages.SUCCESS)
+                for line in sorted(errors)[:self.max_error_messages]:
+                    details = '; '.join(f"{field}: {' '.join(texts)}" for field, texts in errors[line].items())
+                    self.message_user(request, f"Line {line}: {details}", messages.ERROR)
+                return redirect(f'admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.model._meta.verbose_name_plural}",
+            'form': form,
+            'columns': self.importer_class.fields,
+        }
+        return TemplateResponse(request, 'admin/api/import_form.html', context)
+
+
+class LargeTableAdminMixin:
+    """
+    Changelists for million-row tables: the row count is estimated instead
+    of counted (``EstimatedCountPaginator``, and no full ``COUNT(*)`` next to
+    filtered results), and on PostgreSQL every search term must be an ILIKE
+    substring of one of ``search_fields``, related ones included, which the
+    GIN trigram indexes answer. The admin's own ``icontains`` wraps the
+    column in ``UPPER()`` and scans the table.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term or connections[queryset.db].vendor != 'postgresql':
+            return super().get_search_results(request, queryset, search_term)
+
+        connection = connections[queryset.db]
+        terms = [
+            unescape_string_literal(bit) if bit.startswith(('"', "'")) and bit[0] == bit[-1] else bit
+            for bit in smart_split(search_term)
+        ]
+        conditions = [
+            reduce(or_, [Q(ILike(F(field), f'%{connection.ops.prep_for_like_query(term)}%')) for field in search_fields])
+            for term in terms
+        ]
+        may_have_duplicates = any(lookup_spawns_duplicates(self.opts, field) for field in search_fields)
+        return queryset.filter(reduce(and_, conditions)), may_have_duplicates
+
+
+def progress_action(progress):
+    """
+    A changelist action moving the selected sponsors to ``progress`` with a
+    single UPDATE, however many are selected.
+    """
+    @admin.action(description=f"Mark selected sponsors as {progress.label}", permissions=['change'])
+    def action(modeladmin, request, queryset):
+        updated = Sponsor.objects.set_progress(queryset, progress)
+        modeladmin.message_user(request, f"{updated} sponsors marked as {progress.label}.", messages.SUCCESS)
+
+    action.__name__ = f'mark_{progress.name.lower()}'
+    return action
+
+
+class StudentImportForm(ImportForm):
+    create_universities = forms.BooleanField(required=False, help_text="Create universities that are not found")
+
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -25,19 +140,34 @@ class UniversityAdmin(admin.ModelAdmin):
     list_per_page = 8
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdminMixin, ImportAdminMixin, admin.ModelAdmin):
     list_display = ('full_name', 'degree', 'allocated_money', 'contract_price', 'university')
-    search_fields = ('full_name', 'degree')
+    list_select_related = ('university',)
+    list_filter = ('degree',)
+    search_fields = ('full_name', 'university__name')
+    autocomplete_fields = ('university',)
+    ordering = ('-pk',)
     list_per_page = 8
+    importer_class = StudentImporter
+    import_form_class = StudentImportForm
+
+    def get_importer(self, form):
+        return StudentImporter(create_universities=form.cleaned_data['create_universities'])
 
 @admin.register(Sponsor)
-class SponsorAdmin(admin.ModelAdmin):
+class SponsorAdmin(LargeTableAdminMixin, ImportAdminMixin, admin.ModelAdmin):
     list_display = ('full_name', 'phone_number', 'deposit_money', 'is_organization','progress','sponsor_status', 'created_at', 'organization_name', 'spent_amount')
+    list_filter = ('progress', 'sponsor_status')
     search_fields = ('full_name', 'phone_number', 'organization_name')
+    actions = [progress_action(progress) for progress in Sponsor.StatusChoices]
+    ordering = ('-pk',)
     list_per_page = 8
+    importer_class = SponsorImporter
 
 @admin.register(StudentSponsor)
-class StudentSponsorAdmin(admin.ModelAdmin):
+class StudentSponsorAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('student', 'sponsor', 'amount', 'created_at')
-    search_fields = ('student', 'sponsor')
-    list_per_page = 8
\ No newline at end of file
+    list_select_related = ('student', 'sponsor')
+    search_fields = ('student__full_name', 'sponsor__full_name', 'sponsor__organization_name')
+    autocomplete_fields = ('student', 'sponsor')
+    list_per_page = 8
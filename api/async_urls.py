@@ -0,0 +1,23 @@
+from django.urls import path
+from .async_views import (
+    SponsorsAPIView,
+    SponsorDetailsAPIView,
+    StudentAPIView,
+    SponsorFilterAPIView,
+    StudentFilterAPIView,
+    StudentSponsorFilterAPIView,
+    TotalPaymentsAPIView
+)
+
+# Same paths and names as api/urls.py, mounted under api/async/ with the "async" namespace.
+app_name = 'async'
+
+urlpatterns = [
+    path('sponsors', SponsorsAPIView.as_view(), name='sponsors-list'),
+    path('sponsor/<int:pk>', SponsorDetailsAPIView.as_view(), name='sponsor-detail'),
+    path('sponsor/filter', SponsorFilterAPIView.as_view(), name='sponsor-filter'),
+    path('sponsor/student/filter', StudentSponsorFilterAPIView.as_view(), name='sponsor-student-filter'),
+    path('student', StudentAPIView.as_view(), name='student-list'),
+    path('student/filter', StudentFilterAPIView.as_view(), name='student-filter'),
+    path('total-payment', TotalPaymentsAPIView.as_view(), name='total-payment'),
+]
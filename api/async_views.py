@@ -0,0 +1,62 @@
+"""
+Async versions of the read endpoints, served under ``/api/async/`` (see
+``async_urls.py``) for ASGI deployments.
+
+They inherit everything but their handlers from ``views.py``: response
+cache, conditional GET and budgets behave the same. Django's async ORM still
+runs each query on its sync thread; what the event loop saves is a thread
+held for every request while slow clients send and receive.
+"""
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.response import Response
+from . import views
+from .asynchronous import AsyncAPIView, AsyncFilterMixin, AsyncListMixin
+from .models import Sponsor, Student, TotalPayment
+from .serializers import SponsorsSerializer, StudentSerializer, TotalPaymentsSerializer
+
+
+@extend_schema(exclude=True)
+class SponsorsAPIView(AsyncListMixin, AsyncAPIView, views.SponsorsAPIView):
+    async def get(self, request):
+        queryset = self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer)
+        return await self.alist(request, queryset, SponsorsSerializer)
+
+
+@extend_schema(exclude=True)
+class SponsorDetailsAPIView(AsyncAPIView, views.SponsorDetailsAPIView):
+    async def get(self, request, pk):
+        try:
+            sponsor = await self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer).aget(pk=pk)
+        except Sponsor.DoesNotExist:
+            return Response({'detail': 'Sponsor not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(SponsorsSerializer(sponsor, context=self.get_fieldset_context()).data)
+
+
+@extend_schema(exclude=True)
+class StudentAPIView(AsyncListMixin, AsyncAPIView, views.StudentAPIView):
+    async def get(self, request):
+        queryset = self.get_fieldset_queryset(Student.objects.all(), StudentSerializer)
+        return await self.alist(request, queryset, StudentSerializer)
+
+
+@extend_schema(exclude=True)
+class SponsorFilterAPIView(AsyncFilterMixin, AsyncAPIView, views.SponsorFilterAPIView):
+    pass
+
+
+@extend_schema(exclude=True)
+class StudentFilterAPIView(AsyncFilterMixin, AsyncAPIView, views.StudentFilterAPIView):
+    pass
+
+
+@extend_schema(exclude=True)
+class StudentSponsorFilterAPIView(AsyncFilterMixin, AsyncAPIView, views.StudentSponsorFilterAPIView):
+    pass
+
+
+@extend_schema(exclude=True)
+class TotalPaymentsAPIView(AsyncAPIView, views.TotalPaymentsAPIView):
+    async def get(self, request):
+        summary = await TotalPayment.objects.aget_summary()
+        return Response(TotalPaymentsSerializer(summary).data, status=status.HTTP_200_OK)
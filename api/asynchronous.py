@@ -0,0 +1,87 @@
+"""
+Async counterpart of DRF's ``APIView``.
+
+DRF dispatches synchronously, so a coroutine handler would never be awaited.
+``AsyncAPIView`` keeps DRF's request wrapping, parsers, exception handling
+and renderers but awaits the handler; Django then runs the view on the event
+loop under ASGI (and in a thread of its own under WSGI). Authentication,
+permissions and throttling may query the database and run in a thread.
+"""
+import inspect
+from asgiref.sync import sync_to_async
+from django.db import OperationalError
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    Handlers (``get``, ``post``, ...) must all be ``async def``; ``options``
+    stays DRF's.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        if not cls.view_is_async:
+            raise TypeError(f"{cls.__name__} needs async handlers.")
+        return super().as_view(**initkwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await self.dispatch_once(request, *args, **kwargs)
+        except OperationalError as error:
+            # Replica reads (``ReplicaReadMixin``) run again on the primary.
+            fail_over = getattr(self, 'fail_over', None)
+            if fail_over is None or not await sync_to_async(fail_over)(error):
+                raise
+            return await self.dispatch_once(request, *args, **kwargs)
+
+    async def dispatch_once(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS is answered by DRF's synchronous handler.
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListMixin:
+    """
+    Async ``list`` for the keyset paginated, streamable list views (with
+    ``RowEncoderMixin``): the page is fetched with the async ORM, ``?stream=1``
+    streams through it.
+    """
+
+    async def alist(self, request, queryset, serializer_class):
+        if self.wants_stream(request):
+            return self.get_streaming_response(queryset, serializer_class, asynchronous=True)
+        paginator = self.pagination_class()
+        rows, encoder = self.get_rows(queryset, serializer_class)
+        page = await paginator.apaginate_queryset(rows, request, view=self)
+        if page is None:
+            page = [row async for row in rows]
+            return Response(self.serialize_rows(page, serializer_class, encoder))
+        return paginator.get_paginated_response(self.serialize_rows(page, serializer_class, encoder))
+
+
+class AsyncFilterMixin(AsyncListMixin):
+    async def get(self, request, *args, **kwargs):
+        # Filter forms validate choices such as ``university`` with a query.
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        return await self.alist(request, queryset, self.get_serializer_class())
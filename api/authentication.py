@@ -0,0 +1,123 @@
+"""
+JWT authentication without a user query on every request.
+
+``CachedJWTAuthentication`` keeps recently seen users in a small per-process
+LRU with a short TTL. Saving or deleting a user drops its entry in this
+process (see ``signals.py``); other processes notice within the TTL. With
+``JWT_STATELESS_AUTH`` the user is built from the token claims instead and
+the database is not touched at all.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+class UserCache:
+    """
+    Thread-safe LRU of users by id whose entries expire after
+    ``JWT_USER_CACHE_TTL`` seconds; at most ``JWT_USER_CACHE_SIZE`` are kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'JWT_USER_CACHE_SIZE', 1024)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._users[user_id] = (user, time.monotonic() + self.ttl)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.maxsize:
+                self._users.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class RoleTokenUser(TokenUser):
+    """
+    Stateless user backed by the token claims, ``role`` included.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the claims ``RoleTokenUser`` reads; access tokens
+    made from it copy them.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if getattr(settings, 'JWT_STATELESS_AUTH', False):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken("Token contained no recognizable user identification")
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return copy.copy(user)
+
+        # The checks JWTAuthentication runs after its query.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        # Views get their own copy; the cached instance stays untouched.
+        return copy.copy(user)
@@ -0,0 +1,44 @@
+"""
+Django's PostgreSQL backend with connection checkout instrumentation.
+
+Every connection a request obtains is timed: with the pool enabled that is
+the wait for a free connection plus its health check, without it the full
+connect and TLS/auth handshake. Pool sizes of the current process are
+reported at scrape time.
+"""
+from time import perf_counter
+from django.db.backends.postgresql import base
+from api.metrics import DB_CHECKOUT, DB_CHECKOUT_ERRORS, registry
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pooled = 'true' if self.settings_dict['OPTIONS'].get('pool') else 'false'
+        started = perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            DB_CHECKOUT_ERRORS.inc(database=self.alias, pooled=pooled)
+            raise
+        DB_CHECKOUT.observe(perf_counter() - started, database=self.alias, pooled=pooled)
+        return connection
+
+
+def pool_stats():
+    """
+    Size, idle connections and waiting requests of this process's pools.
+    """
+    stats = {alias: pool.get_stats() for alias, pool in list(DatabaseWrapper._connection_pools.items())}
+    return [
+        ('metsenat_db_pool_connections', 'gauge', "Open connections in this process's pool.",
+         [({'database': alias}, values.get('pool_size', 0)) for alias, values in stats.items()]),
+        ('metsenat_db_pool_idle_connections', 'gauge', "Idle connections in this process's pool.",
+         [({'database': alias}, values.get('pool_available', 0)) for alias, values in stats.items()]),
+        ('metsenat_db_pool_max_connections', 'gauge', "Pool size limit per process.",
+         [({'database': alias}, values.get('pool_max', 0)) for alias, values in stats.items()]),
+        ('metsenat_db_pool_waiting_requests', 'gauge', "Requests waiting for a connection in this process.",
+         [({'database': alias}, values.get('requests_waiting', 0)) for alias, values in stats.items()]),
+    ]
+
+
+registry.register_collector(pool_stats)
@@ -0,0 +1,409 @@
+"""
+Load-test harness behind ``manage.py benchmark``.
+
+Every named route in ``api/urls.py`` has a scenario that turns a request
+number into ``(method, path, data)``. ``BenchmarkFixture`` creates the rows
+the write scenarios need (a funded sponsor, disposable rows to delete, a
+user to log in with) next to whatever dataset is loaded, and removes them
+afterwards. Requests go through Django's test client in-process, through
+the ASGI handler (``AsgiClient``, with the async views of ``async_urls.py``
+where they exist) or, with a base URL, over HTTP to a running server.
+"""
+import asyncio
+import http.client
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import resolve, reverse
+from django.utils import timezone
+from api.authentication import UserRefreshToken
+from api.cache import invalidate
+from api.exports import process_job
+from api.models import User, University, Student, Sponsor, StudentSponsor, SponsorDailyRollup, ExportJob
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class BenchmarkFixture:
+    """
+    Rows the scenarios point at. ``capacity`` is the number of requests each
+    endpoint will send; it sizes the pools of rows that get deleted.
+    """
+
+    def __init__(self, capacity, seed=1):
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.tag = f"bench-{int(time.time())}"
+
+    def sample(self, model, size=1000):
+        pks = list(model.objects.order_by('-pk').values_list('pk', flat=True)[:size])
+        self.rng.shuffle(pks)
+        return pks
+
+    def setup(self):
+        tag = self.tag
+        self.first_export_pk = (ExportJob.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        self.university = University.objects.create(name=tag)
+        self.sponsor = Sponsor.objects.create(
+            full_name=tag, phone_number=f"{tag}-funded", amount=Decimal('1000000000'),
+            is_organization=True, organization_name=tag, progress=Sponsor.StatusChoices.CONFIRMED,
+        )
+        self.editable_sponsor = Sponsor.objects.create(
+            full_name=tag, phone_number=f"{tag}-edit", amount=Decimal('1000000'),
+            is_organization=False, progress=Sponsor.StatusChoices.NEW,
+        )
+        self.students = [
+            Student.objects.create(
+                full_name=f"{tag}-{i}", degree=Student.StudentTypes.BACHELOR,
+                contract_price=Decimal('1000000000'), university=self.university,
+            ).pk
+            for i in range(20)
+        ]
+
+        # Zero balances keep the TotalPayment summary untouched by the bulk inserts.
+        disposable_sponsors = [
+            Sponsor(full_name=tag, phone_number=f"{tag}-d{i}", amount=Decimal(0),
+                    is_organization=False, progress=Sponsor.StatusChoices.NEW)
+            for i in range(self.capacity)
+        ]
+        for sponsor in disposable_sponsors:
+            sponsor.normalize()
+        disposable_sponsors = Sponsor.objects.bulk_create(disposable_sponsors)
+        # Their deletes count sign-ups down, so count them up like save() would.
+        SponsorDailyRollup.objects.record(disposable_sponsors)
+        self.disposable_sponsors = [row.pk for row in disposable_sponsors]
+        self.disposable_students = [
+            row.pk for row in Student.objects.bulk_create([
+                Student(full_name=f"{tag}-d{i}", degree=Student.StudentTypes.BACHELOR, university=self.university)
+                for i in range(self.capacity)
+            ])
+        ]
+        invalidate(Sponsor, Student)
+
+        self.user = User.objects.create_user(email=f"{tag}@bench.local", username=tag, password=BENCH_PASSWORD)
+        self.access_token = str(UserRefreshToken.for_user(self.user).access_token)
+        StudentSponsor(sponsor=self.sponsor, student_id=self.students[0], amount=Decimal('1.00')).save()
+        now = timezone.now()
+        self.export = ExportJob.objects.create(
+            kind=ExportJob.Kind.ALLOCATIONS, format=ExportJob.Format.CSV, filters={'sponsor': self.sponsor.pk},
+            # As claim_next_job() leaves it.
+            status=ExportJob.Status.RUNNING, started_at=now, heartbeat_at=now, attempts=1,
+        )
+        process_job(self.export)
+
+        self.sponsor_pks = self.sample(Sponsor) or [self.sponsor.pk]
+        self.university_pks = self.sample(University)
+
+    def teardown(self):
+        for job in ExportJob.objects.filter(pk__gte=self.first_export_pk):
+            job.file.delete(save=False)
+            job.delete()
+        Sponsor.objects.filter(phone_number__startswith=self.tag).delete()
+        Student.objects.filter(full_name__startswith=self.tag).delete()
+        University.objects.filter(name=self.tag).delete()
+        User.objects.filter(username__startswith=self.tag).delete()
+
+    def pick(self, pks, n):
+        return pks[n % len(pks)]
+
+
+SCENARIOS = {
+    'register': lambda f, n: ('POST', reverse('register'), {
+        'email': f"{f.tag}-{n}@bench.local", 'username': f"{f.tag}-{n}",
+        'password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD,
+    }),
+    'login': lambda f, n: ('POST', reverse('login'), {
+        'email': f.user.email, 'password': BENCH_PASSWORD,
+    }),
+    'sponsors-list': lambda f, n: ('GET', reverse('sponsors-list'), ['', '?page_size=100'][n % 2]),
+    'sponsor-detail': lambda f, n: ('GET', reverse('sponsor-detail', args=[f.pick(f.sponsor_pks, n)]), ''),
+    'sponsor-students': lambda f, n: ('GET', reverse('sponsor-students', args=[
+        [f.sponsor.pk, f.pick(f.sponsor_pks, n)][n % 2]]), ''),
+    'sponsor-create': lambda f, n: ('POST', reverse('sponsor-create'), {
+        'full_name': f.tag, 'phone_number': f"{f.tag}-c{n}", 'amount': '1000000',
+        'is_organization': False, 'progress': Sponsor.StatusChoices.NEW,
+    }),
+    'sponsor-update': lambda f, n: ('PUT', reverse('sponsor-update', args=[f.editable_sponsor.pk]), {
+        'full_name': f"{f.tag}-{n}", 'phone_number': f.editable_sponsor.phone_number, 'amount': '1000000',
+        'is_organization': False, 'progress': Sponsor.StatusChoices.IN_PROCESS,
+    }),
+    'sponsor-delete': lambda f, n: ('DELETE', reverse('sponsor-delete', args=[f.disposable_sponsors[n]]), None),
+    'sponsor-filter': lambda f, n: ('GET', reverse('sponsor-filter'), [
+        '?progress=Tasdiqlangan', '?search=Karimov', '?sponsor_status=YURIDIK+SHAXS', '',
+    ][n % 4]),
+    'sponsor-student': lambda f, n: ('POST', reverse('sponsor-student'), {
+        'sponsor': f.sponsor.pk, 'student': f.pick(f.students, n), 'amount': '1.00',
+    }),
+    'sponsor-student-bulk': lambda f, n: ('POST', reverse('sponsor-student-bulk'), {
+        'allocations': [
+            {'sponsor': f.sponsor.pk, 'student': f.pick(f.students, n + i), 'amount': '1.00'} for i in range(10)
+        ],
+    }),
+    'sponsor-student-match': lambda f, n: ('POST', reverse('sponsor-student-match'), {
+        'policy': ['most_in_need', 'fewest_splits', 'same_university'][n % 3],
+    }),
+    'sponsor-student-filter': lambda f, n: ('GET', reverse('sponsor-student-filter'), [
+        f"?sponsor={f.pick(f.sponsor_pks, n)}", '?search=Rahimov', '',
+    ][n % 3]),
+    'student-list': lambda f, n: ('GET', reverse('student-list'), ['', '?page_size=100'][n % 2]),
+    'student-detail': lambda f, n: ('GET', reverse('student-detail', args=[f.pick(f.students, n)]), ''),
+    'student-create': lambda f, n: ('POST', reverse('student-create'), {
+        'full_name': f"{f.tag}-c{n}", 'degree': Student.StudentTypes.BACHELOR,
+        'contract_price': '1000000', 'university': f.university.pk,
+    }),
+    'student-update': lambda f, n: ('POST', reverse('student-update', args=[f.students[-1]]), {
+        'full_name': f"{f.tag}-u{n}", 'degree': Student.StudentTypes.MASTER,
+        'contract_price': '1000000000', 'university': f.university.pk,
+    }),
+    'student-delete': lambda f, n: ('DELETE', reverse('student-delete', args=[f.disposable_students[n]]), None),
+    'student-filter': lambda f, n: ('GET', reverse('student-filter'), [
+        '?degree=master', '?search=Aziz', f"?university={f.pick(f.university_pks or [f.university.pk], n)}",
+    ][n % 3]),
+    'total-payment': lambda f, n: ('GET', reverse('total-payment'), ''),
+    'stats-timeseries': lambda f, n: ('GET', reverse('stats-timeseries'), [
+        '', '?bucket=week', '?metric=signups&bucket=day', f"?university={f.university.pk}&degree=bachelor",
+    ][n % 4]),
+    'stats-universities': lambda f, n: ('GET', reverse('stats-universities'), [
+        '', '?degree=master', f"?university={f.pick(f.university_pks or [f.university.pk], n)}",
+    ][n % 3]),
+    'export-create': lambda f, n: ('POST', reverse('export-create'), {
+        'kind': ExportJob.Kind.SPONSORS, 'format': ExportJob.Format.CSV, 'filters': {'progress': 'Tasdiqlangan'},
+    }),
+    'export-detail': lambda f, n: ('GET', reverse('export-detail', args=[f.export.pk]), ''),
+    'export-download': lambda f, n: ('GET', reverse('export-download', args=[f.export.pk]), ''),
+}
+
+
+def route_names():
+    from api.urls import urlpatterns
+    return [pattern.name for pattern in urlpatterns if pattern.name]
+
+
+def async_scenario(name):
+    """
+    ``SCENARIOS[name]`` pointed at the async view of the same name, or
+    unchanged when there is none.
+    """
+    from api.async_urls import app_name, urlpatterns
+    scenario = SCENARIOS[name]
+    if name not in {pattern.name for pattern in urlpatterns}:
+        return scenario
+
+    def build(fixture, n):
+        method, path, data = scenario(fixture, n)
+        return method, reverse(f'{app_name}:{name}', kwargs=resolve(path).kwargs), data
+    return build
+
+
+class InProcessClient:
+    """
+    Django's test client; the full middleware stack runs, no network.
+    """
+
+    def __init__(self, headers=None):
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host and not host.startswith('.')),
+                    'localhost')
+        self.client = Client(HTTP_HOST=host, raise_request_exception=False, headers=headers)
+
+    def request(self, method, path, data):
+        if method == 'GET':
+            response = self.client.get(path + data)
+        else:
+            body = json.dumps(data) if data is not None else ''
+            response = self.client.generic(method, path, body, content_type='application/json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        return response.status_code
+
+    def close(self):
+        connection.close()
+
+
+class HttpClient:
+    """
+    One keep-alive connection per thread to a running server.
+    """
+
+    def __init__(self, base_url, headers=None):
+        self.headers = dict(headers or {})
+        parts = urlsplit(base_url)
+        self.prefix = parts.path.rstrip('/')
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=60)
+
+    def request(self, method, path, data):
+        headers, body = dict(self.headers), None
+        if method == 'GET':
+            path += data
+        elif data is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(data)
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return 0
+
+    def close(self):
+        self.connection.close()
+
+
+class AsgiClient:
+    """
+    Django's async test client: requests go through the ASGI handler and
+    share this process's event loop. ``ALLOWED_HOSTS`` must accept
+    ``testserver``, which it always sends.
+    """
+
+    def __init__(self, headers=None):
+        self.client = AsyncClient(raise_request_exception=False, headers=headers)
+
+    async def request(self, method, path, data):
+        if method == 'GET':
+            response = await self.client.get(path + data)
+        else:
+            body = json.dumps(data) if data is not None else ''
+            response = await self.client.generic(method, path, body, content_type='application/json')
+        if response.streaming:
+            if response.is_async:
+                async for _ in response.streaming_content:
+                    pass
+            else:
+                for _ in response.streaming_content:
+                    pass
+        return response.status_code
+
+
+def run_endpoint(scenario, fixture, client_factory, requests, concurrency, warmup=0):
+    """
+    Sends ``warmup + requests`` requests from ``concurrency`` threads and
+    returns the summary of the measured ones.
+    """
+    total = warmup + requests
+    numbers = itertools.count()
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def worker():
+        client = client_factory()
+        own_latencies, own_statuses = [], Counter()
+        try:
+            while True:
+                n = next(numbers)
+                if n >= total:
+                    break
+                method, path, data = scenario(fixture, n)
+                started = time.perf_counter()
+                status = client.request(method, path, data)
+                elapsed = time.perf_counter() - started
+                if n >= warmup:
+                    own_latencies.append(elapsed)
+                    own_statuses[status] += 1
+        finally:
+            client.close()
+            with lock:
+                latencies.extend(own_latencies)
+                statuses.update(own_statuses)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def arun_endpoint(scenario, fixture, client_factory, requests, concurrency, warmup=0):
+    """
+    ``run_endpoint`` with ``concurrency`` coroutines on one event loop
+    instead of threads.
+    """
+    total = warmup + requests
+    numbers = itertools.count()
+    latencies, statuses = [], Counter()
+
+    async def worker():
+        client = client_factory()
+        while (n := next(numbers)) < total:
+            method, path, data = scenario(fixture, n)
+            started = time.perf_counter()
+            status = await client.request(method, path, data)
+            elapsed = time.perf_counter() - started
+            if n >= warmup:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def percentile(ordered, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies, statuses, elapsed):
+    ordered = sorted(latencies)
+    milliseconds = lambda value: round(value * 1000, 3)
+    return {
+        'requests': len(ordered),
+        'errors': sum(count for status, count in statuses.items() if not 200 <= status < 400),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': milliseconds(percentile(ordered, 50)),
+        'p95_ms': milliseconds(percentile(ordered, 95)),
+        'p99_ms': milliseconds(percentile(ordered, 99)),
+        'mean_ms': milliseconds(sum(ordered) / len(ordered)) if ordered else 0.0,
+        'max_ms': milliseconds(ordered[-1]) if ordered else 0.0,
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(baseline, current, threshold=0.1, min_delta_ms=1.0):
+    """
+    Compares two benchmark results endpoint by endpoint. A latency
+    percentile regresses when it grows by more than ``threshold`` (a
+    fraction) and by more than ``min_delta_ms``; throughput regresses when
+    it drops by more than ``threshold``; any new errors are a regression.
+
+    Returns a list of ``(endpoint, metric, before, after, change, regressed)``.
+    """
+    rows = []
+    before_endpoints, after_endpoints = baseline['endpoints'], current['endpoints']
+    for name in sorted(before_endpoints.keys() & after_endpoints.keys()):
+        before, after = before_endpoints[name], after_endpoints[name]
+        for metric in LATENCY_METRICS:
+            change = (after[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            regressed = change > threshold and after[metric] - before[metric] > min_delta_ms
+            rows.append((name, metric, before[metric], after[metric], change, regressed))
+
+        rps_before, rps_after = before['throughput_rps'], after['throughput_rps']
+        change = (rps_after - rps_before) / rps_before if rps_before else 0.0
+        rows.append((name, 'throughput_rps', rps_before, rps_after, change, change < -threshold))
+
+        error_rate = lambda result: result['errors'] / result['requests'] if result['requests'] else 0.0
+        rows.append((name, 'errors', before['errors'], after['errors'],
+                     error_rate(after) - error_rate(before), error_rate(after) > error_rate(before)))
+    return rows
@@ -0,0 +1,143 @@
+"""
+Response cache for read endpoints on Django's cache framework.
+
+Every model has a version number in the cache. A cached response is keyed by
+the versions of the models it was built from plus the request path and media
+type, so ``invalidate()`` only has to bump a version: old entries are never
+looked up again and expire on their own. Versions live in the same cache as
+the responses, so a shared backend (file, memcached, redis) keeps every
+worker in step; the local-memory backend is per process.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from .metrics import RESPONSE_CACHE
+from .routers import current_replica
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def version_key(label):
+    return f"api:version:{label}"
+
+
+def get_versions(labels):
+    cache = get_cache()
+    keys = [version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh, unguessable start: after an eviction the counter must not
+            # fall back to a value that older entries were stored under.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(labels):
+    cache = get_cache()
+    for label in labels:
+        key = version_key(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*models):
+    """
+    Drops every cached response built from ``models`` (classes or
+    ``app_label.Model`` labels) once the current transaction commits; until
+    then other requests still see, and may cache, the old rows.
+    """
+    labels = [model if isinstance(model, str) else model._meta.label for model in models]
+    transaction.on_commit(lambda: bump(labels))
+
+
+class CachedResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class CachedResponseMixin:
+    """
+    Serves ``GET`` responses from the cache. ``cache_models`` lists the
+    models (labels) the response is built from; saving or deleting any of
+    them invalidates it. Entries are checked after authentication and
+    content negotiation, and are stored with their ETag, so a hit can also
+    answer ``304 Not Modified`` without touching the database.
+    ``cache_timeout`` overrides ``RESPONSE_CACHE_TIMEOUT`` for one view.
+    """
+    cache_models = ()
+    cache_timeout = None
+
+    def cache_enabled(self, request):
+        if not getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300) or request.method not in ('GET', 'HEAD'):
+            return False
+        # Streamed responses are never cached.
+        wants_stream = getattr(self, 'wants_stream', None)
+        return not (wants_stream and wants_stream(request))
+
+    def get_cache_key(self, request):
+        versions = get_versions(self.cache_models)
+        path = hashlib.md5(
+            f"{request.get_full_path()}|{request.accepted_media_type}".encode(), usedforsecurity=False
+        ).hexdigest()
+        name = f"{type(self).__module__}.{type(self).__qualname__}"
+        return f"api:response:{name}:{'.'.join(map(str, versions))}:{path}"
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        if not self.cache_enabled(request):
+            return
+
+        view_name = request.resolver_match.view_name if request.resolver_match else type(self).__name__
+        self.response_cache_key = self.get_cache_key(request)
+        entry = get_cache().get(self.response_cache_key)
+        RESPONSE_CACHE.inc(view=view_name, result='hit' if entry is not None else 'miss')
+        if entry is not None:
+            self.response_cache_key = None
+            raise CachedResponse(self.build_cached_response(request, entry))
+
+    def build_cached_response(self, request, entry):
+        headers = entry['headers']
+        last_modified = parse_http_date_safe(headers['Last-Modified']) if 'Last-Modified' in headers else None
+        response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(entry['content'])
+        for header, value in headers.items():
+            if header != 'Content-Type' or response.status_code == 200:
+                response.headers[header] = value
+        return response
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CachedResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key and response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(lambda rendered: self.store(key, rendered))
+        return response
+
+    def store(self, key, response):
+        entry = {
+            'content': response.content,
+            'headers': {header: response.headers[header] for header in CACHED_HEADERS if header in response.headers},
+        }
+        timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        if current_replica() is not None:
+            timeout = min(timeout, getattr(settings, 'REPLICA_CACHE_TIMEOUT', 5))
+        get_cache().set(key, entry, timeout)
@@ -0,0 +1,126 @@
+"""
+Conditional GET for read endpoints.
+
+A view computes cheap validators for what it would return: the newest
+``updated_at`` and row count of a list, or the ``updated_at`` of a single
+row. When the client's ``If-None-Match``/``If-Modified-Since`` still match,
+the view answers ``304 Not Modified`` before the handler runs, so nothing is
+fetched or serialized. Related rows the response embeds (``?expand=``, i.e.
+the queryset's ``select_related()``) count too: their newest ``updated_at``
+is part of the validators.
+"""
+import hashlib
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def embedded_relations(queryset):
+    """
+    The ``select_related()`` paths of ``queryset`` whose model has an
+    ``updated_at``, e.g. ``['student', 'student__university']``.
+    """
+    def walk(model, tree, prefix):
+        for name, subtree in tree.items():
+            related = model._meta.get_field(name).related_model
+            try:
+                related._meta.get_field('updated_at')
+            except FieldDoesNotExist:
+                pass
+            else:
+                yield prefix + name
+            yield from walk(related, subtree, f'{prefix}{name}__')
+
+    tree = queryset.query.select_related
+    return list(walk(queryset.model, tree, '')) if isinstance(tree, dict) else []
+
+
+def collection_validators(queryset):
+    """
+    Validators of a list: newest ``updated_at`` (of the rows and of what
+    they embed) and row count in one aggregate. Deleting a row leaves
+    ``max(updated_at)`` unchanged, so only the count notices it; for the
+    same reason lists get no Last-Modified.
+    """
+    related = embedded_relations(queryset)
+    state = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'), count=Count('pk'),
+        **{f'{path}__last_modified': Max(f'{path}__updated_at') for path in related},
+    )
+    return (state['last_modified'], state['count'], *(state[f'{path}__last_modified'] for path in related)), None
+
+
+def row_validators(queryset):
+    """
+    Validators of a single row and what it embeds, or ``None`` when it
+    does not exist.
+    """
+    related = embedded_relations(queryset)
+    row = queryset.values_list('updated_at', *(f'{path}__updated_at' for path in related)).first()
+    if row is None:
+        return None
+    return row, max(value for value in row if value is not None)
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified handling to ``GET`` and ``HEAD``.
+
+    ``get_validators()`` returns ``(etag_parts, last_modified)`` or ``None``
+    to skip. By default it aggregates ``get_conditional_queryset()``, which
+    for generic views is the filtered queryset. The ETag also covers the
+    full path and negotiated media type, as both change the response body.
+    """
+
+    def get_conditional_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self, request, *args, **kwargs):
+        return collection_validators(self.get_conditional_queryset())
+
+    def get_etag(self, request, parts):
+        key = repr((request.get_full_path(), request.accepted_media_type) + tuple(parts))
+        return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_headers = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return
+        parts, last_modified = validators
+        etag = self.get_etag(request, parts)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        headers = {'ETag': etag}
+        if timestamp is not None:
+            headers['Last-Modified'] = http_date(timestamp)
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            if response.status_code == 304:
+                for header, value in headers.items():
+                    response.headers[header] = value
+            raise NotModified(response)
+        self.conditional_headers = headers
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        headers = getattr(self, 'conditional_headers', None)
+        if headers and response.status_code == 200:
+            for header, value in headers.items():
+                response.headers.setdefault(header, value)
+        return response
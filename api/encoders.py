@@ -0,0 +1,187 @@
+"""
+Read-only fast path for the list endpoints.
+
+A ``ModelSerializer`` builds a model instance per row and then calls every
+field's ``get_attribute`` and ``to_representation``. ``RowEncoder`` is
+compiled once from a serializer instead: it reads the serializer's columns
+with ``.values_list()`` and turns each tuple into the same dict in a single
+generated function, applying only the conversions that change a value
+(``Decimal`` places, ``DATETIME_FORMAT`` in the current time zone, choices).
+The JSON renderer then sees exactly what the serializer would have produced,
+so responses are byte for byte the same.
+"""
+import decimal
+import threading
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .fieldsets import FieldsetMixin
+from .instrumentation import measure_serializer
+
+# Fields whose ``to_representation`` returns database values unchanged.
+PASSTHROUGH = {
+    serializers.IntegerField.to_representation,
+    serializers.CharField.to_representation,
+    serializers.BooleanField.to_representation,
+}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def compile_converter(field):
+    """
+    A function doing ``field.to_representation`` for a non-null column
+    value, or ``None`` when the value is used as it is.
+    """
+    to_representation = type(field).to_representation
+    if to_representation in PASSTHROUGH:
+        return None
+    if to_representation is PrimaryKeyRelatedField.to_representation:
+        if field.pk_field is not None:
+            raise Unsupported(field.field_name)
+        return None
+    if to_representation is serializers.ChoiceField.to_representation:
+        choices = field.choice_strings_to_values
+        return lambda value: value if value == '' else choices.get(str(value), value)
+    if to_representation is serializers.DecimalField.to_representation:
+        coerce = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce or field.localize or field.normalize_output or field.decimal_places is None:
+            return field.to_representation
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+
+        def convert_decimal(value):
+            if not isinstance(value, decimal.Decimal):
+                return field.to_representation(value)
+            return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+        return convert_decimal
+    if to_representation is serializers.DateTimeField.to_representation:
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if output_format is None or output_format.lower() == ISO_8601:
+            return field.to_representation
+        enforce_timezone = field.enforce_timezone
+        # ``to_representation`` maps every falsy value to ``None``.
+        return lambda value: enforce_timezone(value).strftime(output_format) if value else None
+    return field.to_representation
+
+
+class RowEncoder:
+    """
+    ``serializer``'s output for rows read with ``.values_list(*columns)``.
+    Raises ``Unsupported`` for serializers with fields that are not plain
+    model columns (method fields, dotted sources, many-to-many, ...).
+    """
+
+    def __init__(self, serializer):
+        self.columns = []
+        self.namespace = {}
+        expression = self.compile(serializer, '')
+        source = f"def encode(row):\n    return {expression}\n"
+        exec(compile(source, f"<{type(serializer).__name__} row encoder>", 'exec'), self.namespace)
+        self.encode = self.namespace['encode']
+
+    def column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return f"row[{self.columns.index(path)}]"
+
+    def compile(self, serializer, prefix):
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        if model is None:
+            raise Unsupported(type(serializer).__name__)
+        items = []
+        for field in serializer._readable_fields:
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise Unsupported(field.field_name)
+            if not model_field.concrete or model_field.many_to_many:
+                raise Unsupported(field.field_name)
+
+            value = self.column(prefix + model_field.name)
+            if isinstance(field, serializers.BaseSerializer):
+                expression = self.compile(field, f"{prefix}{model_field.name}__")
+            else:
+                convert = compile_converter(field)
+                if convert is None:
+                    items.append(f"{field.field_name!r}: {value}")
+                    continue
+                name = f"convert_{len(self.namespace)}"
+                self.namespace[name] = convert
+                expression = f"{name}({value})"
+            # Serializers render a null attribute as null without converting it.
+            items.append(f"{field.field_name!r}: None if {value} is None else {expression}")
+        return '{' + ', '.join(items) + '}'
+
+    def encode_rows(self, rows):
+        encode = self.encode
+        with measure_serializer():
+            return [encode(row) for row in rows]
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_row_encoder(serializer):
+    """
+    The cached ``RowEncoder`` for ``serializer``'s class and fieldset, or
+    ``None`` when it needs the serializer.
+    """
+    key = (type(serializer), frozenset(getattr(serializer, 'requested_fields', ())),
+           frozenset(getattr(serializer, 'expand', ())))
+    try:
+        return _encoders[key]
+    except KeyError:
+        pass
+    try:
+        encoder = RowEncoder(serializer)
+    except Unsupported:
+        encoder = None
+    with _encoders_lock:
+        return _encoders.setdefault(key, encoder)
+
+
+class RowEncoderMixin(FieldsetMixin):
+    """
+    Serves list pages and streams through ``RowEncoder`` when the serializer
+    allows it (and ``FAST_LIST_SERIALIZATION`` is on), and through the
+    serializer otherwise. Place it before ``StreamingListMixin``.
+    """
+
+    def get_rows(self, queryset, serializer_class):
+        """
+        Returns ``(rows, encoder)``: ``.values_list()`` rows of ``queryset``
+        and their encoder, or ``queryset`` itself and ``None``.
+        """
+        if not getattr(settings, 'FAST_LIST_SERIALIZATION', True):
+            return queryset, None
+        encoder = get_row_encoder(self.get_fieldset_serializer(serializer_class))
+        if encoder is None:
+            return queryset, None
+        # Pagination reads the cursor key from each row by name.
+        keys = [key for key in self.get_key_fields(queryset) if key not in encoder.columns]
+        return queryset.values_list(*encoder.columns, *keys, named=True), encoder
+
+    def serialize_rows(self, rows, serializer_class, encoder):
+        if encoder is not None:
+            return encoder.encode_rows(rows)
+        return serializer_class(rows, many=True, context=self.get_fieldset_context()).data
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_stream(request):
+            return super().list(request, *args, **kwargs)
+        serializer_class = self.get_serializer_class()
+        rows, encoder = self.get_rows(self.filter_queryset(self.get_queryset()), serializer_class)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(self.serialize_rows(rows, serializer_class, encoder))
+        return self.get_paginated_response(self.serialize_rows(page, serializer_class, encoder))
@@ -0,0 +1,175 @@
+import csv
+import glob
+import gzip
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+from .models import ExportJob
+
+# Referenced by path because the views module itself imports this one.
+EXPORT_VIEWS = {
+    ExportJob.Kind.SPONSORS: 'api.views.SponsorFilterAPIView',
+    ExportJob.Kind.STUDENTS: 'api.views.StudentFilterAPIView',
+    ExportJob.Kind.ALLOCATIONS: 'api.views.StudentSponsorFilterAPIView',
+}
+CHUNK_SIZE = 2000
+# Chunks written between two heartbeats of a running job.
+HEARTBEAT_CHUNKS = 5
+
+
+class JobReclaimed(Exception):
+    pass
+
+
+def filtered_queryset(kind, filters):
+    """
+    Runs ``filters`` (query parameters) through the same filter backends as
+    the matching filter endpoint, so an export returns exactly what the API
+    would. Invalid filters raise DRF's ``ValidationError``.
+    """
+    view_class = import_string(EXPORT_VIEWS[kind])
+    request = Request(RequestFactory().get('/', filters))
+    view = view_class(request=request, format_kwarg=None, args=(), kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def export_columns(kind):
+    serializer_class = import_string(EXPORT_VIEWS[kind]).serializer_class
+    fields = serializer_class.Meta.fields
+    if fields == '__all__':
+        fields = [field.name for field in serializer_class.Meta.model._meta.concrete_fields]
+    return list(fields)
+
+
+def write_csv(handle, columns, rows):
+    writer = csv.writer(handle)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row])
+        count += 1
+    return count
+
+
+def write_ndjson(handle, columns, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    count = 0
+    for row in rows:
+        handle.write(encoder.encode(dict(zip(columns, row))))
+        handle.write('\n')
+        count += 1
+    return count
+
+
+WRITERS = {
+    ExportJob.Format.CSV: write_csv,
+    ExportJob.Format.NDJSON: write_ndjson,
+}
+
+
+def beat(job):
+    """
+    Records that this attempt at ``job`` is alive. Raises ``JobReclaimed``
+    when the job was handed to another worker meanwhile.
+    """
+    job.heartbeat_at = timezone.now()
+    updated = ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.Status.RUNNING, started_at=job.started_at,
+    ).update(heartbeat_at=job.heartbeat_at)
+    if not updated:
+        raise JobReclaimed(f"Export #{job.pk} was taken over by another worker.")
+
+
+def with_heartbeat(job, rows):
+    every = CHUNK_SIZE * HEARTBEAT_CHUNKS
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count % every == 0:
+            beat(job)
+
+
+def write_export(job):
+    """
+    Streams the job's rows into ``MEDIA_ROOT/exports/`` as a gzip file and
+    returns ``(row_count, storage_name)``. Rows come through
+    ``iterator()``, which uses a server-side cursor on PostgreSQL, so the
+    table is never held in memory; every ``HEARTBEAT_CHUNKS`` chunks the
+    job's heartbeat is refreshed.
+    """
+    columns = export_columns(job.kind)
+    rows = filtered_queryset(job.kind, job.filters).order_by('pk').values_list(*columns)
+
+    name = f"exports/{job.kind}-{job.pk}.{job.format}.gz"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Left behind by earlier attempts whose worker was killed.
+    for stale in glob.glob(glob.escape(path) + '.*.part'):
+        os.remove(stale)
+    partial = f"{path}.{job.started_at:%Y%m%d%H%M%S%f}.part"
+    try:
+        with gzip.open(partial, 'wt', encoding='utf-8', newline='') as handle:
+            count = WRITERS[job.format](handle, columns, with_heartbeat(job, rows.iterator(chunk_size=CHUNK_SIZE)))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return count, name
+
+
+def claim_next_job():
+    """
+    Marks the oldest pending job as running and returns it. ``SKIP LOCKED``
+    lets several workers poll the same table without handing out a job twice.
+
+    A running job without a heartbeat for ``EXPORT_JOB_TIMEOUT`` seconds
+    lost its worker and is claimed again, unless it already had
+    ``EXPORT_JOB_MAX_ATTEMPTS`` attempts (say it runs out of memory every
+    time); then it is marked failed.
+    """
+    now = timezone.now()
+    stale = Q(status=ExportJob.Status.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT))
+    ExportJob.objects.filter(stale, attempts__gte=settings.EXPORT_JOB_MAX_ATTEMPTS).update(
+        status=ExportJob.Status.FAILED, finished_at=now,
+        error=f"The export worker stopped during each of {settings.EXPORT_JOB_MAX_ATTEMPTS} attempts.",
+    )
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ExportJob.Status.PENDING) | stale)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.Status.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+    return job
+
+
+def process_job(job):
+    """
+    Writes the export and records the outcome, unless the job was claimed
+    again meanwhile (this attempt missed its heartbeats); the newer
+    attempt's result is the one kept.
+    """
+    try:
+        job.row_count, job.file.name = write_export(job)
+        job.status = ExportJob.Status.DONE
+    except Exception as error:
+        job.status = ExportJob.Status.FAILED
+        job.error = str(error)
+    job.finished_at = timezone.now()
+    ExportJob.objects.filter(pk=job.pk, status=ExportJob.Status.RUNNING, started_at=job.started_at).update(
+        row_count=job.row_count, file=job.file.name, status=job.status, error=job.error, finished_at=job.finished_at,
+    )
+    return job
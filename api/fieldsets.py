@@ -0,0 +1,130 @@
+"""
+Sparse fieldsets and expansion for the read endpoints.
+
+``?fields=id,full_name`` limits every row to the listed fields and
+``?expand=sponsor,student`` renders those foreign keys as nested objects
+instead of ids. Expansion applies at every level, so
+``?expand=student,university`` also expands each student's university.
+``FieldsetMixin`` turns both into the query: only the rendered columns are
+loaded (``.only()``) and expanded relations are joined in
+(``select_related()``), so an expansion costs no query per row.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class DynamicFieldsMixin:
+    """
+    Model serializer side. ``fields`` and ``expand`` come from the keyword
+    arguments or, for the top-level serializer, from the request in the
+    context. ``expandable_fields`` maps a relation to the serializer it
+    expands into.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            if fields is None:
+                fields = split_names(request.query_params.get('fields'))
+            if expand is None:
+                expand = split_names(request.query_params.get('expand'))
+        self.requested_fields = set(fields or ())
+        self.expand = set(expand or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.expand & fields.keys() & self.expandable_fields.keys():
+            fields[name] = self.expandable_fields[name](expand=self.expand, read_only=True)
+        if self.requested_fields:
+            unknown = self.requested_fields - fields.keys()
+            if unknown:
+                raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            fields = {name: field for name, field in fields.items() if name in self.requested_fields}
+        return fields
+
+
+def query_plan(serializer, prefix=''):
+    """
+    Returns ``(only, related, expanded)`` for the rows ``serializer``
+    renders: the columns to load (``None`` when a field is not a plain model
+    column and every column is needed), the relations to join and the
+    expanded field names.
+    """
+    model = serializer.Meta.model
+    only, related, expanded = set(), [], set()
+    for name, field in serializer.fields.items():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is None or not model_field.concrete or model_field.many_to_many:
+            only = None
+            continue
+        if only is not None:
+            only.add(prefix + model_field.name)
+        if isinstance(field, DynamicFieldsMixin):
+            path = prefix + model_field.name
+            nested_only, nested_related, nested_expanded = query_plan(field, path + '__')
+            related += [path] + nested_related
+            expanded |= {name} | nested_expanded
+            if only is not None and nested_only is not None:
+                only |= nested_only
+            else:
+                only = None
+    return only, related, expanded
+
+
+class FieldsetMixin:
+    """
+    Applies the request's fieldset to list and detail querysets. Generic
+    views get it on ``filter_queryset()``; plain ``APIView`` handlers call
+    ``get_fieldset_queryset()`` themselves and pass ``get_fieldset_context()``
+    to the serializer.
+    """
+
+    def get_fieldset_context(self):
+        return {'request': self.request, 'view': self}
+
+    def get_fieldset_serializer(self, serializer_class):
+        """
+        An unbound ``serializer_class`` with the request's fieldset, made once
+        per request and class.
+        """
+        serializers = self.__dict__.setdefault('_fieldset_serializers', {})
+        if serializer_class not in serializers:
+            serializers[serializer_class] = serializer_class(context=self.get_fieldset_context())
+        return serializers[serializer_class]
+
+    def get_key_fields(self, queryset):
+        """
+        Columns pagination and streaming order by.
+        """
+        keys = getattr(getattr(self, 'pagination_class', None), 'cursor_fields', ())
+        columns = {field.name for field in queryset.model._meta.concrete_fields}
+        keys = [key for key in keys if key in columns]
+        if 'search_rank' in queryset.query.annotations:
+            keys.append('search_rank')
+        return keys
+
+    def get_fieldset_queryset(self, queryset, serializer_class):
+        serializer = self.get_fieldset_serializer(serializer_class)
+        only, related, expanded = query_plan(serializer)
+        unknown = serializer.expand - expanded
+        if unknown:
+            raise ValidationError({'expand': f"Cannot expand: {', '.join(sorted(unknown))}."})
+        if related:
+            queryset = queryset.select_related(*related)
+        if only is not None:
+            # Deferred keys would cost a query per row.
+            only |= {key for key in self.get_key_fields(queryset) if key != 'search_rank'}
+            queryset = queryset.only(*only)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.get_fieldset_queryset(super().filter_queryset(queryset), self.get_serializer_class())
@@ -0,0 +1,78 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 is tens of milliseconds of CPU per call. ``amake_password`` and
+``acheck_password`` run it on a pool of ``PASSWORD_HASHING_WORKERS`` threads
+(hashlib releases the GIL while hashing, so threads use every core) and
+refuse with ``503`` once ``PASSWORD_HASHING_QUEUE`` more calls are waiting,
+so a burst of logins cannot pile up behind the rest of the API.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the cost taken from
+    ``PASSWORD_HASH_ITERATIONS``. Stored hashes keep the iteration count
+    they were made with, so changing it never breaks existing passwords.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins in progress, try again shortly."
+    default_code = 'hashing_busy'
+
+
+class HashingPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.pending = 0
+
+    @property
+    def workers(self):
+        return getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+
+    @property
+    def limit(self):
+        return self.workers + getattr(settings, 'PASSWORD_HASHING_QUEUE', 64)
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hashing')
+            return self._executor
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.limit:
+                raise HashingBusy()
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.get_executor(), func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+pool = HashingPool()
+
+
+async def amake_password(password):
+    return await pool.run(hashers.make_password, password)
+
+
+async def acheck_password(password, encoded):
+    return await pool.run(hashers.check_password, password, encoded)
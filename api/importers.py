@@ -0,0 +1,238 @@
+"""
+Bulk loading of student rosters and sponsor lists from CSV or XLSX files.
+
+Rows are read lazily and handled ``batch_size`` at a time: every row is
+validated on its own, then the batch is checked against the database with a
+single query and inserted with one ``bulk_create`` in its own transaction.
+Invalid rows are reported by file line and skipped.
+"""
+import codecs
+import csv
+from decimal import Decimal
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .cache import invalidate
+from .models import University, Student, Sponsor, TotalPayment, SponsorDailyRollup
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def read_csv(file):
+    reader = csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+    if not reader.fieldnames:
+        raise ImportFormatError("The file is empty.")
+    yield from reader
+
+
+def read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("Reading .xlsx files needs openpyxl (pip install openpyxl).")
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError("The file is empty.")
+        header = [str(cell).strip() if cell is not None else '' for cell in header]
+        for row in rows:
+            yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, name):
+    """
+    Yields the data rows of ``file`` (opened in binary mode) as dicts keyed by
+    the header row. The format is picked from the extension of ``name``.
+    """
+    extension = name.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return read_csv(file)
+    if extension == 'xlsx':
+        return read_xlsx(file)
+    raise ImportFormatError("Only .csv and .xlsx files can be imported.")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def clean_value(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+class BaseImporter:
+    """
+    Subclasses set ``model`` and ``fields`` (the columns read from the file)
+    and may extend ``build``, ``check_batch`` and ``insert``.
+    """
+    model = None
+    fields = ()
+    required_fields = ()
+    exclude_from_validation = ()
+
+    def __init__(self, batch_size=1000, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    def run(self, rows):
+        """
+        Imports ``rows`` and returns ``(created, errors)``, where ``errors``
+        maps the file line number (the header is line 1) to an error dict.
+        """
+        created, errors = 0, {}
+        for number, batch in enumerate(batched(enumerate(rows, start=2), self.batch_size)):
+            if number == 0:
+                self.check_columns(batch[0][1])
+            instances = []
+            for line, row in batch:
+                try:
+                    instances.append((line, self.build({field: clean_value(row.get(field)) for field in self.fields})))
+                except ValidationError as error:
+                    errors[line] = error.message_dict
+            instances = self.check_batch(instances, errors)
+            if instances and not self.dry_run:
+                self.insert([instance for _, instance in instances])
+            created += len(instances)
+        return created, errors
+
+    def check_columns(self, row):
+        missing = [field for field in self.required_fields if field not in row]
+        if missing:
+            raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+
+    def build(self, values):
+        instance = self.model(**values)
+        instance.clean_fields(exclude=self.exclude_from_validation)
+        return instance
+
+    def check_batch(self, instances, errors):
+        return instances
+
+    def insert(self, instances):
+        with transaction.atomic():
+            self.model.objects.bulk_create(instances)
+            invalidate(self.model)
+            total = sum((getattr(instance, self.model.summary_field) for instance in instances), Decimal(0))
+            TotalPayment.objects.apply_delta(**{self.model.summary_total: total})
+
+
+class StudentImporter(BaseImporter):
+    """
+    ``university`` holds the university name; names are resolved through
+    one lookup table loaded up front. Unknown names are errors unless
+    ``create_universities`` is set.
+    """
+    model = Student
+    fields = ('full_name', 'degree', 'contract_price', 'university')
+    required_fields = fields
+    # Resolved from the lookup table; validating it would query once per row.
+    exclude_from_validation = ('university',)
+
+    def __init__(self, create_universities=False, **kwargs):
+        super().__init__(**kwargs)
+        self.create_universities = create_universities
+        self.pending_universities = {}
+        self.universities = {}
+        for pk, name in University.objects.order_by('pk').values_list('pk', 'name'):
+            self.universities.setdefault(name.casefold(), pk)
+
+    def build(self, values):
+        name = values.pop('university')
+        key = name.casefold() if name else None
+        if key in self.universities:
+            values['university_id'] = self.universities[key]
+        elif name and self.create_universities:
+            values['university'] = self.pending_universities.get(key) or University(name=name)
+        else:
+            raise ValidationError({'university': ["Universitet topilmadi!" if name else "Universitet majburiy!"]})
+
+        student = super().build(values)
+        if student.university_id is None:
+            # Only universities of valid rows get created.
+            self.pending_universities.setdefault(key, student.university)
+        return student
+
+    def insert(self, instances):
+        with transaction.atomic():
+            new = [university for university in self.pending_universities.values() if university.pk is None]
+            if new:
+                University.objects.bulk_create(new)
+                invalidate(University)
+                self.universities.update((university.name.casefold(), university.pk) for university in new)
+            super().insert(instances)
+
+
+class SponsorImporter(BaseImporter):
+    """
+    Applies ``Sponsor.normalize()`` to every row, since ``bulk_create``
+    skips ``save()``. Phone numbers must be new: duplicates inside the file
+    and numbers already stored (one query per batch) are rejected.
+    """
+    model = Sponsor
+    fields = ('full_name', 'phone_number', 'amount', 'custom_amount',
+              'is_organization', 'organization_name', 'progress')
+    required_fields = ('full_name', 'phone_number')
+    # Derived by normalize() after the field values have been converted.
+    exclude_from_validation = ('sponsor_status',)
+    booleans = {
+        '1': True, 'true': True, 'yes': True, 'ha': True,
+        '0': False, 'false': False, 'no': False, "yo'q": False,
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.seen_phone_numbers = set()
+
+    def build(self, values):
+        if values['progress'] is None:
+            values['progress'] = Sponsor.StatusChoices.NEW
+        if values['amount'] is None:
+            values['amount'] = Decimal(0)
+        if values['is_organization'] is None:
+            values['is_organization'] = bool(values['organization_name'])
+        elif isinstance(values['is_organization'], str):
+            values['is_organization'] = self.booleans.get(values['is_organization'].lower(), values['is_organization'])
+
+        sponsor = super().build(values)
+        sponsor.normalize()
+        sponsor.clean()
+        if sponsor.amount < 0:
+            raise ValidationError({'amount': ["Homiy summasi manfiy bo'lishi mumkin emas!"]})
+        return sponsor
+
+    def check_batch(self, instances, errors):
+        stored = set(
+            Sponsor.objects.filter(phone_number__in=[sponsor.phone_number for _, sponsor in instances])
+            .values_list('phone_number', flat=True)
+        )
+        accepted = []
+        for line, sponsor in instances:
+            if sponsor.phone_number in stored or sponsor.phone_number in self.seen_phone_numbers:
+                errors[line] = {'phone_number': ["Bu telefon raqami bilan homiy allaqachon mavjud!"]}
+                continue
+            self.seen_phone_numbers.add(sponsor.phone_number)
+            accepted.append((line, sponsor))
+        return accepted
+
+    def insert(self, instances):
+        with transaction.atomic():
+            super().insert(instances)
+            SponsorDailyRollup.objects.record(instances)
+
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'sponsors': SponsorImporter,
+}
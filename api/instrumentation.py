@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """
+    SQL and serializer timings collected for one sampled request.
+    """
+    __slots__ = ('queries', 'db_time', 'serializer_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+
+@contextmanager
+def collect_stats():
+    """
+    Collects stats for the enclosed code. Nested calls share the outer stats,
+    so several middlewares can read the same request's numbers.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def measure_serializer():
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += perf_counter() - started
+
+
+def query_wrapper(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += perf_counter() - started
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver. The wrapper stays on the connection and
+    costs one context variable lookup per query when nothing is sampled.
+    """
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
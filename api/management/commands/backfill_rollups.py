@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from api.models import Sponsor, StudentSponsor, SponsorDailyRollup, AllocationDailyRollup
+
+ROLLUPS = {
+    'sponsors': (SponsorDailyRollup, Sponsor),
+    'allocations': (AllocationDailyRollup, StudentSponsor),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily rollup tables behind the time-series endpoint from the sponsor and "
+        "allocation tables, --chunk-days days per transaction, and reports the days that had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="First day (YYYY-MM-DD); the oldest row's "
+                                                                      "day by default.")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last day (YYYY-MM-DD); today by default.")
+        parser.add_argument('--chunk-days', type=int, default=31)
+        parser.add_argument('--rollup', action='append', choices=list(ROLLUPS),
+                            help="Repeat for several; all of them by default.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the drift, do not write.")
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days must be at least 1.")
+        until = options['until'] or timezone.localdate()
+        for name in options['rollup'] or ROLLUPS:
+            rollup, source = ROLLUPS[name]
+            since = options['since']
+            if since is None:
+                oldest = source.objects.aggregate(oldest=Min('created_at'))['oldest']
+                if oldest is None:
+                    self.stdout.write(f"{name}: nothing to backfill.")
+                    continue
+                since = timezone.localdate(oldest)
+
+            drifted, written, start = set(), 0, since
+            while start <= until:
+                end = min(start + timedelta(days=options['chunk_days'] - 1), until)
+                stored = rollup.objects.stored(start, end)
+                if options['dry_run']:
+                    actual = rollup.objects.compute(start, end)
+                else:
+                    actual = rollup.objects.rebuild(start, end)
+                    written += len(actual)
+                drifted |= {key[0] for key in stored.keys() | actual.keys() if stored.get(key) != actual.get(key)}
+                start = end + timedelta(days=1)
+
+            for day in sorted(drifted)[:10]:
+                self.stdout.write(self.style.WARNING(f"{name}: {day} had drifted"))
+            summary = f"{name}: {since} to {until}, {len(drifted)} drifted days"
+            if options['dry_run']:
+                self.stdout.write(f"{summary}; dry run, rollups left unchanged.")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{summary}, {written} rows written."))
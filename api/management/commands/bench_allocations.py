@@ -0,0 +1,126 @@
+import threading
+import time
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Sum
+from api.models import University, Student, Sponsor, StudentSponsor, TotalPayment
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers one sponsor with concurrent allocations from many threads, reports "
+        "allocations/sec and verifies that every balance adds up afterwards. "
+        "Runs against the configured database and removes its rows when done."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--allocations', type=int, default=100, help="Allocations per thread.")
+        parser.add_argument('--students', type=int, default=20)
+        parser.add_argument('--amount', type=Decimal, default=Decimal('1000.00'), help="Amount of each allocation.")
+        parser.add_argument(
+            '--coverage', type=float, default=0.8,
+            help="Sponsor balance as a share of all attempted allocations; below 1 forces overdraft rejections.",
+        )
+        parser.add_argument('--retries', type=int, default=5, help="Retries for lock timeouts (SQLite).")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark rows.")
+
+    def handle(self, *args, **options):
+        threads, per_thread, amount = options['threads'], options['allocations'], options['amount']
+        attempts = threads * per_thread
+        balance = (amount * attempts * Decimal(str(options['coverage']))).quantize(Decimal('0.01'))
+
+        tag = f"bench-{int(time.time() * 1000)}"
+        university = University.objects.create(name=tag)
+        sponsor = Sponsor.objects.create(
+            full_name=tag, phone_number=tag, amount=balance, is_organization=True,
+            organization_name=tag, progress=Sponsor.StatusChoices.CONFIRMED,
+        )
+        students = [
+            Student.objects.create(
+                full_name=f"{tag}-{i}", degree=Student.StudentTypes.BACHELOR,
+                contract_price=amount * attempts, university=university,
+            )
+            for i in range(options['students'])
+        ]
+
+        results = {'ok': 0, 'rejected': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def worker(offset):
+            outcome = {'ok': 0, 'rejected': 0, 'failed': 0}
+            try:
+                for i in range(per_thread):
+                    student = students[(offset + i) % len(students)]
+                    for attempt in range(options['retries'] + 1):
+                        try:
+                            StudentSponsor(sponsor_id=sponsor.pk, student_id=student.pk, amount=amount).save()
+                            outcome['ok'] += 1
+                        except ValidationError:
+                            outcome['rejected'] += 1
+                        except OperationalError:
+                            if attempt < options['retries']:
+                                time.sleep(0.01 * (attempt + 1))
+                                continue
+                            outcome['failed'] += 1
+                        break
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in outcome.items():
+                        results[key] += value
+
+        close_old_connections()
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            self.report(results, elapsed, attempts)
+            self.verify(sponsor, students, balance, amount, results['ok'])
+        finally:
+            if not options['keep']:
+                sponsor.delete()
+                university.delete()
+
+    def report(self, results, elapsed, attempts):
+        self.stdout.write(f"database: {connection.vendor}")
+        self.stdout.write(f"attempted: {attempts} in {elapsed:.2f}s")
+        self.stdout.write(
+            f"committed: {results['ok']}, rejected overdrafts: {results['rejected']}, failed: {results['failed']}"
+        )
+        self.stdout.write(f"throughput: {attempts / elapsed:.1f} allocations/sec "
+                          f"({results['ok'] / elapsed:.1f} committed/sec)")
+
+    def verify(self, sponsor, students, balance, amount, committed):
+        spent = amount * committed
+        sponsor.refresh_from_db()
+        problems = []
+        if sponsor.amount != balance - spent or sponsor.spent_amount != spent:
+            problems.append(f"sponsor: amount={sponsor.amount}, spent={sponsor.spent_amount}, expected spent={spent}")
+        if sponsor.amount < 0:
+            problems.append(f"sponsor overdrawn: {sponsor.amount}")
+
+        rows = dict(
+            StudentSponsor.objects.filter(sponsor=sponsor).values_list('student').annotate(total=Sum('amount'))
+        )
+        if sum(rows.values(), Decimal(0)) != spent:
+            problems.append(f"allocation rows sum to {sum(rows.values())}, expected {spent}")
+        for student in Student.objects.filter(pk__in=[s.pk for s in students]):
+            if student.allocated_money != rows.get(student.pk, Decimal(0)):
+                problems.append(f"student {student.pk}: allocated={student.allocated_money}, "
+                                f"rows={rows.get(student.pk, Decimal(0))}")
+
+        total_paid, _ = TotalPayment.objects.compute()
+        if TotalPayment.objects.get_summary().total_paid != total_paid:
+            problems.append("TotalPayment summary drifted from the sponsor table")
+
+        if problems:
+            raise CommandError("Balances are inconsistent:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Balances verified: no lost updates, no overdraft."))
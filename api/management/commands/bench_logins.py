@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from api.benchmarks import BENCH_PASSWORD, summarize
+from api.hashing import pool
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends a burst of concurrent logins through the ASGI handler in this one process and reports "
+        "logins/sec, login latency, and the latency of another endpoint probed during the burst. "
+        "Creates its own users and removes them when done."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16, help="Logins in flight at once.")
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--iterations', type=int,
+                            help="PBKDF2 iterations for the run; PASSWORD_HASH_ITERATIONS by default.")
+        parser.add_argument('--probe', default='total-payment',
+                            help="URL name requested once per --probe-interval during the burst.")
+        parser.add_argument('--probe-interval', type=float, default=0.05, help="Seconds between probe requests.")
+
+    def handle(self, *args, **options):
+        # AsyncClient always sends Host: testserver.
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['iterations']:
+            overrides['PASSWORD_HASH_ITERATIONS'] = options['iterations']
+        try:
+            probe_path = reverse(options['probe'])
+        except Exception:
+            raise CommandError(f"Unknown or parametrized URL name: {options['probe']}")
+
+        with override_settings(**overrides):
+            tag = f"bench-{int(time.time() * 1000)}"
+            password_hash = make_password(BENCH_PASSWORD)
+            users = User.objects.bulk_create([
+                User(email=f"{tag}-{i}@bench.local", username=f"{tag}-{i}", password=password_hash)
+                for i in range(options['users'])
+            ])
+            try:
+                logins, probes, elapsed = asyncio.run(self.burst(users, probe_path, options))
+            finally:
+                User.objects.filter(username__startswith=tag).delete()
+
+        self.stdout.write(f"workers: {pool.workers}, queue limit: {pool.limit}, "
+                          f"iterations: {password_hash.split('$')[1]}")
+        self.report('login', summarize(*logins, elapsed))
+        self.report(options['probe'], summarize(*probes, elapsed))
+
+    async def burst(self, users, probe_path, options):
+        client = AsyncClient(raise_request_exception=False)
+        login_path = reverse('login')
+        logins = ([], Counter())
+        probes = ([], Counter())
+        remaining = iter(range(options['logins']))
+        done = asyncio.Event()
+
+        async def timed(results, method, path, data=None):
+            started = time.perf_counter()
+            response = await method(path, data, content_type='application/json') if data else await method(path)
+            results[0].append(time.perf_counter() - started)
+            results[1][response.status_code] += 1
+
+        async def login_worker():
+            for n in remaining:
+                user = users[n % len(users)]
+                await timed(logins, client.post, login_path, {'email': user.email, 'password': BENCH_PASSWORD})
+
+        async def prober():
+            while not done.is_set():
+                await timed(probes, client.get, probe_path)
+                await asyncio.sleep(options['probe_interval'])
+
+        probe_task = asyncio.create_task(prober())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+        return logins, probes, elapsed
+
+    def report(self, name, result):
+        line = (f"{name:<16} {result['requests']:>5} requests  p50 {result['p50_ms']:>9.2f}ms  "
+                f"p95 {result['p95_ms']:>9.2f}ms  {result['throughput_rps']:>8.1f} req/s")
+        if result['errors']:
+            line += f"  errors {result['errors']} {result['statuses']}"
+        self.stdout.write(line)
@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from api.encoders import RowEncoder
+from api.fieldsets import query_plan
+from api.models import Sponsor, Student, StudentSponsor
+from api.serializers import SponsorsSerializer, StudentSerializer, StudentsSponsorsSerializer
+
+TARGETS = {
+    'sponsors': (Sponsor, SponsorsSerializer, {}),
+    'students': (Student, StudentSerializer, {}),
+    'allocations': (StudentSponsor, StudentsSponsorsSerializer, {}),
+    'allocations-expanded': (StudentSponsor, StudentsSponsorsSerializer, {'expand': {'sponsor', 'student', 'university'}}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the serializer path of the list endpoints with the row encoder fast path on "
+        "the newest rows of the configured database: rows/sec for fetch + serialize + render and "
+        "for serialization alone. Fails if the rendered JSON differs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=5, help="Best of this many runs is reported.")
+        parser.add_argument('--target', action='append', choices=list(TARGETS),
+                            help="Repeat for several; all of them by default.")
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        self.stdout.write(f"{'target':<22} {'rows':>6} {'path':<11} {'total rows/s':>13} {'serialize rows/s':>17}")
+        for name in options['target'] or TARGETS:
+            model, serializer_class, kwargs = TARGETS[name]
+            serializer = serializer_class(**kwargs)
+            encoder = RowEncoder(serializer)
+            # The serializer path as the views run it: only the rendered columns, relations joined.
+            only, related, _ = query_plan(serializer)
+            queryset = model.objects.order_by('-created_at', '-id')
+            instances = queryset.select_related(*related)
+            if only is not None:
+                instances = instances.only(*only)
+            instances = instances[:options['rows']]
+            rows = queryset.values_list(*encoder.columns)[:options['rows']]
+
+            def serialize(objects):
+                return serializer_class(objects, many=True, **kwargs).data
+
+            paths = {
+                'serializer': (lambda: list(instances.all()), serialize),
+                'encoder': (lambda: list(rows.all()), encoder.encode_rows),
+            }
+            results, rendered = {}, {}
+            for path, (fetch, convert) in paths.items():
+                total, serializing = [], []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    objects = fetch()
+                    converted = time.perf_counter()
+                    rendered[path] = renderer.render(convert(objects))
+                    finished = time.perf_counter()
+                    total.append(finished - started)
+                    serializing.append(finished - converted)
+                results[path] = (len(objects), min(total), min(serializing))
+
+            if rendered['serializer'] != rendered['encoder']:
+                raise CommandError(f"{name}: the row encoder output differs from the serializer's.")
+            for path, (count, total, serializing) in results.items():
+                self.stdout.write(f"{name:<22} {count:>6} {path:<11} {count / total:>13.0f} {count / serializing:>17.0f}")
+            speedup = results['serializer'][1] / results['encoder'][1]
+            self.stdout.write(f"{'':<22} {'':>6} {'speedup':<11} {speedup:>12.1f}x "
+                              f"{results['serializer'][2] / results['encoder'][2]:>16.1f}x")
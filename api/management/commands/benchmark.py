@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import override_settings
+from django.utils import timezone
+from api.benchmarks import (SCENARIOS, AsgiClient, BenchmarkFixture, HttpClient, InProcessClient, arun_endpoint,
+                            async_scenario, compare, route_names, run_endpoint)
+from api.models import Sponsor, Student, StudentSponsor
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives every endpoint in api/urls.py at the given concurrency and reports p50/p95/p99 "
+        "latency and throughput, optionally saved as a JSON baseline. With --compare BASELINE "
+        "CURRENT it flags regressions between two saved runs instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per endpoint.")
+        parser.add_argument('--endpoints', help="Comma separated URL names; all of api/urls.py by default.")
+        parser.add_argument('--base-url', help="Benchmark a running server, e.g. http://127.0.0.1:8000, "
+                                               "instead of the in-process test client.")
+        parser.add_argument('--asgi', action='store_true',
+                            help="Use the async views under /api/async/ where they exist; in-process requests "
+                                 "go through the ASGI handler with --concurrency coroutines instead of threads.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--auth', action='store_true',
+                            help="Send a bearer token for the benchmark user with every request.")
+        parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'))
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help="Relative change that counts as a regression (0.1 = 10%%).")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help="Ignore latency changes smaller than this, however large relatively.")
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'], options['threshold'], options['min_delta_ms'])
+
+        names = route_names()
+        if options['endpoints']:
+            requested = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+            unknown = set(requested) - set(names)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            names = requested
+        skipped = [name for name in names if name not in SCENARIOS]
+        names = [name for name in names if name in SCENARIOS]
+
+        fixture = BenchmarkFixture(options['warmup'] + options['requests'], seed=options['seed'])
+        # Read when the clients are made, i.e. after setup() issued the token.
+        headers = lambda: {'Authorization': f"Bearer {fixture.access_token}"} if options['auth'] else {}
+        asgi_in_process = options['asgi'] and not options['base_url']
+        if options['base_url']:
+            client_factory = lambda: HttpClient(options['base_url'], headers())
+        elif asgi_in_process:
+            client_factory = lambda: AsgiClient(headers())
+        else:
+            client_factory = lambda: InProcessClient(headers())
+
+        if options['verbosity'] < 2:
+            # Server errors are counted per status; their tracebacks would drown the report.
+            logging.getLogger('django.request').disabled = True
+
+        fixture.setup()
+        results = {}
+        try:
+            close_old_connections()
+            # The async test client always sends Host: testserver.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name in names:
+                    scenario = async_scenario(name) if options['asgi'] else SCENARIOS[name]
+                    args = (scenario, fixture, client_factory,
+                            options['requests'], options['concurrency'], options['warmup'])
+                    if asgi_in_process:
+                        results[name] = asyncio.run(arun_endpoint(*args))
+                    else:
+                        results[name] = run_endpoint(*args)
+                    self.report(name, results[name])
+        finally:
+            fixture.teardown()
+
+        for name in skipped:
+            self.stdout.write(f"{name}: skipped, no scenario")
+
+        if options['output']:
+            data = {'meta': self.meta(options), 'endpoints': results}
+            with open(options['output'], 'w') as handle:
+                json.dump(data, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def report(self, name, result):
+        line = (f"{name:<24} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+                f"p99 {result['p99_ms']:>9.2f}ms  {result['throughput_rps']:>8.1f} req/s")
+        if result['errors']:
+            line += f"  errors {result['errors']} {result['statuses']}"
+        self.stdout.write(line)
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'created_at': timezone.now().isoformat(),
+            'commit': commit,
+            'target': options['base_url'] or 'in-process',
+            'asgi': options['asgi'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'warmup': options['warmup'],
+            'auth': options['auth'],
+            'dataset': {
+                'sponsors': Sponsor.objects.count(),
+                'students': Student.objects.count(),
+                'allocations': StudentSponsor.objects.count(),
+            },
+        }
+
+    def compare(self, baseline_path, current_path, threshold, min_delta_ms):
+        try:
+            with open(baseline_path) as handle:
+                baseline = json.load(handle)
+            with open(current_path) as handle:
+                current = json.load(handle)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read results: {error}")
+
+        for key in ('target', 'asgi', 'database', 'concurrency', 'dataset'):
+            if baseline['meta'].get(key) != current['meta'].get(key):
+                self.stdout.write(self.style.WARNING(
+                    f"{key} differs: {baseline['meta'].get(key)} vs {current['meta'].get(key)}"
+                ))
+
+        regressions = 0
+        for name, metric, before, after, change, regressed in compare(baseline, current, threshold, min_delta_ms):
+            line = f"{name:<24} {metric:<15} {before:>10} -> {after:<10} {change:+.1%}"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"{regressions} regression(s) above {threshold:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
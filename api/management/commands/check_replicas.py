@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.routers import replicas
+
+
+class Command(BaseCommand):
+    help = "Runs the read replica health check and reports the reachability and lag of every replica."
+
+    def handle(self, *args, **options):
+        if not replicas.aliases:
+            self.stdout.write("No replicas configured (DATABASE_REPLICA_URLS).")
+            return
+
+        unhealthy = 0
+        for alias in replicas.aliases:
+            healthy, lag = replicas.check(alias)
+            database = settings.DATABASES[alias]
+            where = f"{database.get('HOST') or ''}/{database.get('NAME')}"
+            lag_text = f"{lag:.1f}s" if lag is not None else "n/a"
+            line = f"{alias:<12} {where:<40} lag {lag_text:<8} {'ok' if healthy else 'UNHEALTHY'}"
+            if healthy:
+                self.stdout.write(line)
+            else:
+                unhealthy += 1
+                self.stdout.write(self.style.ERROR(line))
+        if unhealthy:
+            raise CommandError(f"{unhealthy} of {len(replicas.aliases)} replicas are unhealthy.")
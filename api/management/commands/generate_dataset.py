@@ -0,0 +1,216 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from api.cache import invalidate
+from api.models import (University, Student, Sponsor, StudentSponsor, TotalPayment, SponsorDailyRollup,
+                        AllocationDailyRollup)
+
+FIRST_NAMES = [
+    'Aziz', 'Bekzod', 'Dilshod', 'Jasur', 'Javohir', 'Sardor', 'Otabek', 'Sherzod', 'Ulugbek', 'Shoxrux',
+    'Malika', 'Dilnoza', 'Gulnora', 'Madina', 'Nodira', 'Sevara', 'Zarina', 'Kamola', 'Shahnoza', 'Feruza',
+]
+LAST_NAMES = [
+    'Karimov', 'Rahimov', 'Tursunov', 'Yusupov', 'Aliyev', 'Ergashev', 'Nazarov', 'Qodirov', 'Saidov', 'Xolmatov',
+    'Abdullayev', 'Mirzayev', 'Sobirov', 'Toshpulatov', 'Umarov', 'Hasanov', 'Ismoilov', 'Jo\'rayev', 'Latipov',
+]
+CITIES = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Namangan', 'Farg\'ona', 'Qarshi', 'Nukus', 'Urganch']
+INSTITUTIONS = [
+    'davlat universiteti', 'texnika universiteti', 'iqtisodiyot universiteti', 'tibbiyot akademiyasi',
+    'pedagogika instituti', 'axborot texnologiyalari universiteti', 'arxitektura-qurilish instituti',
+]
+COMPANIES = ['Artel', 'Uzum', 'Payme', 'Korzinka', 'Akfa', 'Click', 'Beeline', 'Ucell', 'Humo', 'Anor']
+COMPANY_SUFFIXES = ['MChJ', 'AJ', 'Group', 'Holding']
+
+CONTRACT_PRICES = range(4_000_000, 30_000_001, 500_000)
+ALLOCATION_SIZES = (500_000, 1_000_000, 2_000_000, 3_000_000, 5_000_000)
+SPONSOR_AMOUNTS = [
+    int(choice.value.replace('_', '')) for choice in Sponsor.AmountChoice if choice != Sponsor.AmountChoice.OTHERS
+]
+PROGRESS_WEIGHTS = {
+    Sponsor.StatusChoices.CONFIRMED: 60,
+    Sponsor.StatusChoices.NEW: 15,
+    Sponsor.StatusChoices.IN_PROCESS: 15,
+    Sponsor.StatusChoices.CANCELLED: 10,
+}
+
+
+@contextmanager
+def keep_created_at(*models):
+    """
+    Lets ``bulk_create`` store the generated ``created_at`` values instead of
+    overwriting them with the current time.
+    """
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic but consistent dataset for load testing: universities, students, "
+        "sponsors and allocations spread over the last --days days. The same --seed always "
+        "produces the same rows, so benchmark runs are comparable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--universities', type=int, default=20)
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--sponsors', type=int, default=2000)
+        parser.add_argument('--allocations', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365, help="Spread created_at over this many days.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help="Delete every university, student, sponsor "
+                                                                 "and allocation first.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now().replace(microsecond=0)
+        self.start = self.now - timedelta(days=options['days'])
+        self.phone_prefix = f"+998-{options['seed']}-"
+
+        if options['clear']:
+            self.clear()
+        elif Sponsor.objects.filter(phone_number__startswith=self.phone_prefix).exists():
+            raise CommandError(f"A dataset with seed {options['seed']} is already loaded; "
+                               f"use --clear or another --seed.")
+
+        started = time.perf_counter()
+        universities = self.build_universities(options['universities'])
+        students = self.build_students(options['students'], universities)
+        sponsors = self.build_sponsors(options['sponsors'])
+        allocations = self.build_allocations(options['allocations'], sponsors, students)
+
+        with transaction.atomic(), keep_created_at(Student, Sponsor, StudentSponsor):
+            University.objects.bulk_create(universities, batch_size=self.batch_size)
+            Student.objects.bulk_create(students, batch_size=self.batch_size)
+            Sponsor.objects.bulk_create(sponsors, batch_size=self.batch_size)
+            StudentSponsor.objects.bulk_create(allocations, batch_size=self.batch_size)
+            TotalPayment.objects.rebuild()
+            # Every generated row falls on these days; other days keep their rollups.
+            days = timezone.localdate(self.start), timezone.localdate(self.now)
+            SponsorDailyRollup.objects.rebuild(*days)
+            AllocationDailyRollup.objects.rebuild(*days)
+            invalidate(University, Student, Sponsor, StudentSponsor)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(universities)} universities, {len(students)} students, {len(sponsors)} sponsors "
+            f"and {len(allocations)} allocations in {elapsed:.1f}s."
+        ))
+        if len(allocations) < options['allocations']:
+            self.stdout.write(f"Stopped at {len(allocations)} allocations: confirmed sponsors ran out of money "
+                              f"or students are fully funded.")
+
+    def clear(self):
+        with transaction.atomic():
+            StudentSponsor.objects.all().delete()
+            Sponsor.objects.all().delete()
+            Student.objects.all().delete()
+            University.objects.all().delete()
+            TotalPayment.objects.rebuild()
+            SponsorDailyRollup.objects.all().delete()
+            AllocationDailyRollup.objects.all().delete()
+
+    def person_name(self):
+        return f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(FIRST_NAMES)}"
+
+    def timestamps(self, count):
+        """
+        ``count`` sorted random moments between the start and now, so primary
+        keys grow with ``created_at`` as they do in production.
+        """
+        span = int((self.now - self.start).total_seconds())
+        offsets = sorted(self.rng.randrange(span) for _ in range(count))
+        return [self.start + timedelta(seconds=offset) for offset in offsets]
+
+    def build_universities(self, count):
+        names = [f"{city} {institution}" for city in CITIES for institution in INSTITUTIONS]
+        self.rng.shuffle(names)
+        return [
+            University(name=names[i % len(names)] + (f" {i // len(names) + 1}" if i >= len(names) else ''))
+            for i in range(count)
+        ]
+
+    def build_students(self, count, universities):
+        if count and not universities:
+            raise CommandError("Students need at least one university.")
+        return [
+            Student(
+                full_name=self.person_name(),
+                degree=Student.StudentTypes.BACHELOR if self.rng.random() < 0.8 else Student.StudentTypes.MASTER,
+                contract_price=Decimal(self.rng.choice(CONTRACT_PRICES)),
+                allocated_money=Decimal(0),
+                university=self.rng.choice(universities),
+                created_at=created_at,
+            )
+            for created_at in self.timestamps(count)
+        ]
+
+    def build_sponsors(self, count):
+        progresses, weights = list(PROGRESS_WEIGHTS), list(PROGRESS_WEIGHTS.values())
+        sponsors = []
+        for i, created_at in enumerate(self.timestamps(count)):
+            is_organization = self.rng.random() < 0.3
+            if self.rng.random() < 0.8:
+                amount, custom_amount = Decimal(self.rng.choice(SPONSOR_AMOUNTS)), None
+            else:
+                amount, custom_amount = Decimal(0), Decimal(self.rng.randrange(5, 500) * 100_000)
+            sponsor = Sponsor(
+                full_name=self.person_name(),
+                phone_number=f"{self.phone_prefix}{i:07d}",
+                amount=amount,
+                custom_amount=custom_amount,
+                is_organization=is_organization,
+                organization_name=(f"{self.rng.choice(COMPANIES)} {self.rng.choice(COMPANY_SUFFIXES)}"
+                                   if is_organization else None),
+                progress=self.rng.choices(progresses, weights)[0],
+                created_at=created_at,
+            )
+            sponsor.normalize()
+            sponsors.append(sponsor)
+        return sponsors
+
+    def build_allocations(self, count, sponsors, students):
+        """
+        Spends confirmed sponsors' money on students the way the API would:
+        no sponsor is overdrawn and no student gets more than the contract
+        price. Balances on the sponsor and student objects are updated as
+        allocations are drawn, so the inserted rows are consistent.
+        """
+        givers = [sponsor for sponsor in sponsors if sponsor.progress == Sponsor.StatusChoices.CONFIRMED]
+        takers = list(students)
+        allocations = []
+        while len(allocations) < count and givers and takers:
+            g, t = self.rng.randrange(len(givers)), self.rng.randrange(len(takers))
+            sponsor, student = givers[g], takers[t]
+            amount = min(Decimal(self.rng.choice(ALLOCATION_SIZES)), sponsor.amount,
+                         student.contract_price - student.allocated_money)
+
+            sponsor.amount -= amount
+            sponsor.spent_amount += amount
+            student.allocated_money += amount
+            earliest = max(sponsor.created_at, student.created_at)
+            created_at = min(earliest + timedelta(seconds=self.rng.randrange(30 * 24 * 3600)), self.now)
+            allocations.append(StudentSponsor(sponsor=sponsor, student=student, amount=amount, created_at=created_at))
+
+            # Swap-remove exhausted entries so picks stay O(1).
+            if not sponsor.amount:
+                givers[g] = givers[-1]
+                givers.pop()
+            if student.allocated_money >= student.contract_price:
+                takers[t] = takers[-1]
+                takers.pop()
+        allocations.sort(key=lambda row: row.created_at)
+        return allocations
@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.importers import IMPORTERS, ImportFormatError, StudentImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a CSV or XLSX file of students or sponsors in batches. The header row names the "
+        "columns: full_name, degree, contract_price, university (by name) for students; full_name, "
+        "phone_number, amount, custom_amount, is_organization, organization_name, progress for sponsors. "
+        "Invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-universities', action='store_true',
+                            help="Create universities that are not in the database yet (students only).")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the file without saving anything.")
+        parser.add_argument('--max-errors', type=int, default=50, help="Number of row errors to print.")
+
+    def handle(self, *args, **options):
+        importer_class = IMPORTERS[options['kind']]
+        kwargs = {'batch_size': options['batch_size'], 'dry_run': options['dry_run']}
+        if importer_class is StudentImporter:
+            kwargs['create_universities'] = options['create_universities']
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as handle:
+                created, errors = importer_class(**kwargs).run(read_rows(handle, options['path']))
+        except (OSError, ImportFormatError) as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - started
+
+        for line in sorted(errors)[:options['max_errors']]:
+            details = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in errors[line].items())
+            self.stderr.write(f"line {line}: {details}")
+        if len(errors) > options['max_errors']:
+            self.stderr.write(f"... and {len(errors) - options['max_errors']} more")
+
+        action = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {created} {options['kind']} in {elapsed:.1f}s, {len(errors)} rows rejected."
+        ))
@@ -0,0 +1,39 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from api.matching import POLICIES, PlanChanged, apply_plan, build_plan
+
+
+class Command(BaseCommand):
+    help = (
+        "Plans allocations from confirmed sponsors with money left to students with need left and "
+        "prints the plan summary. Nothing is written unless --apply is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=list(POLICIES), default='most_in_need',
+                            help="; ".join(f"{name}: {policy.description}" for name, policy in POLICIES.items()))
+        parser.add_argument('--apply', action='store_true', help="Save the plan.")
+        parser.add_argument('--fingerprint', help="Apply only if the plan still has this fingerprint.")
+        parser.add_argument('--show', type=int, default=0, help="Print the first N planned allocations.")
+
+    def handle(self, *args, **options):
+        if options['apply']:
+            try:
+                plan, created = apply_plan(options['policy'], fingerprint=options['fingerprint'])
+            except PlanChanged as changed:
+                raise CommandError(f"The plan changed; its fingerprint is now {changed.plan.fingerprint}.")
+            except ValidationError as error:
+                raise CommandError(' '.join(error.messages))
+        else:
+            plan, created = build_plan(options['policy']), None
+
+        for key, value in plan.summary().items():
+            self.stdout.write(f"{key:<22} {value}")
+        self.stdout.write(f"{'fingerprint':<22} {plan.fingerprint}")
+        for allocation in plan.allocations[:options['show']]:
+            self.stdout.write(f"  sponsor {allocation.sponsor:>7} -> student {allocation.student:>7}  {allocation.amount}")
+
+        if created is None:
+            self.stdout.write("Dry run, nothing saved; add --apply to save this plan.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} allocations."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import TotalPayment
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the TotalPayment summary from the sponsor and student tables and reports any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report the drift, do not write.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            previous = TotalPayment.objects.select_for_update().filter(pk=TotalPayment.objects.SUMMARY_PK).first()
+            if options['dry_run']:
+                total_paid, total_requested = TotalPayment.objects.compute()
+            else:
+                summary, _ = TotalPayment.objects.rebuild()
+                total_paid, total_requested = summary.total_paid, summary.total_requested
+
+        if previous is None:
+            self.stdout.write(self.style.WARNING("No summary row was stored."))
+        else:
+            drift = False
+            for name, stored, actual in (
+                ('total_paid', previous.total_paid, total_paid),
+                ('total_requested', previous.total_requested, total_requested),
+            ):
+                if stored != actual:
+                    drift = True
+                    self.stdout.write(self.style.WARNING(
+                        f"{name}: stored {stored}, actual {actual} (drift {stored - actual})"
+                    ))
+            if not drift:
+                self.stdout.write("No drift found.")
+
+        if options['dry_run']:
+            self.stdout.write("Dry run, summary left unchanged.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Summary rebuilt: total_paid={total_paid}, total_requested={total_requested}"
+            ))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.exports import claim_next_job, process_job
+
+
+class Command(BaseCommand):
+    help = "Processes queued export jobs outside the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f"Exporting {job}...")
+            job = process_job(job)
+            if job.status == job.Status.DONE:
+                self.stdout.write(self.style.SUCCESS(f"{job}: {job.row_count} rows -> {job.file.name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{job}: {job.error}"))
@@ -1,13 +1,26 @@
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.apps import apps
 from django.contrib.auth.base_user import BaseUserManager
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Now, TruncDate
+from django.utils import timezone
+from api.cache import invalidate
+from api.metrics import record_allocations
 
 
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
-    def _create_user(self, email, username, password, **extra_fields):
+    def _create_user(self, email, username, password, password_hash=None, **extra_fields):
         """
         Creates and saves a User with the given email, username, and password.
+        ``password_hash`` is an already hashed password (see ``api.hashing``)
+        used instead of ``password``.
         """
         if not email:
             raise ValueError('The given email must be set')
@@ -16,19 +29,35 @@ class UserManager(BaseUserManager):
             raise ValueError('The given username must be set')
 
         email = self.normalize_email(email)
-
-        # Check if a user with the same email or username already exists
-        if self.model.objects.filter(email=email).exists():
-            raise ValidationError("A user with this email already exists.")
-
-        if self.model.objects.filter(username=username).exists():
-            raise ValidationError("A user with this username already exists.")
-
         user = self.model(email=email, username=username, **extra_fields)
-        user.set_password(password)
-        user.save(using=self._db)
+        if password_hash is None:
+            user.set_password(password)
+        else:
+            user.password = password_hash
+
+        # One INSERT; the unique constraints report duplicates.
+        try:
+            with transaction.atomic(using=self._db):
+                user.save(using=self._db)
+        except IntegrityError as error:
+            field = self.duplicate_field(error)
+            if field is None:
+                raise
+            raise ValidationError({field: f"A user with this {field} already exists."})
         return user
 
+    def duplicate_field(self, error):
+        """
+        Unique field named by the IntegrityError: SQLite and MySQL report
+        ``api_user.email``, PostgreSQL the ``api_user_email_key`` constraint.
+        """
+        table = self.model._meta.db_table
+        message = str(error)
+        for field in ('email', 'username'):
+            if f"{table}.{field}" in message or f"{table}_{field}_" in message:
+                return field
+        return None
+
     def create_user(self, email, username, password=None, **extra_fields):
         """
         Creates a regular user.
@@ -51,3 +80,374 @@ class UserManager(BaseUserManager):
             raise ValueError('Superuser must have is_staff=True.')  # Extra validation
 
         return self._create_user(email, username, password, **extra_fields)
+
+
+class TotalPaymentManager(models.Manager):
+    SUMMARY_PK = 1
+
+    def get_summary(self):
+        """
+        Returns the single summary row, building it on first use.
+        """
+        summary = self.filter(pk=self.SUMMARY_PK).first()
+        if summary is None:
+            summary, _ = self.rebuild()
+        return summary
+
+    async def aget_summary(self):
+        summary = await self.filter(pk=self.SUMMARY_PK).afirst()
+        if summary is None:
+            summary, _ = await sync_to_async(self.rebuild)()
+        return summary
+
+    def apply_delta(self, paid=Decimal(0), requested=Decimal(0)):
+        """
+        Shifts the stored totals in one UPDATE. Call it inside the transaction
+        that changed the underlying rows.
+        """
+        if not paid and not requested:
+            return
+        invalidate(self.model)
+        updated = self.filter(pk=self.SUMMARY_PK).update(
+            total_paid=F('total_paid') + paid,
+            total_requested=F('total_requested') + requested,
+            updated_at=Now(),
+        )
+        if not updated:
+            # The aggregates already include the caller's uncommitted change.
+            self.rebuild()
+
+    def compute(self):
+        """
+        Aggregates the totals straight from the sponsor and student tables.
+        """
+        sponsor = apps.get_model('api', 'Sponsor')
+        student = apps.get_model('api', 'Student')
+        total_paid = sponsor.objects.aggregate(total=Sum('amount'))['total'] or Decimal(0)
+        total_requested = student.objects.aggregate(total=Sum('contract_price'))['total'] or Decimal(0)
+        return total_paid, total_requested
+
+    def rebuild(self):
+        """
+        Recomputes the summary from scratch and returns ``(summary, previous)``
+        where ``previous`` is the row as it was stored before, or ``None``.
+        """
+        invalidate(self.model)
+        previous = self.filter(pk=self.SUMMARY_PK).first()
+        total_paid, total_requested = self.compute()
+        summary, _ = self.update_or_create(
+            pk=self.SUMMARY_PK,
+            defaults={'total_paid': total_paid, 'total_requested': total_requested},
+        )
+        return summary, previous
+
+
+def per_row_delta(deltas):
+    """
+    Builds the ``amount`` expression for an UPDATE touching the primary keys of ``deltas``.
+    """
+    if len(deltas) == 1:
+        return Value(next(iter(deltas.values())), output_field=DecimalField(max_digits=15, decimal_places=2))
+    return Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def lock_rows(queryset, pks):
+    """
+    Row-locks ``pks`` in primary key order. Every allocation locks sponsors
+    before students and each in ascending pk order, so concurrent
+    transactions always queue up instead of deadlocking.
+    """
+    list(queryset.select_for_update().filter(pk__in=pks).order_by('pk').values_list('pk', flat=True))
+
+
+class SponsorManager(models.Manager):
+    def allocate(self, deltas, lock=True):
+        """
+        Moves money from ``amount`` to ``spent_amount`` with a single guarded
+        UPDATE. ``deltas`` maps sponsor pk to the amount; negative values
+        give money back. Raises ``ValidationError`` instead of overdrawing.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if lock and len(deltas) > 1:
+            lock_rows(self, deltas)
+
+        delta = per_row_delta(deltas)
+        updated = self.filter(pk__in=deltas, amount__gte=delta).update(
+            amount=F('amount') - delta,
+            spent_amount=F('spent_amount') + delta,
+            updated_at=Now(),
+        )
+        if updated != len(deltas):
+            raise ValidationError({'amount': "Homiy hisobida yetarli mablag' mavjud emas!"})
+        invalidate(self.model)
+
+    def set_progress(self, sponsors, progress):
+        """
+        Moves the ``sponsors`` queryset to ``progress`` with one UPDATE and
+        returns how many rows changed. ``progress`` feeds no totals or
+        rollups, so ``save()`` is not needed.
+        """
+        updated = sponsors.exclude(progress=progress).update(progress=progress, updated_at=Now())
+        if updated:
+            invalidate(self.model)
+        return updated
+
+
+class StudentManager(models.Manager):
+    def allocate(self, deltas, lock=True):
+        """
+        Adds ``deltas`` (student pk -> amount) to ``allocated_money`` in one UPDATE.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if lock and len(deltas) > 1:
+            lock_rows(self, deltas)
+
+        delta = per_row_delta(deltas)
+        updated = self.filter(pk__in=deltas).update(allocated_money=F('allocated_money') + delta, updated_at=Now())
+        if updated != len(deltas):
+            raise ValidationError({'student': "Talaba topilmadi!"})
+        invalidate(self.model)
+
+
+class StudentSponsorManager(models.Manager):
+    def bulk_allocate(self, rows, all_or_nothing=False, source='bulk'):
+        """
+        Creates many allocations in one transaction. ``rows`` is a list of
+        ``(index, {'sponsor': pk, 'student': pk, 'amount': Decimal})``; rows
+        are checked in order against the locked balances, so a sponsor can
+        fund several rows until its balance runs out.
+
+        Returns ``(created, errors)`` where ``errors`` maps row index to an
+        error dict. With ``all_or_nothing`` any error leaves the database
+        untouched. ``source`` labels the allocation metrics.
+        """
+        sponsor_model = self.model._meta.get_field('sponsor').related_model
+        student_model = self.model._meta.get_field('student').related_model
+        total_payment_model = apps.get_model('api', 'TotalPayment')
+        errors = {}
+
+        with transaction.atomic():
+            balances, sponsors = {}, {}
+            for pk, amount, sponsor_status in (
+                    sponsor_model.objects.select_for_update()
+                    .filter(pk__in={row['sponsor'] for _, row in rows})
+                    .order_by('pk').values_list('pk', 'amount', 'sponsor_status')):
+                balances[pk], sponsors[pk] = amount, sponsor_status
+            # Dimensions of the daily rollups, read with the locks.
+            students = {
+                pk: (university, degree) for pk, university, degree in
+                student_model.objects.select_for_update()
+                .filter(pk__in={row['student'] for _, row in rows})
+                .order_by('pk').values_list('pk', 'university_id', 'degree')
+            }
+
+            allocations = []
+            sponsor_deltas, student_deltas = defaultdict(Decimal), defaultdict(Decimal)
+            for index, row in rows:
+                sponsor_id, student_id, amount = row['sponsor'], row['student'], row['amount']
+                if sponsor_id not in balances:
+                    errors[index] = {'sponsor': ["Homiy topilmadi!"]}
+                elif student_id not in students:
+                    errors[index] = {'student': ["Talaba topilmadi!"]}
+                elif amount > balances[sponsor_id]:
+                    errors[index] = {'amount': ["Homiy hisobida yetarli mablag' mavjud emas!"]}
+                else:
+                    balances[sponsor_id] -= amount
+                    sponsor_deltas[sponsor_id] += amount
+                    student_deltas[student_id] += amount
+                    allocations.append(self.model(sponsor_id=sponsor_id, student_id=student_id, amount=amount))
+
+            if not allocations or (errors and all_or_nothing):
+                return [], errors
+
+            # Rows are already locked above, in the same sponsor-then-student order.
+            sponsor_model.objects.allocate(sponsor_deltas, lock=False)
+            student_model.objects.allocate(student_deltas, lock=False)
+            total_payment_model.objects.apply_delta(paid=-sum(sponsor_deltas.values(), Decimal(0)))
+            created = self.bulk_create(allocations, batch_size=1000)
+            invalidate(self.model)
+            apps.get_model('api', 'AllocationDailyRollup').objects.record(
+                [(row.sponsor_id, row.student_id, row.created_at, 1, row.amount) for row in created],
+                students=students, sponsors=sponsors,
+            )
+            moved = sum(sponsor_deltas.values(), Decimal(0))
+            transaction.on_commit(lambda: record_allocations(len(created), moved, source))
+        return created, errors
+
+
+class RollupManager(models.Manager, metaclass=ABCMeta):
+    """
+    Daily rollup tables. A row holds the totals of one day and combination
+    of ``key_fields``; writes add deltas to it with one upsert inside the
+    transaction that changed the underlying rows, so concurrent writers
+    queue on the row instead of losing updates.
+    """
+    key_fields = ()
+    value_fields = ()
+
+    def add(self, deltas):
+        """
+        Adds ``deltas`` (key tuple -> value tuple) to the stored rows,
+        creating the missing ones.
+        """
+        deltas = sorted((key, values) for key, values in deltas.items() if any(values))
+        if not deltas:
+            return
+        invalidate(self.model)
+        connection = connections[router.db_for_write(self.model)]
+        meta, quote = self.model._meta, connection.ops.quote_name
+        fields = [meta.get_field(name) for name in self.key_fields + self.value_fields]
+        columns = ', '.join(quote(field.column) for field in fields)
+        keys = ', '.join(quote(meta.get_field(name).column) for name in self.key_fields)
+        table = quote(meta.db_table)
+        updates = ', '.join(
+            f"{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}"
+            for column in (meta.get_field(name).column for name in self.value_fields)
+        )
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        # PostgreSQL and SQLite share the upsert syntax; bulk_create() can only overwrite on conflict.
+        with connection.cursor() as cursor:
+            for start in range(0, len(deltas), 500):
+                batch = deltas[start:start + 500]
+                params = [
+                    field.get_db_prep_save(value, connection)
+                    for key, values in batch for field, value in zip(fields, key + values)
+                ]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON CONFLICT ({keys}) DO UPDATE SET {updates}",
+                    params,
+                )
+
+    @abstractmethod
+    def compute(self, start=None, end=None):
+        """
+        Returns ``{key: values}`` aggregated from the underlying rows created
+        on days ``start`` to ``end`` inclusive.
+        """
+
+    def created_between(self, queryset, start=None, end=None):
+        queryset = queryset.annotate(day=TruncDate('created_at'))
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        return queryset
+
+    def days(self, start=None, end=None):
+        queryset = self.all()
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        return queryset
+
+    def stored(self, start=None, end=None):
+        """
+        The stored rows of days ``start`` to ``end`` in ``compute()``'s form,
+        rows counted down to zero left out.
+        """
+        width = len(self.key_fields)
+        rows = self.days(start, end).values_list(*self.key_fields, *self.value_fields)
+        return {tuple(row[:width]): tuple(row[width:]) for row in rows if any(row[width:])}
+
+    def rebuild(self, start=None, end=None):
+        """
+        Replaces the rows of days ``start`` to ``end`` inclusive (every day
+        by default) with totals aggregated from scratch, and returns them.
+        """
+        with transaction.atomic():
+            # Deleting first makes the aggregates below wait for writers that hold the rows.
+            self.days(start, end).delete()
+            invalidate(self.model)
+            totals = self.compute(start, end)
+            self.add(totals)
+        return totals
+
+
+def local_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+class SponsorRollupManager(RollupManager):
+    key_fields = ('day', 'sponsor_status')
+    value_fields = ('signups',)
+
+    def record(self, sponsors, sign=1):
+        """
+        Counts ``sponsors`` (saved instances) as signed up, or with
+        ``sign=-1`` as gone.
+        """
+        deltas = defaultdict(int)
+        for sponsor in sponsors:
+            deltas[(local_day(sponsor.created_at), sponsor.sponsor_status)] += sign
+        self.add({key: (count,) for key, count in deltas.items()})
+
+    def compute(self, start=None, end=None):
+        sponsor = apps.get_model('api', 'Sponsor')
+        rows = (
+            self.created_between(sponsor.objects.order_by(), start, end)
+            .values_list('day', 'sponsor_status').annotate(signups=Count('pk'))
+        )
+        return {(day, status): (signups,) for day, status, signups in rows}
+
+
+class AllocationRollupManager(RollupManager):
+    key_fields = ('day', 'university', 'degree', 'sponsor_status')
+    value_fields = ('allocations', 'amount')
+
+    def record(self, changes, students=None, sponsors=None):
+        """
+        Adds allocation ``changes``: ``(sponsor_id, student_id, created_at,
+        count, amount)`` tuples. ``students`` (pk -> ``(university_id,
+        degree)``) and ``sponsors`` (pk -> sponsor status) may already hold
+        the dimensions; the missing ones are read in one query each.
+        """
+        if not changes:
+            return
+        students, sponsors = dict(students or {}), dict(sponsors or {})
+        student_ids = {change[1] for change in changes} - students.keys()
+        sponsor_ids = {change[0] for change in changes} - sponsors.keys()
+        if student_ids:
+            student = apps.get_model('api', 'Student')
+            students.update(
+                (pk, (university, degree)) for pk, university, degree
+                in student.objects.filter(pk__in=student_ids).values_list('pk', 'university_id', 'degree')
+            )
+        if sponsor_ids:
+            sponsor = apps.get_model('api', 'Sponsor')
+            sponsors.update(sponsor.objects.filter(pk__in=sponsor_ids).values_list('pk', 'sponsor_status'))
+
+        deltas = defaultdict(lambda: [0, Decimal(0)])
+        for sponsor_id, student_id, created_at, count, amount in changes:
+            totals = deltas[(local_day(created_at), *students[student_id], sponsors[sponsor_id])]
+            totals[0] += count
+            totals[1] += amount
+        self.add({key: tuple(values) for key, values in deltas.items()})
+
+    def _aggregate_allocations(self, allocations):
+        rows = (
+            allocations.order_by()
+            .values_list('day', 'student__university_id', 'student__degree', 'sponsor__sponsor_status')
+            .annotate(allocations=Count('pk'), amount=Sum('amount'))
+        )
+        return {tuple(row[:4]): (row[4], row[5]) for row in rows}
+
+    def record_queryset(self, allocations, sign=1):
+        """
+        Adds (or with ``sign=-1`` removes) the allocations of ``allocations``
+        under their current dimensions, aggregated in one query.
+        """
+        totals = self._aggregate_allocations(self.created_between(allocations))
+        self.add({key: (count * sign, amount * sign) for key, (count, amount) in totals.items()})
+
+    def compute(self, start=None, end=None):
+        allocation = apps.get_model('api', 'StudentSponsor')
+        return self._aggregate_allocations(self.created_between(allocation.objects.all(), start, end))
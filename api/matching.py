@@ -0,0 +1,271 @@
+"""
+Automatic sponsor-to-student matching.
+
+Confirmed sponsors with money left (``Sponsor.amount``) are matched to
+students with need left (``contract_price - allocated_money``). A policy
+turns both lists into a plan of ``(sponsor, student, amount)`` allocations
+in memory, greedily with heaps, so the whole dataset is planned in well
+under a second. ``build_plan()`` previews a plan; ``apply_plan()`` plans
+again over locked rows and writes it through ``bulk_allocate``, refusing
+with ``PlanChanged`` when it no longer matches the previewed fingerprint.
+"""
+import hashlib
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from time import perf_counter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from .models import Sponsor, Student, StudentSponsor
+
+Funder = namedtuple('Funder', ['pk', 'balance'])
+Candidate = namedtuple('Candidate', ['pk', 'need', 'university'])
+Allocation = namedtuple('Allocation', ['sponsor', 'student', 'amount'])
+
+
+class NeedHeap:
+    """
+    Students by remaining need, largest first (ties by pk). ``remaining`` is
+    shared between heaps; entries made stale by allocations through another
+    heap are skipped, and ``push()`` re-adds a student with its new need.
+    """
+
+    def __init__(self, remaining, pks=()):
+        self.remaining = remaining
+        self.heap = [(-remaining[pk], pk) for pk in pks]
+        heapq.heapify(self.heap)
+
+    def push(self, pk):
+        if self.remaining[pk] > 0:
+            heapq.heappush(self.heap, (-self.remaining[pk], pk))
+
+    def peek(self):
+        while self.heap:
+            need, pk = self.heap[0]
+            if self.remaining[pk] == -need:
+                return pk
+            heapq.heappop(self.heap)
+        return None
+
+    def pop(self):
+        pk = self.peek()
+        if pk is not None:
+            heapq.heappop(self.heap)
+        return pk
+
+
+def most_in_need(sponsors, students, history=None):
+    """
+    The student with the most need left takes from the sponsor with the most
+    money left until one of them is done; every allocation exhausts a
+    student or a sponsor, so the plan has at most ``sponsors + students - 1``
+    rows.
+    """
+    remaining = {student.pk: student.need for student in students}
+    needs = NeedHeap(remaining, remaining)
+    funders = [(-sponsor.balance, sponsor.pk) for sponsor in sponsors]
+    heapq.heapify(funders)
+    allocations = []
+    while funders:
+        student = needs.pop()
+        if student is None:
+            break
+        balance, sponsor = heapq.heappop(funders)
+        amount = min(remaining[student], -balance)
+        allocations.append(Allocation(sponsor, student, amount))
+        remaining[student] -= amount
+        needs.push(student)
+        if -balance > amount:
+            heapq.heappush(funders, (balance + amount, sponsor))
+    return allocations
+
+
+def fewest_splits(sponsors, students, history=None):
+    """
+    Students largest need first, each from the sponsor whose balance covers
+    it most tightly (best fit), so most students get a single payment and
+    large balances stay whole for large contracts. A student no sponsor can
+    cover takes the largest balance and waits for the rest.
+    """
+    remaining = {student.pk: student.need for student in students}
+    needs = NeedHeap(remaining, remaining)
+    balances = sorted((sponsor.balance, sponsor.pk) for sponsor in sponsors)
+    allocations = []
+    while balances:
+        student = needs.pop()
+        if student is None:
+            break
+        index = bisect_left(balances, (remaining[student], 0))
+        balance, sponsor = balances.pop(index if index < len(balances) else -1)
+        amount = min(remaining[student], balance)
+        allocations.append(Allocation(sponsor, student, amount))
+        remaining[student] -= amount
+        needs.push(student)
+        if balance > amount:
+            insort(balances, (balance - amount, sponsor))
+    return allocations
+
+
+def same_university(sponsors, students, history=None):
+    """
+    Sponsors richest first fund the neediest students of the universities
+    they already fund (``history`` maps sponsor pk to university pks), then
+    anyone else by need.
+    """
+    remaining = {student.pk: student.need for student in students}
+    by_university = defaultdict(list)
+    for student in students:
+        by_university[student.university].append(student.pk)
+    university_of = {student.pk: student.university for student in students}
+    heaps = {university: NeedHeap(remaining, pks) for university, pks in by_university.items()}
+    everyone = NeedHeap(remaining, remaining)
+    history = history or {}
+
+    allocations = []
+    for sponsor in sorted(sponsors, key=lambda sponsor: (-sponsor.balance, sponsor.pk)):
+        balance = sponsor.balance
+        preferred = [heaps[university] for university in history.get(sponsor.pk, ()) if university in heaps]
+        while balance > 0:
+            candidates = [pk for pk in (heap.peek() for heap in preferred) if pk is not None]
+            student = max(candidates, key=lambda pk: (remaining[pk], -pk)) if candidates else everyone.peek()
+            if student is None:
+                break
+            amount = min(remaining[student], balance)
+            allocations.append(Allocation(sponsor.pk, student, amount))
+            remaining[student] -= amount
+            balance -= amount
+            heaps[university_of[student]].push(student)
+            everyone.push(student)
+    return allocations
+
+
+Policy = namedtuple('Policy', ['plan', 'description', 'uses_history'])
+
+POLICIES = {
+    'most_in_need': Policy(most_in_need, "Largest remaining need first, from the largest balance.", False),
+    'fewest_splits': Policy(fewest_splits, "One sponsor per student where any balance covers the need.", False),
+    'same_university': Policy(
+        same_university, "Sponsors first fund the universities they already fund, then by need.", True),
+}
+
+
+def load_candidates(lock=False, history=False):
+    """
+    Returns ``(sponsors, students, history)`` from the database. With
+    ``lock`` the rows are locked, sponsors before students and each in pk
+    order like every other allocation; call it inside a transaction.
+    """
+    funding = Sponsor.objects.filter(progress=Sponsor.StatusChoices.CONFIRMED, amount__gt=0)
+    sponsors = funding.order_by('pk')
+    students = Student.objects.filter(contract_price__gt=F('allocated_money')).order_by('pk')
+    if lock:
+        sponsors, students = sponsors.select_for_update(), students.select_for_update()
+    sponsors = [Funder(*row) for row in sponsors.values_list('pk', 'amount')]
+    students = [
+        Candidate(pk, contract_price - allocated_money, university)
+        for pk, contract_price, allocated_money, university
+        in students.values_list('pk', 'contract_price', 'allocated_money', 'university_id')
+    ]
+
+    universities = defaultdict(list)
+    if history:
+        pairs = (
+            StudentSponsor.objects.filter(sponsor__in=funding.values('pk'))
+            .values_list('sponsor_id', 'student__university_id').distinct()
+            .order_by('sponsor_id', 'student__university_id')
+        )
+        for sponsor, university in pairs:
+            universities[sponsor].append(university)
+    return sponsors, students, universities
+
+
+def money(value):
+    return '{:f}'.format(value.quantize(Decimal('0.01')))
+
+
+class MatchPlan:
+    def __init__(self, policy, allocations, sponsors, students, elapsed):
+        self.policy = policy
+        self.allocations = allocations
+        self.sponsors = sponsors
+        self.students = students
+        self.elapsed = elapsed
+
+    @cached_property
+    def fingerprint(self):
+        """
+        Identifies the plan: the same allocations give the same fingerprint.
+        """
+        digest = hashlib.sha256(self.policy.encode())
+        for allocation in self.allocations:
+            digest.update(f"\n{allocation.sponsor}:{allocation.student}:{allocation.amount}".encode())
+        return digest.hexdigest()
+
+    def summary(self):
+        """
+        Plan totals; amounts are strings with two decimals, like the API's.
+        """
+        payments, planned = defaultdict(int), defaultdict(Decimal)
+        for allocation in self.allocations:
+            payments[allocation.student] += 1
+            planned[allocation.student] += allocation.amount
+        total = sum(planned.values(), Decimal(0))
+        return {
+            'policy': self.policy,
+            'allocations': len(self.allocations),
+            'amount': money(total),
+            'sponsors': len({allocation.sponsor for allocation in self.allocations}),
+            'students': len(payments),
+            'students_fully_funded': sum(1 for student in self.students if planned.get(student.pk) == student.need),
+            'students_split': sum(1 for count in payments.values() if count > 1),
+            'unmet_need': money(sum((student.need for student in self.students), Decimal(0)) - total),
+            'unspent_balance': money(sum((sponsor.balance for sponsor in self.sponsors), Decimal(0)) - total),
+            'planning_ms': round(self.elapsed * 1000, 1),
+        }
+
+    def rows(self):
+        """
+        The plan in the ``(index, row)`` form ``bulk_allocate`` takes.
+        """
+        return [
+            (index, {'sponsor': allocation.sponsor, 'student': allocation.student, 'amount': allocation.amount})
+            for index, allocation in enumerate(self.allocations)
+        ]
+
+
+class PlanChanged(Exception):
+    def __init__(self, plan):
+        self.plan = plan
+
+
+def build_plan(policy='most_in_need', lock=False):
+    policy_name, policy = policy, POLICIES[policy]
+    sponsors, students, history = load_candidates(lock=lock, history=policy.uses_history)
+    started = perf_counter()
+    allocations = policy.plan(sponsors, students, history)
+    return MatchPlan(policy_name, allocations, sponsors, students, perf_counter() - started)
+
+
+def apply_plan(policy='most_in_need', fingerprint=None, batch_size=1000):
+    """
+    Plans over locked rows and creates the allocations in one transaction.
+    Raises ``PlanChanged`` when ``fingerprint`` is given and the plan no
+    longer matches it. Returns ``(plan, created)``.
+    """
+    created = []
+    with transaction.atomic():
+        plan = build_plan(policy, lock=True)
+        if fingerprint is not None and fingerprint != plan.fingerprint:
+            raise PlanChanged(plan)
+        rows = plan.rows()
+        for start in range(0, len(rows), batch_size):
+            batch, errors = StudentSponsor.objects.bulk_allocate(
+                rows[start:start + batch_size], all_or_nothing=True, source='match')
+            if errors:
+                # Not expected over locked rows; roll the whole plan back.
+                raise ValidationError("The plan no longer fits the sponsor balances.")
+            created += batch
+    return plan, created
@@ -0,0 +1,327 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Each process keeps its own samples. When ``METRICS_DIR`` is set, every
+process also writes its samples to ``<METRICS_DIR>/<pid>-<start>.json`` at
+most once per ``METRICS_FLUSH_INTERVAL`` seconds and at exit. ``/metrics``
+then adds up the files of all processes, gunicorn workers included, so
+any worker can answer a scrape. The counters of dead workers are still part
+of the totals: scrapes fold their files into ``dead.json`` and delete them
+(like ``prometheus_client``'s ``mark_process_dead``), so a scrape reads one
+file per live process plus one however often workers restart. Liveness is
+checked by pid, so the directory must not be shared between hosts.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from bisect import bisect_left
+from django.conf import settings
+from django.http import HttpResponse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+        self._reset_process()
+
+    def _reset_process(self):
+        self._pid = os.getpid()
+        self._file_id = f"{self._pid}-{time.time_ns()}"
+        self._samples = defaultdict(float)
+        self._last_flush = 0.0
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        ``collector()`` returns ``(name, type, documentation, [(labels dict, value)])``
+        tuples computed at scrape time, e.g. gauges of the current process.
+        """
+        self._collectors.append(collector)
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def inc(self, key, amount):
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked after samples were taken: those belong to the parent.
+                self._reset_process()
+            self._samples[key] += amount
+        self._maybe_flush()
+
+    # Multiprocess store
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def _maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        if self.directory and time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        directory = self.directory
+        if not directory:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            data = [[list(key), value] for key, value in self._samples.items()]
+            path = os.path.join(directory, f"{self._file_id}.json")
+        os.makedirs(directory, exist_ok=True)
+        write_json(path, data)
+
+    def compact(self):
+        """
+        Adds the samples of dead processes to ``dead.json`` and deletes their
+        files. The aggregate lists the files it absorbed last, so files left
+        by a compaction that died before deleting them are not counted twice.
+        One process compacts at a time; the others skip it.
+        """
+        directory = self.directory
+        dead = [path for path in glob.glob(os.path.join(directory, '*-*.json')) if not process_alive(path)]
+        if not dead:
+            return
+        with open(os.path.join(directory, '.compact.lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            aggregate, absorbed = read_aggregate(directory)
+            totals = defaultdict(float, aggregate)
+            batch = []
+            for path in dead:
+                name = os.path.basename(path)
+                if name not in absorbed:
+                    try:
+                        samples = read_samples(path)
+                    except FileNotFoundError:
+                        continue
+                    except ValueError:
+                        samples = []
+                    for key, value in samples:
+                        totals[key] += value
+                    batch.append(name)
+            write_json(os.path.join(directory, AGGREGATE_FILE), {
+                'samples': [[list(key), value] for key, value in totals.items()],
+                'absorbed': batch,
+            })
+            for path in dead:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            # Temporary files of processes killed mid-write.
+            for path in glob.glob(os.path.join(directory, '*.json.*.tmp')):
+                if os.path.basename(path).startswith(AGGREGATE_FILE) or not process_alive(path):
+                    os.remove(path)
+
+    def collect(self):
+        """
+        Returns the samples of every process as ``{key: value}``.
+        """
+        with self._lock:
+            totals = defaultdict(float, self._samples)
+            own_file = f"{self._file_id}.json"
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.compact()
+            aggregate, absorbed = read_aggregate(self.directory)
+            for key, value in aggregate.items():
+                totals[key] += value
+            for path in glob.glob(os.path.join(self.directory, '*-*.json')):
+                name = os.path.basename(path)
+                if name == own_file or name in absorbed:
+                    continue
+                try:
+                    for key, value in read_samples(path):
+                        totals[key] += value
+                except (OSError, ValueError):
+                    continue
+        return totals
+
+    def render(self):
+        samples = defaultdict(list)
+        for key, value in self.collect().items():
+            samples[key[0]].append((key, value))
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(samples.get(metric.name, [])))
+        for collector in self._collectors:
+            for name, kind, documentation, values in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{format_labels(labels.items())} {value}" for labels, value in values)
+        return '\n'.join(lines) + '\n'
+
+
+AGGREGATE_FILE = 'dead.json'
+
+
+def process_alive(path):
+    """
+    Whether the process that wrote ``<pid>-<start>.json[...]`` still runs.
+    """
+    try:
+        pid = int(os.path.basename(path).split('-', 1)[0])
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def as_key(key):
+    """
+    A sample key read back from JSON, with its lists turned into tuples.
+    """
+    return tuple(tuple(part) if isinstance(part, list) else part for part in key)
+
+
+def read_samples(path):
+    with open(path) as handle:
+        return [(as_key(key), value) for key, value in json.load(handle)]
+
+
+def read_aggregate(directory):
+    """
+    Returns the dead processes' totals as ``{key: value}`` and the names of
+    the files folded into them last.
+    """
+    try:
+        with open(os.path.join(directory, AGGREGATE_FILE)) as handle:
+            aggregate = json.load(handle)
+    except (OSError, ValueError):
+        return {}, set()
+    return {as_key(key): value for key, value in aggregate['samples']}, set(aggregate['absorbed'])
+
+
+def write_json(path, data):
+    partial = f"{path}.{threading.get_ident()}.tmp"
+    with open(partial, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(partial, path)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(pairs):
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc((self.name, '', tuple(str(labels[name]) for name in self.labelnames)), float(amount))
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for (_, _, labels), value in sorted(samples):
+            lines.append(f"{self.name}{format_labels(zip(self.labelnames, labels))} {value}")
+        return lines
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        labels = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        bucket = repr(self.buckets[index]) if index < len(self.buckets) else '+Inf'
+        self.registry.inc((self.name, 'bucket', labels + (bucket,)), 1.0)
+        self.registry.inc((self.name, 'sum', labels), float(value))
+        self.registry.inc((self.name, 'count', labels), 1.0)
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        series = defaultdict(lambda: {'bucket': defaultdict(float), 'sum': 0.0, 'count': 0.0})
+        for (_, part, labels), value in samples:
+            if part == 'bucket':
+                series[labels[:-1]]['bucket'][labels[-1]] += value
+            else:
+                series[labels][part] += value
+
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for labels, data in sorted(series.items()):
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for bound in bounds:
+                cumulative += data['bucket'].get(bound, 0.0)
+                lines.append(f"{self.name}_bucket{format_labels(pairs + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(pairs)} {data['sum']}")
+            lines.append(f"{self.name}_count{format_labels(pairs)} {data['count']}")
+        return lines
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+REQUESTS = registry.counter(
+    'metsenat_http_requests_total', "HTTP requests by view name, method and status.", ('view', 'method', 'status'))
+REQUEST_ERRORS = registry.counter(
+    'metsenat_http_request_errors_total', "HTTP responses with status >= 400 by view name.", ('view', 'status'))
+REQUEST_LATENCY = registry.histogram(
+    'metsenat_http_request_duration_seconds', "Request latency by view name.", ('view',))
+DB_QUERIES = registry.counter(
+    'metsenat_db_queries_total', "SQL queries issued by view name.", ('view',))
+ALLOCATIONS = registry.counter(
+    'metsenat_allocations_total', "Committed sponsor to student allocations.", ('source',))
+ALLOCATED_AMOUNT = registry.counter(
+    'metsenat_allocated_amount_total', "Money moved by committed allocations.", ('source',))
+LOGINS = registry.counter(
+    'metsenat_logins_total', "Login attempts by result.", ('result',))
+DB_CHECKOUT = registry.histogram(
+    'metsenat_db_connection_checkout_seconds',
+    "Time to obtain a database connection: pool wait and health check, or a fresh connect.",
+    ('database', 'pooled'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+DB_CHECKOUT_ERRORS = registry.counter(
+    'metsenat_db_connection_checkout_errors_total',
+    "Failed connection checkouts (pool timeouts, unreachable server).", ('database', 'pooled'))
+RESPONSE_CACHE = registry.counter(
+    'metsenat_response_cache_requests_total', "Response cache lookups by view name and result.", ('view', 'result'))
+
+
+def record_allocations(count, amount, source):
+    ALLOCATIONS.inc(count, source=source)
+    ALLOCATED_AMOUNT.inc(amount, source=source)
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
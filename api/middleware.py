@@ -0,0 +1,184 @@
+import logging
+import random
+from math import ceil
+from time import perf_counter, time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from rest_framework.permissions import SAFE_METHODS
+from .instrumentation import collect_stats
+from .metrics import REQUESTS, REQUEST_ERRORS, REQUEST_LATENCY, DB_QUERIES
+from .routers import routing
+
+logger = logging.getLogger('api.performance')
+
+
+class AsyncCapableMiddleware:
+    """
+    Runs in whichever mode the rest of the chain uses, so under ASGI requests
+    stay on the event loop instead of hopping to a thread at this layer.
+    Subclasses implement ``__call__`` and ``__acall__``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoise, which is sync only; the file lookup is an in-memory dict
+    (or a stat with autorefresh), cheap enough for the event loop.
+    """
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Reports SQL count, DB time and serializer time of sampled requests in a
+    ``Server-Timing`` header, and logs requests that exceed the
+    ``performance_budget`` declared on their view class, e.g.
+    ``performance_budget = {'queries': 2, 'db_ms': 50, 'total_ms': 200}``.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 1.0)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        started = perf_counter()
+        with collect_stats() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats, perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        started = perf_counter()
+        with collect_stats() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats, perf_counter() - started)
+
+    def finish(self, request, response, stats, total):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            f'serializer;dur={stats.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        self.check_budget(request, stats, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request.performance_budget = getattr(view_class, 'performance_budget', None)
+
+    def check_budget(self, request, stats, total):
+        budget = getattr(request, 'performance_budget', None)
+        if not budget:
+            return
+        measured = {'queries': stats.queries, 'db_ms': stats.db_time * 1000, 'total_ms': total * 1000}
+        exceeded = {key: round(measured[key], 1) for key, limit in budget.items() if measured[key] > limit}
+        if exceeded:
+            logger.warning(
+                "%s %s exceeded its performance budget: %s (budget %s)",
+                request.method, request.path, exceeded, budget,
+            )
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Feeds request counts, latency, errors and SQL counts per URL name into
+    ``api.metrics``.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = perf_counter()
+        with collect_stats() as stats:
+            response = self.get_response(request)
+        self.record(request, response, stats, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        with collect_stats() as stats:
+            response = await self.get_response(request)
+        self.record(request, response, stats, perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        # view_name carries the namespace, keeping e.g. "async:student-list" apart from "student-list".
+        view = match.view_name if match else 'unmatched'
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_LATENCY.observe(duration, view=view)
+        DB_QUERIES.inc(stats.queries, view=view)
+        if response.status_code >= 400:
+            REQUEST_ERRORS.inc(view=view, status=response.status_code)
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Sets up replica routing for the request (see ``api.routers``) and, after
+    a write request that changed data, pins the client to the primary for
+    ``REPLICA_STICKY_SECONDS`` with a cookie holding the expiry time.
+    """
+    cookie_name = 'metsenat_primary_until'
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routing(pinned=self.is_pinned(request)) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with routing(pinned=self.is_pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time()
+        except ValueError:
+            return False
+
+    def finish(self, request, response, state):
+        sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        if state.wrote and request.method not in SAFE_METHODS and sticky > 0:
+            response.set_cookie(
+                self.cookie_name, f"{time() + sticky:.3f}", max_age=max(1, ceil(sticky)),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_alter_sponsor_amount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sponsor',
+            index=models.Index(fields=['-created_at', '-id'], name='sponsor_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at', '-id'], name='student_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsponsor',
+            index=models.Index(fields=['-created_at', '-id'], name='studentsponsor_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_summary(apps, schema_editor):
+    Sponsor = apps.get_model('api', 'Sponsor')
+    Student = apps.get_model('api', 'Student')
+    TotalPayment = apps.get_model('api', 'TotalPayment')
+    TotalPayment.objects.all().delete()
+    TotalPayment.objects.create(
+        pk=1,
+        total_paid=Sponsor.objects.aggregate(total=Sum('amount'))['total'] or Decimal(0),
+        total_requested=Student.objects.aggregate(total=Sum('contract_price'))['total'] or Decimal(0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='totalpayment',
+            options={'verbose_name': 'total payment', 'verbose_name_plural': 'total payments'},
+        ),
+        migrations.AddField(
+            model_name='totalpayment',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='totalpayment',
+            name='total_requested',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='totalpayment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
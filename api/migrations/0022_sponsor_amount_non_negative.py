@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+def check_amounts(apps, schema_editor):
+    """
+    Allocations before the guarded UPDATEs could lose updates under
+    contention and overdraw a sponsor. Such rows would fail the constraint
+    with a bare IntegrityError, so name them instead; their right balance
+    depends on their allocations, so they are left for an operator to fix.
+    """
+    Sponsor = apps.get_model('api', 'Sponsor')
+    overdrawn = list(
+        Sponsor.objects.using(schema_editor.connection.alias)
+        .filter(amount__lt=0).order_by('pk').values_list('pk', 'amount')
+    )
+    if overdrawn:
+        rows = ', '.join(f"{pk} ({amount})" for pk, amount in overdrawn)
+        raise RuntimeError(
+            f"{len(overdrawn)} sponsors have a negative amount, which sponsor_amount_non_negative "
+            f"forbids: {rows}. Review their allocations, set each amount to what is really left "
+            f"(0 if fully spent), then run migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_totalpayment_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_amounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sponsor',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gte', 0)), name='sponsor_amount_non_negative'),
+        ),
+    ]
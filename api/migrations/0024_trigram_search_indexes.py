@@ -0,0 +1,39 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# (index name, table, column); GIN trigram indexes exist on PostgreSQL only,
+# other databases keep using plain ILIKE scans.
+TRIGRAM_INDEXES = [
+    ('sponsor_full_name_trgm_idx', 'api_sponsor', 'full_name'),
+    ('sponsor_org_name_trgm_idx', 'api_sponsor', 'organization_name'),
+    ('student_full_name_trgm_idx', 'api_student', 'full_name'),
+    ('university_name_trgm_idx', 'api_university', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_exportjob'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:51
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SponsorDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sponsor_status', models.CharField(choices=[('YURIDIK SHAXS', 'Yuridik shaxs'), ('JISMONIY SHAXS', 'Jismoniy shaxs')], max_length=50)),
+                ('signups', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'sponsor daily rollup',
+                'verbose_name_plural': 'sponsor daily rollups',
+                'constraints': [models.UniqueConstraint(fields=('day', 'sponsor_status'), name='sponsorrollup_day_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AllocationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('degree', models.CharField(choices=[('bachelor', 'Bachelor'), ('master', 'Master')], max_length=50)),
+                ('sponsor_status', models.CharField(choices=[('YURIDIK SHAXS', 'Yuridik shaxs'), ('JISMONIY SHAXS', 'Jismoniy shaxs')], max_length=50)),
+                ('allocations', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=20)),
+                ('university', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.university')),
+            ],
+            options={
+                'verbose_name': 'allocation daily rollup',
+                'verbose_name_plural': 'allocation daily rollups',
+                'constraints': [models.UniqueConstraint(fields=('day', 'university', 'degree', 'sponsor_status'), name='allocationrollup_day_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['university', 'degree', 'contract_price', 'allocated_money'], name='student_university_degree_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsponsor',
+            index=models.Index(fields=['student', 'sponsor'], name='allocation_student_sponsor_idx'),
+        ),
+    ]
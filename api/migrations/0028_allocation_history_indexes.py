@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_funding_stats_indexes'),
+    ]
+
+    operations = [
+        # The composite indexes replace the foreign key indexes; create them first.
+        migrations.AddIndex(
+            model_name='studentsponsor',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='allocation_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsponsor',
+            index=models.Index(fields=['sponsor', '-created_at', '-id'], name='allocation_sponsor_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='studentsponsor',
+            name='sponsor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.sponsor'),
+        ),
+        migrations.AlterField(
+            model_name='studentsponsor',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.student'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Lets the admin's sponsor search match phone numbers by substring through
+# the index, like the names in 0024; PostgreSQL only.
+INDEX = ('sponsor_phone_trgm_idx', 'api_sponsor', 'phone_number')
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    name, table, column = INDEX
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{INDEX[0]}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_allocation_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
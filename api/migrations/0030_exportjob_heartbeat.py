@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeats(apps, schema_editor):
+    # Jobs started before heartbeats existed: judge them by their start, as before.
+    ExportJob = apps.get_model('api', 'ExportJob')
+    ExportJob.objects.filter(started_at__isnull=False).update(heartbeat_at=F('started_at'), attempts=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_sponsor_phone_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeats, migrations.RunPython.noop),
+    ]
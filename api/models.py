@@ -1,7 +1,13 @@
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
 from decimal import Decimal
 from django.db import models, transaction
+from django.db.models.base import ModelBase
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from api.managers import UserManager
+from api.metrics import record_allocations
+from api.managers import (UserManager, TotalPaymentManager, SponsorManager, StudentManager, StudentSponsorManager,
+                          SponsorRollupManager, AllocationRollupManager)
 from django.core.exceptions import ValidationError
 
 
@@ -30,8 +36,116 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = 'users'
 
 
+class SummaryTrackedModel(models.Model):
+    """
+    Keeps ``TotalPayment`` in step with ``summary_field`` on every save.
+    """
+    summary_field = None
+    summary_total = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_summary_value = dict(zip(field_names, values)).get(cls.summary_field)
+        return instance
+
+    def get_summary_delta(self, update_fields=None):
+        if update_fields is not None and self.summary_field not in update_fields:
+            return Decimal(0)
+        if self._state.adding:
+            previous = Decimal(0)
+        else:
+            previous = getattr(self, '_stored_summary_value', None)
+            if previous is None:
+                previous = type(self)._default_manager.filter(pk=self.pk).values_list(
+                    self.summary_field, flat=True
+                ).first() or Decimal(0)
+        return getattr(self, self.summary_field) - previous
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            delta = self.get_summary_delta(kwargs.get('update_fields'))
+            super().save(*args, **kwargs)
+            TotalPayment.objects.apply_delta(**{self.summary_total: delta})
+            self._stored_summary_value = getattr(self, self.summary_field)
+
+
+class AbstractModelBase(ABCMeta, ModelBase):
+    """
+    Model metaclass honouring ``@abstractmethod``: a concrete model missing
+    one cannot be instantiated.
+    """
+
+
+class RollupTrackedModel(models.Model, metaclass=AbstractModelBase):
+    """
+    Keeps the daily rollups in step when a save changes one of
+    ``rollup_fields``, the dimensions this row's allocations are counted
+    under: they move from the old dimensions to the new ones.
+    """
+    rollup_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        stored = dict(zip(field_names, values))
+        if set(cls.rollup_fields) <= stored.keys():
+            instance._stored_rollup_values = tuple(stored[field] for field in cls.rollup_fields)
+        return instance
+
+    def get_rollup_values(self):
+        return tuple(getattr(self, field) for field in self.rollup_fields)
+
+    def get_stored_rollup_values(self, update_fields=None):
+        """
+        The stored ``rollup_fields`` values when this save changes them,
+        otherwise ``None``.
+        """
+        if self._state.adding:
+            return None
+        if update_fields is not None:
+            names = {self._meta.get_field(field).name for field in self.rollup_fields}
+            if not names & {self._meta.get_field(field).name for field in update_fields}:
+                return None
+        stored = getattr(self, '_stored_rollup_values', None)
+        if stored is None:
+            stored = tuple(type(self)._default_manager.values_list(*self.rollup_fields).get(pk=self.pk))
+        return stored if stored != self.get_rollup_values() else None
+
+    @abstractmethod
+    def get_allocations(self):
+        """
+        The row's allocations, as a ``StudentSponsor`` queryset.
+        """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            adding = self._state.adding
+            previous = self.get_stored_rollup_values(kwargs.get('update_fields'))
+            if previous is not None:
+                AllocationDailyRollup.objects.record_queryset(self.get_allocations(), sign=-1)
+            super().save(*args, **kwargs)
+            if previous is not None:
+                AllocationDailyRollup.objects.record_queryset(self.get_allocations())
+            self.rollups_saved(adding, previous)
+            self._stored_rollup_values = self.get_rollup_values()
+
+    def rollups_saved(self, adding, previous):
+        """
+        Hook for rollups of the row itself; ``previous`` holds the old
+        ``rollup_fields`` values when they changed.
+        """
+
+
 class University(models.Model):
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -39,9 +153,16 @@ class University(models.Model):
     class Meta:
         verbose_name = 'university'
         verbose_name_plural = 'universities'
+        indexes = [
+            models.Index(fields=['updated_at'], name='university_updated_idx'),
+        ]
+
 
+class Student(RollupTrackedModel, SummaryTrackedModel):
+    summary_field = 'contract_price'
+    summary_total = 'requested'
+    rollup_fields = ('university_id', 'degree')
 
-class Student(models.Model):
     class StudentTypes(models.TextChoices):
         BACHELOR = "bachelor"
         MASTER = "master"
@@ -51,7 +172,12 @@ class Student(models.Model):
     contract_price = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     allocated_money = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     university = models.ForeignKey("api.University", on_delete=models.CASCADE, related_name="students")
+    objects = StudentManager()
+
+    def get_allocations(self):
+        return StudentSponsor.objects.filter(student=self)
 
     def __str__(self):
         return self.full_name
@@ -59,9 +185,20 @@ class Student(models.Model):
     class Meta:
         verbose_name = 'student'
         verbose_name_plural = 'students'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='student_created_id_idx'),
+            models.Index(fields=['updated_at'], name='student_updated_idx'),
+            # Holds every column of the funding statistics query, which reads only the index.
+            models.Index(fields=['university', 'degree', 'contract_price', 'allocated_money'],
+                         name='student_university_degree_idx'),
+        ]
+
 
+class Sponsor(RollupTrackedModel, SummaryTrackedModel):
+    summary_field = 'amount'
+    summary_total = 'paid'
+    rollup_fields = ('sponsor_status',)
 
-class Sponsor(models.Model):
     class StatusChoices(models.TextChoices):
         NEW = 'YANGI', 'Yangi'
         IN_PROCESS = 'Moderatsiyada', 'Moderatsiyada'
@@ -89,10 +226,16 @@ class Sponsor(models.Model):
     progress = models.CharField(max_length=30, choices=StatusChoices.choices)
     sponsor_status = models.CharField(max_length=50, choices=SponsorStatus.choices)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     organization_name = models.CharField(max_length=250, blank=True, null=True)
     spent_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal(0))
+    objects = SponsorManager()
 
-    def save(self, *args, **kwargs):
+    def normalize(self):
+        """
+        Derives the dependent fields. ``save()`` calls it; bulk inserts, which
+        skip ``save()``, have to call it themselves.
+        """
         self.sponsor_status = self.SponsorStatus.JURIDICAL if self.is_organization else self.SponsorStatus.INDIVIDUAL
         if not self.is_organization:
             self.organization_name = None
@@ -103,8 +246,20 @@ class Sponsor(models.Model):
 
         self.deposit_money = self.amount
 
+    def save(self, *args, **kwargs):
+        self.normalize()
         super().save(*args, **kwargs)
 
+    def get_allocations(self):
+        return StudentSponsor.objects.filter(sponsor=self)
+
+    def rollups_saved(self, adding, previous):
+        if adding:
+            SponsorDailyRollup.objects.record([self])
+        elif previous is not None:
+            day = timezone.localdate(self.created_at)
+            SponsorDailyRollup.objects.add({(day, previous[0]): (-1,), (day, self.sponsor_status): (1,)})
+
     def clean(self):
         if self.is_organization and not self.organization_name:
             raise ValidationError({'organization_name': "Yuridik shaxs uchun tashkilot nomi majburiy!"})
@@ -117,31 +272,194 @@ class Sponsor(models.Model):
     class Meta:
         verbose_name = 'sponsor'
         verbose_name_plural = 'sponsors'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='sponsor_created_id_idx'),
+            models.Index(fields=['updated_at'], name='sponsor_updated_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(amount__gte=0), name='sponsor_amount_non_negative'),
+        ]
 
 
 class StudentSponsor(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
-    sponsor = models.ForeignKey(Sponsor, on_delete=models.CASCADE)
+    # Indexed through the composite indexes in Meta, which start with them.
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=False)
+    sponsor = models.ForeignKey(Sponsor, on_delete=models.CASCADE, db_index=False)
     amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal(0))
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = StudentSponsorManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        stored = dict(zip(field_names, values))
+        if {'sponsor_id', 'student_id', 'amount'} <= stored.keys():
+            instance._stored_allocation = (stored['sponsor_id'], stored['student_id'], stored['amount'])
+        return instance
+
+    def get_balance_changes(self, update_fields=None):
+        """
+        Returns ``(sponsor_deltas, student_deltas)``: how much each sponsor and
+        student balance has to move for this row to be saved.
+        """
+        sponsor_deltas, student_deltas = defaultdict(Decimal), defaultdict(Decimal)
+        if update_fields is not None and not {'sponsor', 'student', 'amount'} & set(update_fields):
+            return sponsor_deltas, student_deltas
+
+        if not self._state.adding:
+            stored = getattr(self, '_stored_allocation', None)
+            if stored is None:
+                stored = self._stored_allocation = type(self).objects.values_list(
+                    'sponsor_id', 'student_id', 'amount').get(pk=self.pk)
+            sponsor_id, student_id, amount = stored
+            sponsor_deltas[sponsor_id] -= amount
+            student_deltas[student_id] -= amount
+
+        sponsor_deltas[self.sponsor_id] += self.amount
+        student_deltas[self.student_id] += self.amount
+        return sponsor_deltas, student_deltas
+
+    def get_rollup_changes(self, update_fields=None):
+        """
+        Returns the ``AllocationDailyRollup.objects.record()`` changes for
+        this row as saved, and the dimensions of its cached sponsor and
+        student. Call it after saving, when ``created_at`` is set.
+        """
+        if update_fields is not None and not {'sponsor', 'student', 'amount'} & set(update_fields):
+            return [], {}, {}
+        changes = [(self.sponsor_id, self.student_id, self.created_at, 1, self.amount)]
+        stored = getattr(self, '_stored_allocation', None)
+        if stored is not None:
+            changes.append((stored[0], stored[1], self.created_at, -1, -stored[2]))
+        students, sponsors = {}, {}
+        if type(self).student.is_cached(self):
+            students[self.student_id] = (self.student.university_id, self.student.degree)
+        if type(self).sponsor.is_cached(self):
+            sponsors[self.sponsor_id] = self.sponsor.sponsor_status
+        return changes, students, sponsors
 
     def save(self, *args, **kwargs):
         with transaction.atomic():
-            sponsor = self.sponsor
-            sponsor.spent_amount += self.amount
-            sponsor.amount -= self.amount
-            sponsor.save()
-
-            student = self.student
-            student.allocated_money += self.amount
-            student.save()
+            sponsor_deltas, student_deltas = self.get_balance_changes(kwargs.get('update_fields'))
+            # Sponsors strictly before students keeps the row lock order deterministic.
+            Sponsor.objects.allocate(sponsor_deltas)
+            Student.objects.allocate(student_deltas)
+            TotalPayment.objects.apply_delta(paid=-sum(sponsor_deltas.values(), Decimal(0)))
 
             super().save(*args, **kwargs)
+            AllocationDailyRollup.objects.record(*self.get_rollup_changes(kwargs.get('update_fields')))
+            self._stored_allocation = (self.sponsor_id, self.student_id, self.amount)
+
+            moved = sum(sponsor_deltas.values(), Decimal(0))
+            if moved:
+                transaction.on_commit(lambda: record_allocations(1, moved, 'single'))
 
     class Meta:
         verbose_name = 'student sponsor'
         verbose_name_plural = 'student sponsors'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='studentsponsor_created_id_idx'),
+            models.Index(fields=['updated_at'], name='studentsponsor_updated_idx'),
+            models.Index(fields=['student', 'sponsor'], name='allocation_student_sponsor_idx'),
+            # Keyset pages of one student's or sponsor's allocations.
+            models.Index(fields=['student', '-created_at', '-id'], name='allocation_student_created_idx'),
+            models.Index(fields=['sponsor', '-created_at', '-id'], name='allocation_sponsor_created_idx'),
+        ]
+
+
+class SponsorDailyRollup(models.Model):
+    """
+    Sponsors signed up per day (``created_at`` in the local time zone) and
+    sponsor type.
+    """
+    day = models.DateField()
+    sponsor_status = models.CharField(max_length=50, choices=Sponsor.SponsorStatus.choices)
+    signups = models.IntegerField(default=0)
+    objects = SponsorRollupManager()
+
+    class Meta:
+        verbose_name = 'sponsor daily rollup'
+        verbose_name_plural = 'sponsor daily rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'sponsor_status'], name='sponsorrollup_day_key'),
+        ]
+
+
+class AllocationDailyRollup(models.Model):
+    """
+    Allocations and money allocated per day, university, degree and sponsor
+    type. ``university`` carries no constraint: rows of a deleted university
+    are counted down to zero rather than deleted with it.
+    """
+    day = models.DateField()
+    university = models.ForeignKey(University, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    degree = models.CharField(max_length=50, choices=Student.StudentTypes.choices)
+    sponsor_status = models.CharField(max_length=50, choices=Sponsor.SponsorStatus.choices)
+    allocations = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal(0))
+    objects = AllocationRollupManager()
+
+    class Meta:
+        verbose_name = 'allocation daily rollup'
+        verbose_name_plural = 'allocation daily rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'university', 'degree', 'sponsor_status'],
+                                    name='allocationrollup_day_key'),
+        ]
 
 
 class TotalPayment(models.Model):
-    pass
+    total_paid = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal(0))
+    total_requested = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal(0))
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = TotalPaymentManager()
+
+    @property
+    def total_needed(self):
+        return self.total_requested - self.total_paid
+
+    class Meta:
+        verbose_name = 'total payment'
+        verbose_name_plural = 'total payments'
+
+
+
+class ExportJob(models.Model):
+    class Kind(models.TextChoices):
+        SPONSORS = 'sponsors', 'Sponsors'
+        STUDENTS = 'students', 'Students'
+        ALLOCATIONS = 'allocations', 'Allocations'
+
+    class Format(models.TextChoices):
+        CSV = 'csv', 'CSV'
+        NDJSON = 'ndjson', 'NDJSON'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    format = models.CharField(max_length=10, choices=Format.choices, default=Format.CSV)
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    file = models.FileField(upload_to='exports', blank=True)
+    row_count = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.kind} export #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = 'export job'
+        verbose_name_plural = 'export jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
@@ -0,0 +1,173 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from datetime import datetime
+from urllib import parse
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['position', 'reverse'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a unique ``(created_at, id)`` key.
+
+    Unlike DRF's ``CursorPagination`` the cursor stores the whole key of the
+    boundary row, so every page is a single indexed range scan with
+    ``LIMIT page_size + 1`` and no OFFSET, no matter how deep the client is.
+    Search results ranked by ``TrigramSearchFilter`` are paged on
+    ``(search_rank, id)`` instead, keeping their relevance order.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_fields = ('created_at', 'id')
+    ranked_cursor_fields = ('search_rank', 'id')
+
+    def get_cursor_fields(self, queryset):
+        if self.ranked_cursor_fields[0] in queryset.query.annotations:
+            return self.ranked_cursor_fields
+        return self.cursor_fields
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.build_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.build_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        The query for the requested page plus one row to tell whether there
+        is a next one, or ``None`` when pagination is off.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor_fields = self.get_cursor_fields(queryset)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        # Newest first; a reversed cursor walks the same index backwards.
+        direction = '' if reverse else '-'
+        queryset = queryset.order_by(*[direction + field for field in self.cursor_fields])
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_position_filter(self.cursor.position, reverse))
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, results):
+        reverse = self.cursor is not None and self.cursor.reverse
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_position_filter(self, position, reverse):
+        # (a, b) < (x, y)  <=>  a <= x AND (a < x OR b < y); the leading
+        # ``a <= x`` keeps the predicate usable as an index range condition.
+        lookup = 'gt' if reverse else 'lt'
+        bound = 'gte' if reverse else 'lte'
+        first, second = self.cursor_fields
+        return Q(**{f'{first}__{bound}': position[0]}) & (
+            Q(**{f'{first}__{lookup}': position[0]}) | Q(**{f'{second}__{lookup}': position[1]})
+        )
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            return tuple(instance[field] for field in self.cursor_fields)
+        return tuple(getattr(instance, field) for field in self.cursor_fields)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(position=self.get_position(self.page[-1]), reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # An empty page past the end: step back from the requested position.
+            return self.encode_cursor(Cursor(position=self.cursor.position, reverse=True))
+        return self.encode_cursor(Cursor(position=self.get_position(self.page[0]), reverse=True))
+
+    def parse_key(self, value):
+        if self.cursor_fields[0] == self.ranked_cursor_fields[0]:
+            return float(value)
+        return datetime.fromisoformat(value)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            if tokens['k'][0] != self.cursor_fields[0]:
+                raise ValueError('Cursor belongs to a different ordering')
+            position = (self.parse_key(tokens['p'][0]), int(tokens['i'][0]))
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(position=position, reverse=reverse)
+
+    def encode_cursor(self, cursor):
+        key = cursor.position[0]
+        tokens = {
+            'k': self.cursor_fields[0],
+            'p': key.isoformat() if isinstance(key, datetime) else repr(key),
+            'i': str(cursor.position[1]),
+        }
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator that takes the row count from the PostgreSQL
+    planner's estimate (``EXPLAIN``, which reads the ``pg_class`` and
+    ``pg_statistic`` figures ANALYZE keeps) instead of a ``COUNT(*)`` that
+    scans a million-row table on every page. Estimates below
+    ``exact_count_below`` are counted exactly, so small tables and narrow
+    filters show true totals; other databases always count.
+    """
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.exact_count_below:
+            return super().count
+        return estimate
+
+    def estimate_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or connections[queryset.db].vendor != 'postgresql':
+            return None
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return plan[0]['Plan']['Plan Rows']
+
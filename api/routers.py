@@ -0,0 +1,256 @@
+"""
+Read replicas for the list, filter and total-payment endpoints.
+
+Reads go to a replica only where a view opts in with ``ReplicaReadMixin``
+(or code runs inside ``use_replica()``); everything else, and every write,
+uses ``default``. After a client writes, ``ReplicaRoutingMiddleware`` pins
+it to the primary for ``REPLICA_STICKY_SECONDS`` with a cookie, so it reads
+its own writes while the replicas catch up. Replicas that fail a health
+check, or lag more than ``REPLICA_MAX_LAG_SECONDS``, are left out until a
+later check passes. Checks run on a background thread of each process, never
+in a request; a replica failing between checks is taken out by the first
+read it fails, which is retried on the primary.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DatabaseError, DEFAULT_DB_ALIAS, OperationalError, connections
+
+logger = logging.getLogger('api.replicas')
+
+_routing_state = ContextVar('routing_state', default=None)
+
+
+class RoutingState:
+    """
+    Routing of one request: whether its reads may use a replica, which one
+    they used, and whether it wrote anything.
+    """
+    __slots__ = ('use_replica', 'pinned', 'replica', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.use_replica = False
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+@contextmanager
+def routing(pinned=False):
+    state = RoutingState(pinned=pinned)
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """
+    Lets reads inside the block use a replica, outside any request too.
+    """
+    state = _routing_state.get()
+    if state is not None:
+        previous, state.use_replica = state.use_replica, True
+        try:
+            yield state
+        finally:
+            state.use_replica = previous
+        return
+    with routing() as state:
+        state.use_replica = True
+        yield state
+
+
+def current_replica():
+    """
+    Alias of the replica the current request read from, if any.
+    """
+    state = _routing_state.get()
+    return state.replica if state is not None else None
+
+
+class ReplicaSet:
+    """
+    The configured replicas and their health. A daemon thread per process,
+    started by the first read that could use a replica, checks them every
+    ``REPLICA_HEALTH_CHECK_INTERVAL`` seconds (``0`` turns it off, leaving
+    ``mark_down()`` and explicit ``check_all()`` calls). Requests only read
+    the last result, so a slow or unreachable replica never delays them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.checked_at = None
+        self.down = set()
+
+    @property
+    def aliases(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    @property
+    def interval(self):
+        return getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10)
+
+    def available(self):
+        aliases = self.aliases
+        if not aliases:
+            return []
+        self.start()
+        return [alias for alias in aliases if alias not in self.down]
+
+    def start(self):
+        """
+        Starts this process's health check thread unless it runs already;
+        a forked worker starts its own.
+        """
+        if self.interval <= 0 or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run, name='replica-health-check', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def run(self):
+        while self.interval > 0:
+            try:
+                self.check_all()
+            except Exception:
+                logger.exception("Replica health check failed")
+            time.sleep(self.interval)
+
+    def check_all(self):
+        self.checked_at = time.monotonic()
+        for alias in self.aliases:
+            healthy, lag = self.check(alias)
+            if not healthy:
+                self.mark_down(alias, lag)
+            elif alias in self.down:
+                logger.warning("Replica %s back in service", alias)
+                self.down.discard(alias)
+
+    def mark_down(self, alias, lag=None):
+        """
+        Takes ``alias`` out of reads until a health check passes again.
+        """
+        with self._lock:
+            if alias in self.down:
+                return
+            self.down.add(alias)
+        logger.warning("Replica %s removed from reads (lag: %s)", alias, lag)
+
+    def check(self, alias):
+        """
+        Returns ``(healthy, lag_seconds)``; the lag is ``None`` when the
+        replica is unreachable or cannot report it (SQLite stand-ins).
+        """
+        try:
+            with connections[alias].cursor() as cursor:
+                lag = self.lag(cursor, connections[alias].vendor)
+        except DatabaseError:
+            return False, None
+        finally:
+            # Outside requests nothing else closes the checking thread's connection.
+            if threading.current_thread() is self._thread:
+                connections[alias].close()
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30)
+        return lag is None or lag <= max_lag, lag
+
+    def lag(self, cursor, vendor):
+        if vendor != 'postgresql':
+            cursor.execute("SELECT 1")
+            return None
+        # An idle primary writes nothing to replay, so a caught-up replica
+        # counts as zero lag however old its last replayed transaction is.
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )
+        lag = cursor.fetchone()[0]
+        return float(lag) if lag is not None else None
+
+
+replicas = ReplicaSet()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if state is None or not state.use_replica or state.pinned or state.wrote:
+            return None
+        # Reads inside a transaction must see its own writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        available = replicas.available()
+        if not available:
+            return None
+        if state.replica not in available:
+            state.replica = random.choice(available)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Lets a view's ``GET``/``HEAD`` read from a replica, its cache and
+    conditional GET lookups included; place it first among the bases.
+    When the replica fails with ``OperationalError``, ``fail_over()`` marks
+    it down and the dispatcher, sync or async (``AsyncAPIView``), runs the
+    request again on the primary. Streamed responses read after
+    ``dispatch()`` returns, so a failure mid-stream is not retried.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        state = _routing_state.get()
+        if state is not None and request.method in ('GET', 'HEAD'):
+            state.use_replica = True
+        super().initial(request, *args, **kwargs)
+
+    def fail_over(self, error):
+        """
+        Returns whether the request should run again: ``error`` came from
+        the replica, which is now marked down, and the rest of the request
+        reads from the primary. Call it on the thread that ran the query.
+        """
+        state = _routing_state.get()
+        if state is None or state.replica is None or not connections[state.replica].errors_occurred:
+            return False
+        logger.warning("Read from replica %s failed, retrying on the primary", state.replica, exc_info=error)
+        replicas.mark_down(state.replica)
+        try:
+            connections[state.replica].close()
+        except DatabaseError:
+            pass
+        state.replica, state.use_replica, state.pinned = None, False, True
+        return True
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except OperationalError as error:
+            if not self.fail_over(error):
+                raise
+            return super().dispatch(request, *args, **kwargs)
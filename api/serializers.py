@@ -1,6 +1,29 @@
-from django.db.models import Sum
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
 from rest_framework import serializers
-from .models import User, University, Student, Sponsor, StudentSponsor, TotalPayment
+from django.urls import reverse
+from django.utils import timezone
+from .fieldsets import DynamicFieldsMixin
+from .instrumentation import measure_serializer
+from .matching import POLICIES
+from .timeseries import BUCKETS, DIMENSIONS, METRICS, bucket_start, next_bucket, periods
+from .models import User, University, Student, Sponsor, StudentSponsor, TotalPayment, ExportJob
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent producing ``.data`` to the sampled request stats.
+    """
+
+    @property
+    def data(self):
+        with measure_serializer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -8,6 +31,12 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['email', 'username', 'password', 'confirm_password', 'role']
+        # Duplicates are reported by the INSERT itself (UserManager), saving two queries.
+        extra_kwargs = {
+            'email': {'validators': []},
+            'username': {'validators': []},
+            'password': {'write_only': True},
+        }
 
     def validate(self, data):
         password = data.get('password')
@@ -23,18 +52,22 @@ class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
-# class UniversitySerializer(serializers.ModelSerializer):
-#     class Meta:
-#         model = University
-#         fields = ['id', 'name']
+class UniversitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = University
+        fields = ['id', 'name']
+
+class StudentSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'university': UniversitySerializer}
 
-class StudentSerializer(serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Student
         fields = ['id', 'full_name', 'degree', 'allocated_money', 'contract_price', 'university']
 
-class SponsorsSerializer(serializers.ModelSerializer):
+class SponsorsSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Sponsor
         fields = ["id", "full_name", "phone_number", "amount", "custom_amount", "deposit_money", "is_organization", "organization_name", "progress"]
 
@@ -43,37 +76,199 @@ class SponsorDeleteSerializer(serializers.ModelSerializer):
         model = Sponsor
         fields = []
 
-class StudentsSponsorsSerializer(serializers.ModelSerializer):
+class StudentsSponsorsSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'sponsor': SponsorsSerializer, 'student': StudentSerializer}
+
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = StudentSponsor
         fields = "__all__"
 
+    def validate(self, data):
+        amount = data.get('amount')
+        if amount is not None and amount <= 0:
+            raise serializers.ValidationError({'amount': "Amount must be greater than zero."})
+        # Early feedback only; the balance UPDATE rejects overdrafts atomically.
+        if self.instance is None and amount is not None and amount > data['sponsor'].amount:
+            raise serializers.ValidationError({'amount': "Homiy hisobida yetarli mablag' mavjud emas!"})
+        return data
+
+class SponsorNameSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Sponsor
+        fields = ['id', 'full_name', 'organization_name', 'sponsor_status']
+
+
+class StudentNameSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    university = UniversitySerializer(read_only=True)
+
+    class Meta:
+        model = Student
+        fields = ['id', 'full_name', 'degree', 'university']
+
+
+class StudentAllocationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    One of a student's allocations, with the sponsor's name.
+    """
+    sponsor = SponsorNameSerializer(read_only=True)
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+        model = StudentSponsor
+        fields = ['id', 'sponsor', 'amount', 'created_at']
+
+
+class SponsorAllocationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    One of a sponsor's allocations, with the student's name and university.
+    """
+    student = StudentNameSerializer(read_only=True)
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+        model = StudentSponsor
+        fields = ['id', 'student', 'amount', 'created_at']
+
+
+class BulkAllocationRowSerializer(serializers.Serializer):
+    sponsor = serializers.IntegerField(min_value=1)
+    student = serializers.IntegerField(min_value=1)
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=Decimal('0.01'))
+
+
+class BulkAllocationSerializer(serializers.Serializer):
+    allocations = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=10000)
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    def save(self):
+        """
+        Validates every row on its own, then hands the well-formed ones to
+        ``StudentSponsor.objects.bulk_allocate``. Returns ``(created, errors)``
+        with ``errors`` as a list of ``{"index", "errors"}`` items.
+        """
+        rows, errors = [], {}
+        for index, item in enumerate(self.validated_data['allocations']):
+            row = BulkAllocationRowSerializer(data=item)
+            if row.is_valid():
+                rows.append((index, row.validated_data))
+            else:
+                errors[index] = row.errors
+
+        all_or_nothing = self.validated_data['all_or_nothing']
+        created = []
+        if rows and not (errors and all_or_nothing):
+            created, row_errors = StudentSponsor.objects.bulk_allocate(rows, all_or_nothing=all_or_nothing)
+            errors.update(row_errors)
+        return created, [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+
+
+class MatchSerializer(serializers.Serializer):
+    policy = serializers.ChoiceField(
+        choices=[(name, policy.description) for name, policy in POLICIES.items()], default='most_in_need')
+    apply = serializers.BooleanField(default=False)
+    fingerprint = serializers.CharField(required=False, max_length=64,
+                                        help_text="Fingerprint of the previewed plan; applying fails if it changed.")
+
+
+class TimeSeriesQuerySerializer(serializers.Serializer):
+    MAX_PERIODS = 1000
+
+    metric = serializers.ChoiceField(choices=list(METRICS), default='allocations')
+    bucket = serializers.ChoiceField(choices=BUCKETS, default='month')
+    start = serializers.DateField(required=False, input_formats=['iso-8601'],
+                                  help_text="First day (YYYY-MM-DD); twelve months before `end` by default.")
+    end = serializers.DateField(required=False, input_formats=['iso-8601'], help_text="Last day; today by default.")
+    university = serializers.IntegerField(required=False, min_value=1, help_text="Allocations only.")
+    degree = serializers.ChoiceField(choices=Student.StudentTypes.choices, required=False, help_text="Allocations only.")
+    sponsor_status = serializers.ChoiceField(choices=Sponsor.SponsorStatus.choices, required=False)
+
+    def validate(self, attrs):
+        end = attrs.setdefault('end', timezone.localdate())
+        # The last twelve months in whole buckets, the one holding ``end`` included.
+        start = attrs.setdefault(
+            'start', next_bucket(bucket_start(end - timedelta(days=365), attrs['bucket']), attrs['bucket']))
+        if start > end:
+            raise serializers.ValidationError({'start': "Must not be after end."})
+        unsupported = [name for name in ('university', 'degree', 'sponsor_status')
+                       if name in attrs and name not in DIMENSIONS[attrs['metric']]]
+        if unsupported:
+            raise serializers.ValidationError({name: f"Not a dimension of {attrs['metric']}." for name in unsupported})
+        if len(list(islice(periods(start, end, attrs['bucket']), self.MAX_PERIODS + 1))) > self.MAX_PERIODS:
+            raise serializers.ValidationError({'bucket': f"More than {self.MAX_PERIODS} periods; use a larger bucket."})
+        return attrs
+
+
+class TimeSeriesPointSerializer(serializers.Serializer):
+    period = serializers.DateField(help_text="First day of the bucket.")
+    count = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2, required=False,
+                                      help_text="Money allocated; allocations only.")
+
+
+class TimeSeriesSerializer(serializers.Serializer):
+    metric = serializers.CharField()
+    bucket = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    results = TimeSeriesPointSerializer(many=True)
+
+
+class FundingStatsQuerySerializer(serializers.Serializer):
+    university = serializers.IntegerField(required=False, min_value=1)
+    degree = serializers.ChoiceField(choices=Student.StudentTypes.choices, required=False)
+
+
+class FundingTotalsSerializer(serializers.Serializer):
+    students = serializers.IntegerField()
+    contract_price = serializers.DecimalField(max_digits=20, decimal_places=2)
+    allocated_money = serializers.DecimalField(max_digits=20, decimal_places=2)
+    coverage = serializers.FloatField(allow_null=True, help_text="allocated_money / contract_price; null without "
+                                                                 "contracts.")
+    sponsors = serializers.IntegerField(help_text="Distinct sponsors funding these students.")
+
+
+class DegreeFundingSerializer(FundingTotalsSerializer):
+    degree = serializers.ChoiceField(choices=Student.StudentTypes.choices)
+
+
+class UniversityFundingSerializer(FundingTotalsSerializer):
+    university = UniversitySerializer()
+    degrees = DegreeFundingSerializer(many=True)
+
+
+class FundingStatsSerializer(serializers.Serializer):
+    totals = FundingTotalsSerializer()
+    results = UniversityFundingSerializer(many=True)
+
+
 class StudentDeleteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = []
 
-class TotalPaymentsSerializer(serializers.ModelSerializer):
-    total_paid = serializers.DecimalField(max_digits=10, decimal_places=2)
-    total_requested = serializers.DecimalField(max_digits=10, decimal_places=2)
-    total_needed = serializers.DecimalField(max_digits=10, decimal_places=2)
+class TotalPaymentsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    total_needed = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
 
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = TotalPayment
         fields = ['total_paid', 'total_requested', 'total_needed']
 
-    def __init__(self, *args, **kwargs):
-        total_paid = Sponsor.objects.aggregate(total_paid=Sum('amount'))['total_paid'] or 0
-        total_requested = Student.objects.aggregate(total_requested=Sum('contract_price'))['total_requested'] or 0
-        total_needed = total_requested - total_paid
-        kwargs['context'] = {'total_paid': total_paid, 'total_requested': total_requested, 'total_needed': total_needed}
-        super().__init__(*args, **kwargs)
 
-    def get_total_paid(self, obj):
-        return self.context.get('total_paid', 0)
+class ExportJobSerializer(serializers.ModelSerializer):
+    filters = serializers.DictField(child=serializers.CharField(), required=False)
+    download_url = serializers.SerializerMethodField()
 
-    def get_total_requested(self, obj):
-        return self.context.get('total_requested', 0)
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'kind', 'format', 'filters', 'status', 'row_count', 'error',
+                  'created_at', 'started_at', 'finished_at', 'attempts', 'download_url']
+        read_only_fields = ['status', 'row_count', 'error', 'created_at', 'started_at', 'finished_at', 'attempts']
 
-    def get_total_needed(self, obj):
-        return self.context.get('total_needed', 0)
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.Status.DONE:
+            return None
+        url = reverse('export-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
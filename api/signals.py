@@ -0,0 +1,72 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+from .authentication import user_cache
+from .cache import invalidate
+from .models import (User, Sponsor, Student, StudentSponsor, University, TotalPayment, SponsorDailyRollup,
+                     AllocationDailyRollup)
+
+
+@receiver(post_delete, sender=Sponsor)
+def sponsor_deleted(sender, instance, **kwargs):
+    TotalPayment.objects.apply_delta(paid=-instance.amount)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    TotalPayment.objects.apply_delta(requested=-instance.contract_price)
+
+
+def deleted_from(origin):
+    """
+    The model ``delete()`` was called on, for a deletion's ``origin``.
+    """
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(post_delete, sender=Sponsor)
+def sponsor_rollup_deleted(sender, instance, **kwargs):
+    SponsorDailyRollup.objects.record([instance], sign=-1)
+
+
+# The deletion's origin counts its allocations down: one aggregate for each
+# deleted sponsor, student or university instead of a lookup per cascaded row.
+@receiver(pre_delete, sender=Sponsor)
+@receiver(pre_delete, sender=Student)
+@receiver(pre_delete, sender=University)
+def allocation_rollups_cascaded(sender, instance, origin=None, **kwargs):
+    if deleted_from(origin) is not sender:
+        return
+    if sender is University:
+        allocations = StudentSponsor.objects.filter(student__university=instance)
+    else:
+        allocations = instance.get_allocations()
+    AllocationDailyRollup.objects.record_queryset(allocations, sign=-1)
+
+
+@receiver(post_delete, sender=StudentSponsor)
+def allocation_rollup_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_from(origin) is not sender:
+        return
+    AllocationDailyRollup.objects.record(
+        [(instance.sponsor_id, instance.student_id, instance.created_at, -1, -instance.amount)])
+
+
+@receiver(post_save, sender=Sponsor)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=StudentSponsor)
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=Sponsor)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=StudentSponsor)
+@receiver(post_delete, sender=University)
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate(sender)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # After commit, so a concurrent request cannot cache the old row again.
+    transaction.on_commit(lambda: user_cache.discard(instance.pk))
@@ -0,0 +1,83 @@
+"""
+Funding coverage per university and degree.
+
+Student totals come from one grouped query over the students table, which
+``student_university_degree_idx`` answers by itself (it holds every column
+the query reads). Sponsor counts are distinct counts over the allocations,
+joined to their students through ``allocation_student_sponsor_idx``;
+they cannot be summed across groups, so each level has its own count.
+The endpoint caches the result until a student, allocation or university
+changes.
+"""
+from decimal import Decimal
+from django.db.models import Count, Sum
+from .models import University, Student, StudentSponsor
+
+
+def coverage(allocated, contract):
+    return round(float(allocated / contract), 4) if contract else None
+
+
+def funding_totals(students=0, contract_price=Decimal(0), allocated_money=Decimal(0), sponsors=0):
+    return {
+        'students': students,
+        'contract_price': contract_price,
+        'allocated_money': allocated_money,
+        'coverage': coverage(allocated_money, contract_price),
+        'sponsors': sponsors,
+    }
+
+
+def funding_by_university(university=None, degree=None):
+    """
+    Returns ``(universities, totals)``: per university (by name) its totals
+    and those of each of its degrees, and the totals of everything counted.
+    """
+    students = Student.objects.order_by()
+    allocations = StudentSponsor.objects.order_by()
+    if university is not None:
+        students, allocations = students.filter(university=university), allocations.filter(student__university=university)
+    if degree is not None:
+        students, allocations = students.filter(degree=degree), allocations.filter(student__degree=degree)
+
+    groups = students.values_list('university_id', 'degree').annotate(
+        count=Count('pk'), contract_price=Sum('contract_price'), allocated_money=Sum('allocated_money'))
+    degree_sponsors = {
+        (university_id, degree): count for university_id, degree, count in
+        allocations.values_list('student__university_id', 'student__degree').annotate(
+            count=Count('sponsor_id', distinct=True))
+    }
+    university_sponsors = dict(
+        allocations.values_list('student__university_id').annotate(count=Count('sponsor_id', distinct=True)))
+
+    universities = {}
+    for university_id, degree, count, contract_price, allocated_money in groups:
+        entry = universities.setdefault(university_id, {'degrees': []})
+        entry['degrees'].append({
+            'degree': degree,
+            **funding_totals(count, contract_price, allocated_money, degree_sponsors.get((university_id, degree), 0)),
+        })
+    names = dict(University.objects.filter(pk__in=universities).values_list('pk', 'name'))
+
+    results = []
+    for university_id, entry in universities.items():
+        degrees = sorted(entry['degrees'], key=lambda item: item['degree'])
+        results.append({
+            'university': {'id': university_id, 'name': names.get(university_id)},
+            **funding_totals(
+                sum(item['students'] for item in degrees),
+                sum((item['contract_price'] for item in degrees), Decimal(0)),
+                sum((item['allocated_money'] for item in degrees), Decimal(0)),
+                university_sponsors.get(university_id, 0),
+            ),
+            'degrees': degrees,
+        })
+    results.sort(key=lambda item: (item['university']['name'] or '', item['university']['id']))
+
+    totals = funding_totals(
+        sum(item['students'] for item in results),
+        sum((item['contract_price'] for item in results), Decimal(0)),
+        sum((item['allocated_money'] for item in results), Decimal(0)),
+        allocations.aggregate(count=Count('sponsor_id', distinct=True))['count'],
+    )
+    return results, totals
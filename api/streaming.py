@@ -0,0 +1,100 @@
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def chunk_encoder(serializer_class, context=None, row_encoder=None):
+    """
+    Encodes a list of rows as the comma separated items of a JSON array,
+    matching DRF's ``JSONRenderer`` with the project settings. Rows are
+    model instances, or ``.values_list()`` tuples when ``row_encoder`` is set.
+    """
+    encoder = JSONEncoder(
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':'),
+    )
+
+    def encode(rows):
+        if row_encoder is not None:
+            data = row_encoder.encode_rows(rows)
+        else:
+            data = serializer_class(rows, many=True, context=context or {}).data
+        text = ','.join(encoder.encode(item) for item in data)
+        return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+    return encode
+
+
+def stream_json_array(queryset, serializer_class, chunk_size=500, context=None, row_encoder=None):
+    """
+    Yields ``queryset`` as a JSON array, serializing ``chunk_size`` rows at a
+    time so memory use does not grow with the table.
+    """
+    encode = chunk_encoder(serializer_class, context, row_encoder)
+    yield '['
+    chunk, separator = [], ''
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            yield separator + encode(chunk)
+            chunk, separator = [], ','
+    if chunk:
+        yield separator + encode(chunk)
+    yield ']'
+
+
+async def astream_json_array(queryset, serializer_class, chunk_size=500, context=None, row_encoder=None):
+    """
+    ``stream_json_array`` for ASGI: rows are fetched with the async ORM, so
+    the event loop is free while the client reads.
+    """
+    encode = chunk_encoder(serializer_class, context, row_encoder)
+    yield '['
+    chunk, separator = [], ''
+    async for obj in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            yield separator + encode(chunk)
+            chunk, separator = [], ','
+    if chunk:
+        yield separator + encode(chunk)
+    yield ']'
+
+
+class StreamingListMixin:
+    """
+    Opt-in streaming for list endpoints: ``?stream=1`` returns the whole,
+    unpaginated result as a chunked JSON array instead of a page.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+    stream_ordering = ('-created_at', '-id')
+
+    def wants_stream(self, request):
+        return request.query_params.get(self.stream_query_param, '').lower() in ('1', 'true')
+
+    def get_rows(self, queryset, serializer_class):
+        """
+        Returns ``(rows, row_encoder)``; ``RowEncoderMixin`` reads
+        ``.values_list()`` rows instead of model instances.
+        """
+        return queryset, None
+
+    def get_streaming_response(self, queryset, serializer_class, asynchronous=False):
+        stream = astream_json_array if asynchronous else stream_json_array
+        queryset, row_encoder = self.get_rows(queryset, serializer_class)
+        rows = stream(
+            queryset.order_by(*self.stream_ordering),
+            serializer_class,
+            chunk_size=self.stream_chunk_size,
+            context={'request': self.request, 'view': self},
+            row_encoder=row_encoder,
+        )
+        return StreamingHttpResponse(rows, content_type='application/json')
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_stream(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            return self.get_streaming_response(queryset, self.get_serializer_class())
+        return super().list(request, *args, **kwargs)
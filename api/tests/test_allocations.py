@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.test import TestCase
+from api.models import AllocationDailyRollup, Sponsor, Student, StudentSponsor, TotalPayment, University
+
+
+class BulkAllocateTests(TestCase):
+    def setUp(self):
+        TotalPayment.objects.get_summary()
+        university = University.objects.create(name='TATU')
+        self.ali, self.vali = (
+            Student.objects.create(full_name=name, degree='bachelor', contract_price=Decimal('5000'),
+                                   university=university)
+            for name in ('Ali Valiyev', 'Vali Aliyev')
+        )
+        self.olim, self.nodira = (
+            Sponsor.objects.create(
+                full_name=name, phone_number=phone, amount=amount, is_organization=False,
+                progress=Sponsor.StatusChoices.CONFIRMED, sponsor_status=Sponsor.SponsorStatus.INDIVIDUAL,
+            )
+            for name, phone, amount in (('Olim Karimov', '+998901234567', Decimal('1000')),
+                                        ('Nodira Saidova', '+998907654321', Decimal('500')))
+        )
+
+    def rows(self):
+        return [
+            (0, {'sponsor': self.olim.pk, 'student': self.ali.pk, 'amount': Decimal('600')}),
+            # Olim has only 400 left after row 0.
+            (1, {'sponsor': self.olim.pk, 'student': self.vali.pk, 'amount': Decimal('600')}),
+            (2, {'sponsor': self.nodira.pk, 'student': self.ali.pk, 'amount': Decimal('500')}),
+            (3, {'sponsor': self.nodira.pk, 'student': 0, 'amount': Decimal('1')}),
+        ]
+
+    def assertBalances(self, sponsors, students):
+        self.assertEqual(dict(Sponsor.objects.values_list('pk', 'amount')), sponsors)
+        self.assertEqual(dict(Student.objects.values_list('pk', 'allocated_money')), students)
+
+    def assertNoDrift(self):
+        summary = TotalPayment.objects.get(pk=TotalPayment.objects.SUMMARY_PK)
+        self.assertEqual((summary.total_paid, summary.total_requested), TotalPayment.objects.compute())
+        self.assertEqual(AllocationDailyRollup.objects.stored(), AllocationDailyRollup.objects.compute())
+
+    def test_overdrawing_row_is_rejected_and_others_kept(self):
+        created, errors = StudentSponsor.objects.bulk_allocate(self.rows())
+
+        self.assertEqual(sorted(errors), [1, 3])
+        self.assertIn('amount', errors[1])
+        self.assertIn('student', errors[3])
+        self.assertEqual([(row.sponsor_id, row.student_id, row.amount) for row in created], [
+            (self.olim.pk, self.ali.pk, Decimal('600')),
+            (self.nodira.pk, self.ali.pk, Decimal('500')),
+        ])
+        self.assertEqual(StudentSponsor.objects.count(), 2)
+        self.assertBalances({self.olim.pk: Decimal('400'), self.nodira.pk: Decimal('0')},
+                            {self.ali.pk: Decimal('1100'), self.vali.pk: Decimal('0')})
+        stored = AllocationDailyRollup.objects.stored().values()
+        self.assertEqual(sum(count for count, _ in stored), 2)
+        self.assertEqual(sum(amount for _, amount in stored), Decimal('1100'))
+        self.assertNoDrift()
+
+    def test_all_or_nothing_rolls_everything_back(self):
+        before = TotalPayment.objects.compute()
+        created, errors = StudentSponsor.objects.bulk_allocate(self.rows(), all_or_nothing=True)
+
+        self.assertEqual(created, [])
+        self.assertEqual(sorted(errors), [1, 3])
+        self.assertFalse(StudentSponsor.objects.exists())
+        self.assertBalances({self.olim.pk: Decimal('1000'), self.nodira.pk: Decimal('500')},
+                            {self.ali.pk: Decimal('0'), self.vali.pk: Decimal('0')})
+        self.assertEqual(TotalPayment.objects.compute(), before)
+        self.assertEqual(AllocationDailyRollup.objects.stored(), {})
+        self.assertNoDrift()
+
+    def test_valid_rows_all_or_nothing(self):
+        rows = [row for row in self.rows() if row[0] in (0, 2)]
+        created, errors = StudentSponsor.objects.bulk_allocate(rows, all_or_nothing=True)
+
+        self.assertEqual((len(created), errors), (2, {}))
+        self.assertBalances({self.olim.pk: Decimal('400'), self.nodira.pk: Decimal('0')},
+                            {self.ali.pk: Decimal('1100'), self.vali.pk: Decimal('0')})
+        self.assertNoDrift()
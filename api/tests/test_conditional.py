@@ -0,0 +1,76 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from api.models import Sponsor, Student, StudentSponsor, TotalPayment, University
+from api.views import StudentAPIView
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        TotalPayment.objects.get_summary()
+        cache.clear()
+        self.university = University.objects.create(name='TATU')
+        self.student = Student.objects.create(full_name='Ali Valiyev', degree='bachelor', contract_price=1000,
+                                              university=self.university)
+        self.sponsor = Sponsor.objects.create(
+            full_name='Olim Karimov', phone_number='+998901234567', amount=Decimal('5000000'),
+            is_organization=False, progress=Sponsor.StatusChoices.NEW,
+            sponsor_status=Sponsor.SponsorStatus.INDIVIDUAL,
+        )
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def assertChangesETag(self, url, write):
+        etag = self.get(url)['ETag']
+        # Runs invalidate() too, or the response cache would answer with the old body.
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_matching_etag_skips_handler(self):
+        url = reverse('student-list')
+        etag = self.get(url)['ETag']
+        cache.clear()
+        with mock.patch.object(StudentAPIView, 'get') as handler, self.assertNumQueries(1):
+            response = self.get(url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        handler.assert_not_called()
+
+    def test_writes_change_etag(self):
+        url = reverse('sponsors-list')
+
+        def save():
+            self.sponsor.full_name = 'Olim Karimov (Toshkent)'
+            self.sponsor.save()
+
+        self.assertChangesETag(url, save)
+        self.assertChangesETag(url, lambda: Sponsor.objects.set_progress(
+            Sponsor.objects.filter(pk=self.sponsor.pk), Sponsor.StatusChoices.CONFIRMED))
+        self.assertChangesETag(url, lambda: Sponsor.objects.allocate({self.sponsor.pk: Decimal('1000')}))
+        self.assertChangesETag(url, lambda: StudentSponsor.objects.create(
+            sponsor=self.sponsor, student=self.student, amount=Decimal('1000')))
+
+    def test_delete_changes_etag_through_count(self):
+        older = Student.objects.create(full_name='Vali Aliyev', degree='master', contract_price=2000,
+                                       university=self.university)
+        Student.objects.filter(pk=older.pk).update(updated_at=self.student.updated_at.replace(year=2000))
+        # The newest updated_at stays the same; only the row count moves.
+        self.assertChangesETag(reverse('student-list'), older.delete)
+
+    def test_expanded_relation_changes_etag(self):
+        url = reverse('student-list') + '?expand=university'
+        self.assertEqual(self.get(url, self.get(url)['ETag']).status_code, 304)
+
+        def rename():
+            self.university.name = 'TDTU'
+            self.university.save()
+
+        self.assertChangesETag(url, rename)
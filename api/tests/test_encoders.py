@@ -0,0 +1,77 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from api.encoders import RowEncoder
+from api.models import Sponsor, Student, StudentSponsor, TotalPayment, University
+
+
+class RowEncoderTests(TestCase):
+    """
+    List pages come out byte for byte the same with and without
+    ``FAST_LIST_SERIALIZATION``.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        TotalPayment.objects.get_summary()
+        university = University.objects.create(name='TATU')
+        students = [
+            Student.objects.create(full_name='Ali Valiyev', degree='bachelor', contract_price=Decimal('12000000'),
+                                   university=university),
+            Student.objects.create(full_name='Vali Aliyev', degree='master', contract_price=Decimal('1234.5'),
+                                   university=university),
+        ]
+        sponsors = [
+            # custom_amount and organization_name stay null.
+            Sponsor.objects.create(
+                full_name='Olim Karimov', phone_number='+998901234567', amount=Decimal('5000000.5'),
+                is_organization=False, progress=Sponsor.StatusChoices.NEW,
+                sponsor_status=Sponsor.SponsorStatus.INDIVIDUAL,
+            ),
+            Sponsor.objects.create(
+                full_name='Nodira Saidova', phone_number='+998907654321', amount=Decimal('7000000'),
+                is_organization=True, organization_name='Artel',
+                progress=Sponsor.StatusChoices.CONFIRMED, sponsor_status=Sponsor.SponsorStatus.JURIDICAL,
+            ),
+        ]
+        # save() clears custom_amount once amount is set.
+        Sponsor.objects.filter(pk=sponsors[1].pk).update(custom_amount=Decimal('0.1'))
+        for sponsor, student, amount in zip(sponsors, students, (Decimal('1000.25'), Decimal('3'))):
+            StudentSponsor.objects.create(sponsor=sponsor, student=student, amount=amount)
+        # A one-digit hour, where DATETIME_FORMAT's %-H differs from %H.
+        StudentSponsor.objects.filter(sponsor=sponsors[0]).update(
+            created_at=timezone.make_aware(datetime(2024, 1, 2, 3, 4, 5, 678901)))
+
+    def assertSameContent(self, url):
+        responses = {}
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(FAST_LIST_SERIALIZATION=fast), \
+                    mock.patch.object(RowEncoder, 'encode_rows', autospec=True,
+                                      side_effect=RowEncoder.encode_rows) as encode_rows:
+                responses[fast] = self.client.get(url)
+            self.assertEqual(responses[fast].status_code, 200, url)
+            self.assertEqual(encode_rows.called, fast, url)
+        self.assertEqual(responses[True].content, responses[False].content, url)
+
+    def test_lists(self):
+        for name in ('sponsors-list', 'student-list', 'sponsor-filter', 'student-filter', 'sponsor-student-filter'):
+            self.assertSameContent(reverse(name))
+
+    def test_expand(self):
+        self.assertSameContent(reverse('student-list') + '?expand=university')
+        self.assertSameContent(reverse('sponsor-student-filter') + '?expand=sponsor,student')
+
+    def test_fields(self):
+        self.assertSameContent(reverse('sponsors-list') + '?fields=id,custom_amount,organization_name')
+        self.assertSameContent(reverse('sponsor-student-filter') + '?fields=id,amount,created_at')
+        self.assertSameContent(reverse('sponsor-student-filter') + '?fields=id,sponsor&expand=sponsor')
+
+    def test_one_digit_hour(self):
+        content = self.client.get(reverse('sponsor-student-filter') + '?fields=created_at').content
+        self.assertIn(b'"02-01-2024 3:04:05"', content)
+        self.assertSameContent(reverse('sponsor-student-filter') + '?fields=created_at')
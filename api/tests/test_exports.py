@@ -0,0 +1,84 @@
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api import exports
+from api.exports import claim_next_job, process_job
+from api.models import ExportJob, Sponsor
+
+
+@override_settings(EXPORT_JOB_TIMEOUT=300, EXPORT_JOB_MAX_ATTEMPTS=3)
+class ExportJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        for index in range(5):
+            Sponsor.objects.create(
+                full_name=f'Homiy {index}', phone_number=f'+99890000000{index}', amount=Decimal('1000000'),
+                is_organization=False, progress=Sponsor.StatusChoices.NEW,
+                sponsor_status=Sponsor.SponsorStatus.INDIVIDUAL,
+            )
+
+    def running(self, started, heartbeat, attempts=1):
+        now = timezone.now()
+        return ExportJob.objects.create(
+            kind=ExportJob.Kind.SPONSORS, status=ExportJob.Status.RUNNING, attempts=attempts,
+            started_at=now - timedelta(seconds=started), heartbeat_at=now - timedelta(seconds=heartbeat),
+        )
+
+    def test_claim_counts_attempts(self):
+        job = ExportJob.objects.create(kind=ExportJob.Kind.SPONSORS)
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, ExportJob.Status.RUNNING, 1))
+        self.assertEqual(claimed.heartbeat_at, claimed.started_at)
+        self.assertIsNone(claim_next_job())
+
+    def test_long_export_with_heartbeats_is_not_reclaimed(self):
+        self.running(started=2 * 3600, heartbeat=10)
+        self.assertIsNone(claim_next_job())
+
+    def test_job_without_heartbeat_is_reclaimed(self):
+        job = self.running(started=400, heartbeat=301)
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.attempts), (job.pk, 2))
+        self.assertGreater(claimed.started_at, job.started_at)
+
+    def test_job_failing_every_attempt_gives_up(self):
+        job = self.running(started=400, heartbeat=301, attempts=3)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ExportJob.Status.FAILED, 3))
+        self.assertIn('3 attempts', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_writer_records_heartbeats(self):
+        ExportJob.objects.create(kind=ExportJob.Kind.SPONSORS)
+        job = claim_next_job()
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=job.started_at - timedelta(hours=1))
+        with mock.patch.object(exports, 'CHUNK_SIZE', 1), mock.patch.object(exports, 'HEARTBEAT_CHUNKS', 2), \
+                mock.patch.object(exports, 'beat', wraps=exports.beat) as beat:
+            process_job(job)
+        self.assertEqual(beat.call_count, 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.row_count), (ExportJob.Status.DONE, 5))
+        self.assertGreaterEqual(job.heartbeat_at, job.started_at)
+        with gzip.open(job.file.path, 'rt') as handle:
+            self.assertEqual(len(handle.read().splitlines()), 6)
+
+    def test_reclaimed_attempt_stops_writing(self):
+        ExportJob.objects.create(kind=ExportJob.Kind.SPONSORS)
+        job = claim_next_job()
+        # Another worker took the job over.
+        newer = job.started_at + timedelta(seconds=1)
+        ExportJob.objects.filter(pk=job.pk).update(started_at=newer, attempts=2)
+        with mock.patch.object(exports, 'CHUNK_SIZE', 1), mock.patch.object(exports, 'HEARTBEAT_CHUNKS', 1):
+            process_job(job)
+        stored = ExportJob.objects.get(pk=job.pk)
+        self.assertEqual((stored.status, stored.started_at), (ExportJob.Status.RUNNING, newer))
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'exports')), [])
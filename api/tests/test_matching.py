@@ -0,0 +1,111 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from api.matching import POLICIES, Candidate, Funder
+from api.models import Sponsor, Student, StudentSponsor, TotalPayment, University
+
+
+class PolicyTests(SimpleTestCase):
+    def assertFeasible(self, allocations, sponsors, students):
+        """
+        No sponsor gives more than its balance, no student gets more than
+        its need, and the plan moves all the money it can.
+        """
+        given, received = defaultdict(Decimal), defaultdict(Decimal)
+        for sponsor, student, amount in allocations:
+            self.assertGreater(amount, 0)
+            given[sponsor] += amount
+            received[student] += amount
+        balances = {sponsor.pk: sponsor.balance for sponsor in sponsors}
+        needs = {student.pk: student.need for student in students}
+        for sponsor, amount in given.items():
+            self.assertLessEqual(amount, balances[sponsor])
+        for student, amount in received.items():
+            self.assertLessEqual(amount, needs[student])
+        # Every policy stops only when the money or the need runs out.
+        self.assertEqual(sum(given.values()), min(sum(balances.values()), sum(needs.values())))
+
+    def test_plans_never_overdraw_or_overfund(self):
+        generator = random.Random(2024)
+        for trial in range(20):
+            sponsors = [Funder(pk, Decimal(generator.randrange(1, 500)) * 10000)
+                        for pk in range(1, generator.randrange(1, 30))]
+            students = [Candidate(pk, Decimal(generator.randrange(1, 300)) * 10000 + Decimal('0.50'),
+                                  generator.randrange(1, 5))
+                        for pk in range(1, generator.randrange(1, 60))]
+            history = {sponsor.pk: generator.sample(range(1, 5), 2) for sponsor in sponsors[::2]}
+            for name, policy in POLICIES.items():
+                with self.subTest(trial=trial, policy=name):
+                    allocations = policy.plan(sponsors, students, history)
+                    self.assertFeasible(allocations, sponsors, students)
+
+
+class MatchTests(TestCase):
+    def setUp(self):
+        TotalPayment.objects.get_summary()
+        universities = [University.objects.create(name=name) for name in ('TATU', 'TDTU')]
+        self.students = [
+            Student.objects.create(full_name=f'Talaba {index}', degree='bachelor', university=universities[index % 2],
+                                   contract_price=Decimal(index + 1) * Decimal('1500000'))
+            for index in range(6)
+        ]
+        self.sponsors = [
+            Sponsor.objects.create(
+                full_name=f'Homiy {index}', phone_number=f'+99890000000{index}', amount=amount,
+                is_organization=False, progress=Sponsor.StatusChoices.CONFIRMED,
+                sponsor_status=Sponsor.SponsorStatus.INDIVIDUAL,
+            )
+            for index, amount in enumerate((Decimal('5000000'), Decimal('7000000'), Decimal('1000000.50')))
+        ]
+        # Gives same_university a history to follow.
+        StudentSponsor.objects.create(sponsor=self.sponsors[0], student=self.students[1], amount=Decimal('100'))
+
+    def match(self, **data):
+        return self.client.post(reverse('sponsor-student-match'), data, content_type='application/json')
+
+    def assertNoDrift(self):
+        out = StringIO()
+        call_command('rebuild_total_payment', '--dry-run', stdout=out)
+        self.assertIn("No drift found.", out.getvalue())
+        out = StringIO()
+        call_command('backfill_rollups', '--dry-run', stdout=out)
+        self.assertIn("sponsors: ", out.getvalue())
+        self.assertIn("allocations: ", out.getvalue())
+        self.assertEqual(out.getvalue().count(" 0 drifted days"), 2, out.getvalue())
+
+    def test_apply_leaves_no_drift(self):
+        for policy in POLICIES:
+            with self.subTest(policy=policy):
+                preview = self.match(policy=policy)
+                self.assertEqual(preview.status_code, 200)
+                self.assertTrue(preview.data['allocations'])
+                applied = self.match(policy=policy, apply=True, fingerprint=preview.data['fingerprint'])
+                self.assertEqual(applied.status_code, 201)
+                self.assertEqual(len(applied.data['created']), len(preview.data['allocations']))
+                self.assertNoDrift()
+                self.assertFalse(Sponsor.objects.filter(amount__lt=0).exists())
+                self.assertFalse(Student.objects.filter(allocated_money__gt=F('contract_price')).exists())
+
+                # The plan used up every balance; give the next policy money to plan with.
+                sponsor = Sponsor.objects.get(pk=self.sponsors[1].pk)
+                sponsor.amount = Decimal('3000000')
+                sponsor.save()
+
+    def test_stale_fingerprint_conflicts(self):
+        preview = self.match(policy='most_in_need')
+        self.sponsors[2].amount = Decimal('2000000')
+        self.sponsors[2].save()
+
+        response = self.match(policy='most_in_need', apply=True, fingerprint=preview.data['fingerprint'])
+        self.assertEqual(response.status_code, 409)
+        self.assertNotEqual(response.data['fingerprint'], preview.data['fingerprint'])
+        self.assertEqual(StudentSponsor.objects.count(), 1)
+
+        response = self.match(policy='most_in_need', apply=True, fingerprint=response.data['fingerprint'])
+        self.assertEqual(response.status_code, 201)
+        self.assertNoDrift()
@@ -0,0 +1,17 @@
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from api.metrics import REQUESTS
+from api.models import TotalPayment
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        TotalPayment.objects.get_summary()
+
+    def test_async_views_get_their_own_series(self):
+        with mock.patch.object(REQUESTS, 'inc') as inc:
+            self.client.get(reverse('total-payment'))
+            self.client.get(reverse('async:total-payment'))
+        self.assertEqual([call.kwargs['view'] for call in inc.call_args_list],
+                         ['total-payment', 'async:total-payment'])
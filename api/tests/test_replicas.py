@@ -0,0 +1,134 @@
+import copy
+from contextlib import contextmanager
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from api.middleware import ReplicaRoutingMiddleware
+from api.models import Sponsor, TotalPayment
+from api.routers import replicas, routing, use_replica
+
+
+def add_stand_in_replica(alias='replica_0'):
+    """
+    Adds ``alias`` as a second connection to the test database (a test
+    mirror of ``default``) unless a real replica is configured under that
+    name. Runs when the module is imported, before the runner sets up the
+    test databases, so the settings need not know about it.
+    """
+    if alias in connections.settings:
+        return
+    stand_in = copy.deepcopy(connections.settings['default'])
+    stand_in['TEST'] = {**stand_in.get('TEST', {}), 'MIRROR': 'default', 'NAME': None}
+    connections.settings[alias] = stand_in
+
+
+add_stand_in_replica()
+
+
+@contextmanager
+def failing(alias):
+    """
+    Every query on ``alias`` fails the way an unreachable database does.
+    """
+    connection = connections[alias]
+
+    def fail(execute, sql, params, many, context):
+        with connection.wrap_database_errors:
+            raise connection.Database.OperationalError(f"{alias} is unreachable")
+
+    # Not ``execute_wrapper()``: reconnecting installs the query metrics
+    # wrapper after this one, and it pops whichever came last.
+    connection.execute_wrappers.insert(0, fail)
+    try:
+        yield
+    finally:
+        connection.execute_wrappers.remove(fail)
+
+
+# ``replica_0`` mirrors the test database (see above). Transactions are
+# real here: inside a TestCase every read would be in an atomic block and
+# stay on ``default``. The health check thread is off; tests call
+# ``check_all()`` themselves.
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_HEALTH_CHECK_INTERVAL=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        # Built on the first read otherwise, which writes and so stays on the primary.
+        TotalPayment.objects.get_summary()
+        cache.clear()
+        replicas.down.clear()
+        self.addCleanup(replicas.down.clear)
+
+    def get(self, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_0']) as replica:
+            response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_replica_view_reads_replica(self):
+        primary, replica = self.get(reverse('total-payment'))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_and_atomic_reads_use_default(self):
+        with routing(), use_replica() as state:
+            self.assertEqual(router.db_for_read(Sponsor), 'replica_0')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Sponsor), 'default')
+                self.assertEqual(router.db_for_write(Sponsor), 'default')
+            # A request that wrote reads its own writes.
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Sponsor), 'default')
+
+    def test_write_pins_client_to_default(self):
+        response = self.client.post(reverse('sponsor-create'), {
+            'full_name': 'Karimov Aziz', 'phone_number': '+998-90-1234567', 'amount': '1000000',
+            'is_organization': False, 'progress': Sponsor.StatusChoices.NEW,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+        primary, replica = self.get(reverse('total-payment'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        self.client.cookies.pop(ReplicaRoutingMiddleware.cookie_name)
+        cache.clear()
+        primary, replica = self.get(reverse('total-payment'))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_health_check_marks_replica_down_and_back(self):
+        with failing('replica_0'), self.assertLogs('api.replicas', 'WARNING'):
+            replicas.check_all()
+        self.assertEqual(replicas.down, {'replica_0'})
+        with routing(), use_replica():
+            self.assertEqual(router.db_for_read(Sponsor), 'default')
+
+        with self.assertLogs('api.replicas', 'WARNING'):
+            replicas.check_all()
+        self.assertEqual(replicas.down, set())
+        with routing(), use_replica():
+            self.assertEqual(router.db_for_read(Sponsor), 'replica_0')
+
+    def test_failed_replica_read_retries_on_default(self):
+        with failing('replica_0'), self.assertLogs('api.replicas', 'WARNING'):
+            primary, replica = self.get(reverse('total-payment'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replicas.down, {'replica_0'})
+
+    def test_failed_async_replica_read_retries_on_default(self):
+        # From a sync test the async view's ORM calls run on this thread,
+        # so they use its connections and the failing wrapper.
+        with failing('replica_0'), self.assertLogs('api.replicas', 'WARNING'):
+            with CaptureQueriesContext(connections['default']) as primary:
+                response = async_to_sync(self.async_client.get)('/api/async/total-payment')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(primary), 0)
+        self.assertEqual(replicas.down, {'replica_0'})
+
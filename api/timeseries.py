@@ -0,0 +1,68 @@
+"""
+Dashboard time series read from the daily rollup tables.
+
+``SponsorDailyRollup`` and ``AllocationDailyRollup`` hold one row per day
+and dimension combination, kept up to date by every write (see
+``RollupManager``) and rebuilt by ``manage.py backfill_rollups``. A series
+sums those rows into day, week (starting Monday) or month buckets, so a
+12-month chart reads a few hundred small rows instead of scanning the
+sponsor and allocation tables. Buckets without data are returned as zeros.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from .models import SponsorDailyRollup, AllocationDailyRollup
+
+METRICS = {
+    'signups': (SponsorDailyRollup, {'count': Sum('signups')}),
+    'allocations': (AllocationDailyRollup, {'count': Sum('allocations'), 'amount': Sum('amount')}),
+}
+BUCKETS = ('day', 'week', 'month')
+# Filters each metric accepts, as rollup fields.
+DIMENSIONS = {
+    'signups': ('sponsor_status',),
+    'allocations': ('university', 'degree', 'sponsor_status'),
+}
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def periods(start, end, bucket):
+    """
+    The first day of every bucket from ``start``'s to ``end``'s.
+    """
+    period = bucket_start(start, bucket)
+    while period <= end:
+        yield period
+        period = next_bucket(period, bucket)
+
+
+def series(metric, bucket, start, end, **filters):
+    """
+    Returns one ``{'period', 'count'[, 'amount']}`` point per bucket between
+    ``start`` and ``end`` (inclusive days), oldest first.
+    """
+    model, sums = METRICS[metric]
+    rows = (
+        model.objects.filter(day__gte=start, day__lte=end, **filters)
+        .annotate(period=Trunc('day', bucket, output_field=DateField()))
+        .values('period').annotate(**sums).order_by('period')
+    )
+    found = {row['period']: row for row in rows}
+    empty = {'count': 0, 'amount': Decimal(0)} if 'amount' in sums else {'count': 0}
+    return [{**empty, **found.get(period, {}), 'period': period} for period in periods(start, end, bucket)]
@@ -6,18 +6,27 @@ from .views import (
     # UniversityDetailsAPIView,
     SponsorsAPIView,
     SponsorDetailsAPIView,
+    SponsorAllocationsAPIView,
     SponsorCreateAPIView,
     SponsorUpdateAPIView,
     SponsorDeleteAPIView,
     StudentsSponsorsAPIView,
+    StudentsSponsorsBulkAPIView,
+    StudentsSponsorsMatchAPIView,
     StudentAPIView,
+    StudentDetailsAPIView,
     StudentCreateAPIView,
     StudentUpdateAPIView,
     StudentDeleteAPIView,
     SponsorFilterAPIView,
     StudentFilterAPIView,
     StudentSponsorFilterAPIView,
-    TotalPaymentsAPIView
+    TotalPaymentsAPIView,
+    TimeSeriesAPIView,
+    FundingStatsAPIView,
+    ExportCreateAPIView,
+    ExportDetailsAPIView,
+    ExportDownloadAPIView
 )
 
 urlpatterns = [
@@ -27,17 +36,30 @@ urlpatterns = [
     # path('university/<int:pk>', UniversityDetailsAPIView.as_view(), name='university-details'),  # for University List
     path('sponsors', SponsorsAPIView.as_view(), name='sponsors-list'),  # for Sponsors List API View
     path('sponsor/<int:pk>', SponsorDetailsAPIView.as_view(), name='sponsor-detail'),  # for Sponsor Detail View
+    path('sponsor/<int:pk>/students', SponsorAllocationsAPIView.as_view(), name='sponsor-students'),
+    # for a Sponsor with the Students it funds
     path('sponsor/create', SponsorCreateAPIView.as_view(), name='sponsor-create'),  # for Sponsors Create View
     path('sponsor/update/<int:pk>', SponsorUpdateAPIView.as_view(), name='sponsor-update'),  # for Sponsors Update View
     path('sponsor/delete/<int:pk>', SponsorDeleteAPIView.as_view(), name='sponsor-delete'),  # for Sponsors Delete View
     path('sponsor/filter', SponsorFilterAPIView.as_view(), name='sponsor-filter'),  # for Sponsors Filter View
     path('sponsor/student', StudentsSponsorsAPIView.as_view(), name='sponsor-student'),  # for Students with Sponsors
+    path('sponsor/student/bulk', StudentsSponsorsBulkAPIView.as_view(), name='sponsor-student-bulk'),
+    # for creating many Student Sponsor allocations at once
+    path('sponsor/student/match', StudentsSponsorsMatchAPIView.as_view(), name='sponsor-student-match'),
+    # for planning and applying automatic Student Sponsor allocations
     path('sponsor/student/filter', StudentSponsorFilterAPIView.as_view(), name='sponsor-student-filter'),
     # for StudentSponsor Filter View
     path('student', StudentAPIView.as_view(), name='student-list'),  # for Student List View
+    path('student/<int:pk>', StudentDetailsAPIView.as_view(), name='student-detail'),
+    # for a Student with their Sponsors
     path('student/create', StudentCreateAPIView.as_view(), name='student-create'),  # for Student Create View
     path('student/update/<int:pk>', StudentUpdateAPIView.as_view(), name='student-update'),  # for Student Update View
     path('student/delete/<int:pk>', StudentDeleteAPIView.as_view(), name='student-delete'),  # for Student Delete View
     path('student/filter', StudentFilterAPIView.as_view(), name='student-filter'),  # for Student Filter View
     path('total-payment', TotalPaymentsAPIView.as_view(), name='total-payment'), # for Total Payment View
+    path('stats/timeseries', TimeSeriesAPIView.as_view(), name='stats-timeseries'),  # for dashboard Time Series
+    path('stats/universities', FundingStatsAPIView.as_view(), name='stats-universities'),  # for Funding Statistics
+    path('export', ExportCreateAPIView.as_view(), name='export-create'),  # for queueing an Export
+    path('export/<int:pk>', ExportDetailsAPIView.as_view(), name='export-detail'),  # for Export status
+    path('export/<int:pk>/download', ExportDownloadAPIView.as_view(), name='export-download'),  # for Export file
 ]
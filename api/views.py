@@ -1,24 +1,46 @@
 from rest_framework.generics import get_object_or_404, ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, filters
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth.hashers import make_password, check_password
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework import status
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import FileResponse
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
+from .asynchronous import AsyncAPIView
+from .authentication import UserRefreshToken
+from .hashing import HashingBusy, acheck_password, amake_password
 from .serializers import (LoginSerializer,
                           RegisterSerializer,
                           SponsorsSerializer,
                           SponsorDeleteSerializer,
                           StudentsSponsorsSerializer,
                           StudentSerializer,
-                          StudentDeleteSerializer, TotalPaymentsSerializer
+                          StudentDeleteSerializer, TotalPaymentsSerializer,
+                          BulkAllocationSerializer, BulkAllocationRowSerializer,
+                          ExportJobSerializer, MatchSerializer,
+                          TimeSeriesQuerySerializer, TimeSeriesSerializer,
+                          FundingStatsQuerySerializer, FundingStatsSerializer,
+                          StudentAllocationSerializer, SponsorAllocationSerializer
                           )
-from .models import User, Sponsor, Student, StudentSponsor, TotalPayment
+from .models import User, Sponsor, Student, StudentSponsor, TotalPayment, ExportJob
+from .exports import filtered_queryset
+from .matching import PlanChanged, apply_plan, build_plan
+from .stats import funding_by_university
+from .timeseries import series
+from .pagination import KeysetPagination
+from .streaming import StreamingListMixin
+from .conditional import ConditionalGetMixin, row_validators
+from .cache import CachedResponseMixin
+from .encoders import RowEncoderMixin
+from .fieldsets import FieldsetMixin, query_plan
+from .routers import ReplicaReadMixin
+from .search import TrigramSearchFilter
+from .metrics import LOGINS
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
 
 
-class RegisterAPIView(APIView):
+class RegisterAPIView(AsyncAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     @extend_schema(
@@ -27,26 +49,36 @@ class RegisterAPIView(APIView):
         request=RegisterSerializer,  # Correctly specify the request body
         responses={
             201: OpenApiResponse(response=RegisterSerializer, description="JWT access token and refresh token"),
-            400: OpenApiResponse(description="Invalid input data")
+            400: OpenApiResponse(description="Invalid input data"),
+            503: OpenApiResponse(description="Too many logins in progress")
         },
         tags=["User Authentication API"]
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = RegisterSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save(password=make_password(serializer.validated_data['password']))
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            return Response(
-                {
-                    "refresh": str(refresh),
-                    "access": access_token
-                }, status=status.HTTP_201_CREATED
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        password_hash = await amake_password(data['password'])
+        try:
+            user = await sync_to_async(User.objects.create_user)(
+                data['email'], data['username'], password_hash=password_hash, role=data.get('role'),
             )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except DjangoValidationError as error:
+            return Response(error.message_dict, status=status.HTTP_400_BAD_REQUEST)
 
+        refresh = UserRefreshToken.for_user(user)
+        access_token = str(refresh.access_token)
+        return Response(
+            {
+                "refresh": str(refresh),
+                "access": access_token
+            }, status=status.HTTP_201_CREATED
+        )
 
-class LoginAPIView(APIView):
+
+class LoginAPIView(AsyncAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     @extend_schema(
@@ -55,33 +87,44 @@ class LoginAPIView(APIView):
         request=LoginSerializer,
         responses={
             200: OpenApiResponse(response=LoginSerializer, description="JWT access token and refresh token"),
-            400: OpenApiResponse(description="Invalid credentials")
+            400: OpenApiResponse(description="Invalid credentials"),
+            503: OpenApiResponse(description="Too many logins in progress")
         },
         tags=["User Authentication API"]
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = LoginSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.validated_data['email']
-            password = serializer.validated_data['password']
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                user_obj = User.objects.get(email=user)
-            except User.DoesNotExist:
-                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        user = serializer.validated_data['email']
+        password = serializer.validated_data['password']
 
-            if user_obj and check_password(password, user_obj.password):
-                refresh = RefreshToken.for_user(user_obj)
-                access_token = str(refresh.access_token)
+        try:
+            user_obj = await User.objects.aget(email=user)
+        except User.DoesNotExist:
+            LOGINS.inc(result='unknown_user')
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
-                return Response(
-                    {
-                        "refresh": str(refresh),
-                        "access": access_token
-                    }, status=status.HTTP_200_OK
-                )
-            else:
-                return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            valid = await acheck_password(password, user_obj.password)
+        except HashingBusy:
+            LOGINS.inc(result='busy')
+            raise
+        if not valid:
+            LOGINS.inc(result='invalid_credentials')
+            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        LOGINS.inc(result='success')
+        refresh = UserRefreshToken.for_user(user_obj)
+        access_token = str(refresh.access_token)
+
+        return Response(
+            {
+                "refresh": str(refresh),
+                "access": access_token
+            }, status=status.HTTP_200_OK
+        )
 
 
 # class UniversityAPIView(APIView):
@@ -115,42 +158,125 @@ class LoginAPIView(APIView):
 #         serializer = UniversitySerializer(universities, many=True)
 #         return Response(serializer.data)
 
-class SponsorsAPIView(APIView):
+STREAM_PARAMETER = OpenApiParameter(
+    'stream', bool, description='Return every row as one streamed JSON array instead of a page.'
+)
+FIELDSET_PARAMETERS = [
+    OpenApiParameter('fields', str, description='Comma separated fields to return; all of them by default.'),
+    OpenApiParameter('expand', str, description='Comma separated relations to return as objects instead of ids.'),
+]
+PAGINATION_PARAMETERS = [
+    OpenApiParameter('cursor', str, description='The pagination cursor value.'),
+    OpenApiParameter('page_size', int, description='Number of results to return per page.'),
+    STREAM_PARAMETER,
+    *FIELDSET_PARAMETERS,
+]
+ALLOCATION_PAGE_PARAMETERS = [
+    OpenApiParameter('cursor', str, description='The cursor of the `allocations` page.'),
+    OpenApiParameter('page_size', int, description='Number of allocations to embed.'),
+    *FIELDSET_PARAMETERS,
+]
+
+
+class AllocationHistoryMixin(FieldsetMixin):
+    """
+    Detail views embedding the row's allocations newest first as a keyset
+    page (``{"next", "previous", "results"}``), so a sponsor with thousands
+    of them is read a page at a time. Two queries per response: the row,
+    and the page with its counterparts joined in.
+    """
+    pagination_class = KeysetPagination
+
+    def get_allocation_page(self, allocations, serializer_class):
+        only, related, _ = query_plan(serializer_class())
+        allocations = allocations.select_related(*related)
+        if only is not None:
+            allocations = allocations.only(*only, *self.pagination_class.cursor_fields)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(allocations, self.request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data).data
+
+
+class SponsorsAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, RowEncoderMixin, StreamingListMixin,
+                      APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    cache_models = ('api.Sponsor',)
+    performance_budget = {'queries': 2, 'total_ms': 300}
+    pagination_class = KeysetPagination
+
+    def get_conditional_queryset(self):
+        return self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer)
 
     @extend_schema(
         summary="Sponsors List",
         description="Sponsors List API Views",
         tags=["Sponsor API"],
-        responses={200: SponsorsSerializer}
+        parameters=PAGINATION_PARAMETERS,
+        responses={200: SponsorsSerializer(many=True)}
     )
     def get(self, request):
+        queryset = self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer)
+        if self.wants_stream(request):
+            return self.get_streaming_response(queryset, SponsorsSerializer)
         try:
-            sponsors = Sponsor.objects.all()
-            serializer = SponsorsSerializer(sponsors, many=True)
-            return Response(serializer.data)
+            paginator = self.pagination_class()
+            rows, encoder = self.get_rows(queryset, SponsorsSerializer)
+            sponsors = paginator.paginate_queryset(rows, request, view=self)
+            return paginator.get_paginated_response(self.serialize_rows(sponsors, SponsorsSerializer, encoder))
         except Sponsor.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class SponsorDetailsAPIView(APIView):
+class SponsorDetailsAPIView(ConditionalGetMixin, CachedResponseMixin, FieldsetMixin, APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    cache_models = ('api.Sponsor',)
+    performance_budget = {'queries': 2, 'total_ms': 100}
+
+    def get_validators(self, request, pk):
+        return row_validators(Sponsor.objects.filter(pk=pk))
 
     @extend_schema(
         summary="Sponsor Details",
         description="Sponsor Details API Views",
         tags=["Sponsor API"],
+        parameters=[FIELDSET_PARAMETERS[0]],
         responses={200: SponsorsSerializer}
     )
     def get(self, request, pk):
         try:
-            sponsor = Sponsor.objects.get(pk=pk)
-            serializer = SponsorsSerializer(sponsor)
+            sponsor = self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer).get(pk=pk)
+            serializer = SponsorsSerializer(sponsor, context=self.get_fieldset_context())
             return Response(serializer.data)
         except Sponsor.DoesNotExist:
             return Response({'detail': 'Sponsor not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class SponsorAllocationsAPIView(CachedResponseMixin, AllocationHistoryMixin, APIView):
+    cache_models = ('api.Sponsor', 'api.StudentSponsor', 'api.Student', 'api.University')
+    performance_budget = {'queries': 2, 'total_ms': 100}
+
+    @extend_schema(
+        summary="Sponsor Students",
+        description="The sponsor with `allocations`: the students it funds, newest allocation first, each with "
+                    "the student's name and university. `allocations` is a page like the lists'; follow its "
+                    "`next`/`previous` links for the rest.",
+        tags=["Sponsor API"],
+        parameters=ALLOCATION_PAGE_PARAMETERS,
+        responses={200: OpenApiResponse(SponsorsSerializer, description="The sponsor plus an `allocations` page "
+                                                                        "of SponsorAllocationSerializer rows"),
+                   404: OpenApiResponse(description='Sponsor not found')}
+    )
+    def get(self, request, pk):
+        try:
+            sponsor = self.get_fieldset_queryset(Sponsor.objects.all(), SponsorsSerializer).get(pk=pk)
+        except Sponsor.DoesNotExist:
+            return Response({'detail': 'Sponsor not found'}, status=status.HTTP_404_NOT_FOUND)
+        data = SponsorsSerializer(sponsor, context=self.get_fieldset_context()).data
+        data['allocations'] = self.get_allocation_page(
+            StudentSponsor.objects.filter(sponsor=sponsor), SponsorAllocationSerializer)
+        return Response(data)
+
+
 class SponsorCreateAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
@@ -210,6 +336,7 @@ class SponsorDeleteAPIView(APIView):
 
 class StudentsSponsorsAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    performance_budget = {'queries': 9, 'total_ms': 300}
 
     @extend_schema(
         summary="Student Sponsor Create",
@@ -225,29 +352,145 @@ class StudentsSponsorsAPIView(APIView):
     def post(self, request):
         serializer = StudentsSponsorsSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                serializer.save()
+            except DjangoValidationError as error:
+                return Response(error.message_dict, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StudentAPIView(APIView):
+class StudentsSponsorsBulkAPIView(APIView):
+    parser_classes = (JSONParser,)
+    performance_budget = {'queries': 10, 'total_ms': 2000}
+
+    @extend_schema(
+        summary="Student Sponsor Bulk Create",
+        description="Creates many allocations in one transaction. Invalid rows are reported by index; "
+                    "the valid ones are saved unless `all_or_nothing` is set.",
+        request=BulkAllocationSerializer,
+        responses={
+            201: OpenApiResponse(description="Created allocations and per-row errors"),
+            400: OpenApiResponse(description="Nothing was created")
+        },
+        tags=["Sponsor API"]
+    )
+    def post(self, request):
+        serializer = BulkAllocationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        created, errors = serializer.save()
+        data = {
+            'created': StudentsSponsorsSerializer(created, many=True).data,
+            'errors': errors
+        }
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+class StudentsSponsorsMatchAPIView(APIView):
+    parser_classes = (JSONParser,)
+    performance_budget = {'queries': 60, 'total_ms': 5000}
+
+    @extend_schema(
+        summary="Student Sponsor Matching",
+        description="Plans allocations from confirmed sponsors with money left to students with need left. "
+                    "Returns a preview by default; with `apply` the plan is computed again over locked rows "
+                    "and saved. Pass the previewed `fingerprint` to apply only that exact plan.",
+        request=MatchSerializer,
+        responses={
+            200: OpenApiResponse(description="Plan preview: summary, fingerprint and allocations"),
+            201: OpenApiResponse(description="Plan applied: summary, fingerprint and created allocations"),
+            409: OpenApiResponse(description="The plan changed since it was previewed")
+        },
+        tags=["Sponsor API"]
+    )
+    def post(self, request):
+        serializer = MatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        policy = serializer.validated_data['policy']
+
+        if not serializer.validated_data['apply']:
+            plan = build_plan(policy)
+            return Response({
+                'fingerprint': plan.fingerprint,
+                'summary': plan.summary(),
+                'allocations': BulkAllocationRowSerializer(plan.allocations, many=True).data
+            }, status=status.HTTP_200_OK)
+
+        try:
+            plan, created = apply_plan(policy, fingerprint=serializer.validated_data.get('fingerprint'))
+        except PlanChanged as changed:
+            return Response({
+                'detail': 'The plan changed since it was previewed.',
+                'fingerprint': changed.plan.fingerprint,
+                'summary': changed.plan.summary()
+            }, status=status.HTTP_409_CONFLICT)
+        except DjangoValidationError as error:
+            return Response({'detail': error.messages}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'fingerprint': plan.fingerprint,
+            'summary': plan.summary(),
+            'created': StudentsSponsorsSerializer(created, many=True).data
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class StudentAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, RowEncoderMixin, StreamingListMixin,
+                     APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    cache_models = ('api.Student', 'api.University')
+    performance_budget = {'queries': 2, 'total_ms': 300}
+    pagination_class = KeysetPagination
+
+    def get_conditional_queryset(self):
+        return self.get_fieldset_queryset(Student.objects.all(), StudentSerializer)
 
     @extend_schema(
         summary="Student List",
         description="Student List API Views",
         tags=["Student API"],
-        responses={200: StudentSerializer}
+        parameters=PAGINATION_PARAMETERS,
+        responses={200: StudentSerializer(many=True)}
     )
     def get(self, request):
+        queryset = self.get_fieldset_queryset(Student.objects.all(), StudentSerializer)
+        if self.wants_stream(request):
+            return self.get_streaming_response(queryset, StudentSerializer)
         try:
-            students = Student.objects.all()
-            serializer = StudentSerializer(students, many=True)
-            return Response(serializer.data)
+            paginator = self.pagination_class()
+            rows, encoder = self.get_rows(queryset, StudentSerializer)
+            students = paginator.paginate_queryset(rows, request, view=self)
+            return paginator.get_paginated_response(self.serialize_rows(students, StudentSerializer, encoder))
         except Student.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
+class StudentDetailsAPIView(CachedResponseMixin, AllocationHistoryMixin, APIView):
+    cache_models = ('api.Student', 'api.University', 'api.StudentSponsor', 'api.Sponsor')
+    performance_budget = {'queries': 2, 'total_ms': 100}
+
+    @extend_schema(
+        summary="Student Details",
+        description="The student with `allocations`: who sponsors them, newest allocation first, each with the "
+                    "sponsor's name. `allocations` is a page like the lists'; follow its `next`/`previous` "
+                    "links for the rest.",
+        tags=["Student API"],
+        parameters=ALLOCATION_PAGE_PARAMETERS,
+        responses={200: OpenApiResponse(StudentSerializer, description="The student plus an `allocations` page "
+                                                                      "of StudentAllocationSerializer rows"),
+                   404: OpenApiResponse(description='Student not found')}
+    )
+    def get(self, request, pk):
+        try:
+            student = self.get_fieldset_queryset(Student.objects.all(), StudentSerializer).get(pk=pk)
+        except Student.DoesNotExist:
+            return Response({'detail': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+        data = StudentSerializer(student, context=self.get_fieldset_context()).data
+        data['allocations'] = self.get_allocation_page(
+            StudentSponsor.objects.filter(student=student), StudentAllocationSerializer)
+        return Response(data)
+
+
 class StudentCreateAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
@@ -300,40 +543,60 @@ class StudentDeleteAPIView(APIView):
 
 
 @extend_schema(
-    tags=["Filters"]
+    tags=["Filters"],
+    parameters=[STREAM_PARAMETER, *FIELDSET_PARAMETERS]
 )
-class SponsorFilterAPIView(ListAPIView):
+class SponsorFilterAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, RowEncoderMixin,
+                           StreamingListMixin, ListAPIView):
+    cache_models = ('api.Sponsor',)
+    performance_budget = {'queries': 4, 'total_ms': 300}
     serializer_class = SponsorsSerializer
+    pagination_class = KeysetPagination
     queryset = Sponsor.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ['full_name', 'progress', 'sponsor_status']
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
+    search_fields = ['full_name', 'organization_name']
     filterset_fields = ['full_name', 'progress', 'sponsor_status']
 
 
 @extend_schema(
-    tags=["Filters"]
+    tags=["Filters"],
+    parameters=[STREAM_PARAMETER, *FIELDSET_PARAMETERS]
 )
-class StudentFilterAPIView(ListAPIView):
+class StudentFilterAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, RowEncoderMixin,
+                           StreamingListMixin, ListAPIView):
+    cache_models = ('api.Student', 'api.University')
+    performance_budget = {'queries': 4, 'total_ms': 300}
     serializer_class = StudentSerializer
+    pagination_class = KeysetPagination
     queryset = Student.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['full_name', 'degree', 'university']
-    search_fields = ['full_name', 'degree', 'university']
+    search_fields = ['full_name', 'university__name']
 
 
 @extend_schema(
-    tags=["Filters"]
+    tags=["Filters"],
+    parameters=[STREAM_PARAMETER, *FIELDSET_PARAMETERS]
 )
-class StudentSponsorFilterAPIView(ListAPIView):
+class StudentSponsorFilterAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, RowEncoderMixin,
+                                  StreamingListMixin, ListAPIView):
+    cache_models = ('api.StudentSponsor', 'api.Student', 'api.Sponsor', 'api.University')
+    performance_budget = {'queries': 4, 'total_ms': 300}
     serializer_class = StudentsSponsorsSerializer
+    pagination_class = KeysetPagination
     queryset = StudentSponsor.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['student', 'sponsor', 'created_at']
-    search_fields = ['student', 'sponsor', 'created_at']
+    search_fields = ['student__full_name', 'sponsor__full_name']
 
 
-class TotalPaymentsAPIView(APIView):
+class TotalPaymentsAPIView(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    cache_models = ('api.TotalPayment',)
+    performance_budget = {'queries': 2, 'total_ms': 100}
+
+    def get_validators(self, request):
+        return row_validators(TotalPayment.objects.filter(pk=TotalPayment.objects.SUMMARY_PK))
 
     @extend_schema(
         summary='Total Payment API',
@@ -345,6 +608,106 @@ class TotalPaymentsAPIView(APIView):
         }
     )
     def get(self, request):
-        total_payments = TotalPayment.objects.all()
-        serializer = TotalPaymentsSerializer(total_payments, many=True)
+        serializer = TotalPaymentsSerializer(TotalPayment.objects.get_summary())
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TimeSeriesAPIView(ReplicaReadMixin, CachedResponseMixin, APIView):
+    cache_models = ('api.SponsorDailyRollup', 'api.AllocationDailyRollup')
+    performance_budget = {'queries': 2, 'total_ms': 100}
+
+    @extend_schema(
+        summary="Dashboard Time Series",
+        description="Sponsor sign-ups or allocations (count and money) per day, week or month, summed from "
+                    "the daily rollup tables. Every bucket in the range is returned, empty ones as zeros.",
+        parameters=[TimeSeriesQuerySerializer],
+        responses={
+            200: TimeSeriesSerializer,
+            '400': OpenApiResponse(description='Invalid query parameters')
+        },
+        tags=["Stats API"]
+    )
+    def get(self, request):
+        serializer = TimeSeriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = dict(serializer.validated_data)
+        metric, bucket, start, end = (query.pop(name) for name in ('metric', 'bucket', 'start', 'end'))
+        return Response(TimeSeriesSerializer({
+            'metric': metric,
+            'bucket': bucket,
+            'start': start,
+            'end': end,
+            'results': series(metric, bucket, start, end, **query),
+        }).data, status=status.HTTP_200_OK)
+
+
+class FundingStatsAPIView(CachedResponseMixin, APIView):
+    cache_models = ('api.Student', 'api.StudentSponsor', 'api.University')
+    # Invalidated by every allocation and student change, so entries can live long.
+    cache_timeout = 3600
+    performance_budget = {'queries': 5, 'total_ms': 1000}
+
+    @extend_schema(
+        summary="Funding Statistics",
+        description="Per university, and per degree within it: student count, contract and allocated totals, "
+                    "coverage (allocated / contract) and the number of distinct sponsors. Cached until the "
+                    "next allocation or student change.",
+        parameters=[FundingStatsQuerySerializer],
+        responses={
+            200: FundingStatsSerializer,
+            '400': OpenApiResponse(description='Invalid query parameters')
+        },
+        tags=["Stats API"]
+    )
+    def get(self, request):
+        serializer = FundingStatsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        results, totals = funding_by_university(**serializer.validated_data)
+        return Response(FundingStatsSerializer({'totals': totals, 'results': results}).data, status=status.HTTP_200_OK)
+
+
+class ExportCreateAPIView(APIView):
+    parser_classes = (JSONParser,)
+
+    @extend_schema(
+        summary="Export Create",
+        description="Queues a CSV or NDJSON export. `filters` takes the same query parameters as the "
+                    "matching filter endpoint. A background worker (`manage.py run_export_worker`) writes the file.",
+        request=ExportJobSerializer,
+        responses={
+            202: OpenApiResponse(response=ExportJobSerializer, description="Export queued"),
+            400: OpenApiResponse(description="Invalid input data")
+        },
+        tags=["Export API"]
+    )
+    def post(self, request):
+        serializer = ExportJobSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        # Builds the filtered queryset without running it; rejects bad filters up front.
+        filtered_queryset(serializer.validated_data['kind'], serializer.validated_data.get('filters', {}))
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class ExportDetailsAPIView(APIView):
+    @extend_schema(
+        summary="Export Status",
+        description="Export status and, once finished, its download link",
+        responses={200: ExportJobSerializer},
+        tags=["Export API"]
+    )
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+
+class ExportDownloadAPIView(APIView):
+    @extend_schema(
+        summary="Export Download",
+        description="Downloads a finished export as a gzip file",
+        responses={200: OpenApiResponse(description="Gzip-compressed CSV or NDJSON")},
+        tags=["Export API"]
+    )
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.Status.DONE)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.rsplit('/', 1)[-1])